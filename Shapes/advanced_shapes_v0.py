@@ -5,8 +5,10 @@ from pyglet.graphics import Batch
 
 import math
 
+from shape_helpers import _FanVertexListMixin, get_shape_group
 
-class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
+
+class _AdvancedShapeBase(_FanVertexListMixin, pyglet.shapes._ShapeBase):
     """Base class for Advanced Shapes."""
 
     _rotation = 0
@@ -18,6 +20,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
     _anchor_position_y = 0
     _vertices = []
     _frozen_vertices = None
+    _indexed = False  # if True, round shapes store their rim points once plus a center, drawn with a cached index buffer
     _verbose = False  # used to print debug messages
 
     def __del__(self):
@@ -72,12 +75,13 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
 
     def _update_position(self):
         if not self._visible:
-            self._vertices = (0,) * len(self._vertices)
+            # the whole vertex list: it may have been resized since the vertices were calculated
+            self._vertices = (0,) * (self._vertex_list.get_size() * 2)
         else:
             self._get_vertices()
             self._rotate_vertices()
             self._translate_vertices()
-        self._vertex_list.vertices[:] = tuple(self._vertices)
+        self._vertex_list.vertices[:len(self._vertices)] = tuple(self._vertices)  # the vertex list may be larger
         self._update_anchor_position()
 
     def _update_color(self):
@@ -91,39 +95,34 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
         """Return a list with the vertices in order that mark the boundary of the polygon (i.e. [x1, y1, x2, y2...])."""
         raise NotImplementedError
 
+    def _get_fan_outer_vertices(self):
+        """Return the center, then the outer points of a round shape laid out by _set_fan_vertices, as drawn."""
+        vertices = self._vertices
+        rim = self._rim_count()
+        if self._indexed:
+            return list(vertices[:(rim + 1) * 2])
+        points = list(vertices[2:4])
+        for i in range(rim - 1):  # first point of every triangle, then the last point of the last one
+            points.extend(vertices[i * 6:i * 6 + 2])
+        points.extend(vertices[(rim - 2) * 6 + 4:(rim - 2) * 6 + 6])
+        return points
+
     def is_position_inside_shape(self, x, y):
         """Return true if point (x, y) is inside shape (including edge)."""
         points = self._get_consecutive_outer_vertices()
-        edges_crossed = 0
-        vertices_crossed = set()
+        inside = False
         for i in range(0, len(points), 2):
-            x1, y1 = points[i - 2, i - 1]
-            x2, y2 = points[i, i + 1]
-            if (x > x1 and x > x2) or (y1 < y and y2 < y) or (y1 > y and y2 > y):  # remove dots higher, lower or right of segment's box
-                pass
-            elif (x < x1 and x < x2):  # dot is to the left of segment's box
-                if y1 != y and y2 != y:  # y1 and y2 are above and below dot
-                    edges_crossed += 1
-                elif y1 == y and y2 != y:  # look into vertices crossed, only count them once
-                    if (x1, y1) not in vertices_crossed:  # ignore already counted vertices
-                        edges_crossed += 1
-                        vertices_crossed.add((x1, y1))
-                elif y2 == y and y1 != y:  # look into vertices crossed, only count them once
-                    if (x2, y2) not in vertices_crossed:  # ignore already counted vertices
-                        edges_crossed += 1
-                        vertices_crossed.add((x2, y2))
-                else:
-            else:  # dot is in segment's box, we need to check with math
-                if x1 == x2:
-                    pass
-                m = (y1 - y2) / (x2 - x1)
-                n = y1 - m * x1
-                x_intersection = (y - n) / m
-                if (y - n) / m > x:
-                    edges_crossed += 1
-                elif
-                
-        return edges_crossed % 2 == 1
+            x1, y1 = points[i - 2], points[i - 1]
+            x2, y2 = points[i], points[i + 1]
+            dx, dy = x2 - x1, y2 - y1
+            length = dx * dx + dy * dy  # squared
+            # dot is in the segment, up to the rounding errors of rotated vertices
+            if length and abs(dx * (y - y1) - dy * (x - x1)) <= 1e-9 * length and \
+                    -1e-9 * length <= dx * (x - x1) + dy * (y - y1) <= (1 + 1e-9) * length:
+                return True
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):  # ray to the right crosses segment
+                inside = not inside
+        return inside
 
     def _get_vertices(self):
         if self._frozen_vertices is None:
@@ -133,15 +132,15 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
 
     def _rotate_vertices(self):
         if self._rotation % 360 != 0:
+            # cos and sin are computed once, then each vertex is rotated around the anchor with a 2x2 matrix
             rotation = math.radians(self._rotation)
-            for i in range(0, len(self._vertices), 2):
-                x, y = self._vertices[i] - self._anchor_x, self._vertices[i + 1] - self._anchor_y
-                r = math.hypot(x, y)
-                if r == 0:  # dot in anchor, no need to rotate
-                    continue
-                angle = math.atan2(y, x) + rotation
-                self._vertices[i] = math.cos(angle) * r + self._anchor_x
-                self._vertices[i + 1] = math.sin(angle) * r + self._anchor_y
+            cr, sr = math.cos(rotation), math.sin(rotation)
+            ax, ay = self._anchor_x, self._anchor_y
+            vertices = self._vertices
+            for i in range(0, len(vertices), 2):
+                x, y = vertices[i] - ax, vertices[i + 1] - ay
+                vertices[i] = x * cr - y * sr + ax
+                vertices[i + 1] = x * sr + y * cr + ay
 
     def _translate_vertices(self):
         for i in range(0, len(self._vertices), 2):
@@ -307,7 +306,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
 
 class Circle(_AdvancedShapeBase):
     def __init__(self, x, y, radius, rotation=0, angle=360, start_angle=0, segments=None, color=(255, 255, 255), opacity=255,
-                 anchor_visible=False, closed=False, batch=None, group=None):
+                 anchor_visible=False, closed=False, indexed=False, batch=None, group=None):
         """Create a circle, or a sector if angle is less than 360.
 
         The circle's anchor point (x, y) defaults to the center of the circle.
@@ -342,6 +341,9 @@ class Circle(_AdvancedShapeBase):
                 Whether to show anchor points or not.
             `closed` : bool
                 If True, the ends of the sector will be connected.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -354,6 +356,7 @@ class Circle(_AdvancedShapeBase):
         self._radius = radius
         self._segments = segments or max(14, int(radius / 1.25))
         self._closed = closed
+        self._indexed = indexed
         self._rotation = rotation
         self._rgb = color
         self._opacity = opacity
@@ -361,12 +364,18 @@ class Circle(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
 
-        self._vertex_list = self._batch.add((self._segments + 1) * 3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._vertex_list = self._add_fan_vertex_list()
         self._update_position()
         self._update_color()
 
+    def _rim_count(self):
+        return self._segments + 1
+
+    def _get_consecutive_outer_vertices(self):
+        return self._get_fan_outer_vertices()
+
     def _calculate_vertices(self):
         r = self._radius
         start_angle = math.radians(self._start_angle)
@@ -378,16 +387,10 @@ class Circle(_AdvancedShapeBase):
                    r * math.sin(i * tau_segs + start_angle)] for i in range(self._segments + 1)]
 
         # create a list of triangles from the points
-        self._vertices = []
-        for i in range(len(points) - 1):
-            self._vertices.extend(points[i] + [0, 0] + points[i + 1])
-        if self._closed:
-            self._vertices.extend(points[-1] + [0, 0] + points[0])
-        else:
-            self._vertices.extend(points[-1] + points[-1] + points[-1])
+        self._set_fan_vertices(points)
 
     def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * (self._segments + 1) * 3
+        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * self._vertex_list.get_size()
         super()._update_color()
 
     @property
@@ -441,12 +444,14 @@ class Circle(_AdvancedShapeBase):
     @closed.setter
     def closed(self, value):
         self._closed = value
-        self._update_position()
+        self._resize_fan_vertex_list()
+        if not self._indexed:  # indexed points are the same, only the last triangle changes
+            self._update_position()
 
 
 class RegularPolygon(Circle):
     def __init__(self, x, y, num_sides, side=None, radius=None, rotation=0, angle=360, start_angle=0,
-                 color=(255, 255, 255), opacity=255, anchor_visible=False, closed=False, batch=None, group=None):
+                 color=(255, 255, 255), opacity=255, anchor_visible=False, closed=False, indexed=False, batch=None, group=None):
         """Create a regular polygon, or a sector if angle is less than 360.
 
         The polygon's anchor point (x, y) defaults to the center of the polygon.
@@ -480,6 +485,9 @@ class RegularPolygon(Circle):
                 Whether to show anchor points or not.
             `closed` : bool
                 If True, the ends of the sector will be connected.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -490,7 +498,8 @@ class RegularPolygon(Circle):
         radius = side / 2 / factor if side is not None else radius
         self._side = radius * factor * 2 if side is None else side
         super().__init__(x, y, radius, rotation=rotation, angle=angle, start_angle=start_angle, segments=num_sides,
-                         color=color, opacity=opacity, anchor_visible=anchor_visible, closed=closed, batch=batch, group=group)
+                         color=color, opacity=opacity, anchor_visible=anchor_visible, closed=closed, indexed=indexed,
+                         batch=batch, group=group)
 
     def _calculate_vertices(self):
         self._radius = self._side / 2 / math.sin(math.radians(360) / self._segments / 2)
@@ -523,10 +532,25 @@ class RegularPolygon(Circle):
         self._side = value * 2 * math.sin(math.radians(360) / self._segments / 2)
         self._update_position()
 
+    @property
+    def num_sides(self):
+        """The number of sides of the polygon. Changing it keeps the radius.
+
+        :type: int
+        """
+        return self._segments
+
+    @num_sides.setter
+    def num_sides(self, value):
+        self._segments = value
+        self._side = self._radius * 2 * math.sin(math.radians(360) / value / 2)
+        self._resize_fan_vertex_list()
+        self._update_position()
+
 
 class Ellipse(_AdvancedShapeBase):
     def __init__(self, x, y, a, b, angle=360, start_angle=0, rotation=0, segments=None, color=(255, 255, 255), opacity=255,
-                 anchor_visible=False, closed=False, batch=None, group=None):
+                 anchor_visible=False, closed=False, indexed=False, batch=None, group=None):
         """Create an ellipse, or an ellipse sector if angle is less than 360.
 
         The ellipse's anchor point (x, y) defaults to the center of the ellipse.
@@ -562,6 +586,9 @@ class Ellipse(_AdvancedShapeBase):
                 Whether to show anchor points or not.
             `closed` : bool
                 If True, the ends of the sector will be connected.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -575,6 +602,7 @@ class Ellipse(_AdvancedShapeBase):
         self._b = b
         self._segments = segments or max(14, int(max(a, b) / 1.25))
         self._closed = closed
+        self._indexed = indexed
         self._rotation = rotation
         self._rgb = color
         self._opacity = opacity
@@ -582,12 +610,18 @@ class Ellipse(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
 
-        self._vertex_list = self._batch.add((self._segments + 1) * 3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._vertex_list = self._add_fan_vertex_list()
         self._update_position()
         self._update_color()
 
+    def _rim_count(self):
+        return self._segments + 1
+
+    def _get_consecutive_outer_vertices(self):
+        return self._get_fan_outer_vertices()
+
     def _calculate_vertices(self):
         start_angle = math.radians(self._start_angle)
         tau_segs = math.radians(self._angle) / self._segments
@@ -598,16 +632,10 @@ class Ellipse(_AdvancedShapeBase):
                    self._b * math.sin(i * tau_segs + start_angle)] for i in range(self._segments + 1)]
 
         # create a list of triangles from the points
-        self._vertices = []
-        for i in range(len(points) - 1):
-            self._vertices.extend(points[i] + [0, 0] + points[i + 1])
-        if self._closed:
-            self._vertices.extend(points[-1] + [0, 0] + points[0])
-        else:
-            self._vertices.extend(points[-1] + points[-1] + points[-1])
+        self._set_fan_vertices(points)
 
     def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * (self._segments + 1) * 3
+        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * self._vertex_list.get_size()
         super()._update_color()
 
     @property
@@ -674,7 +702,9 @@ class Ellipse(_AdvancedShapeBase):
     @closed.setter
     def closed(self, value):
         self._closed = value
-        self._update_position()
+        self._resize_fan_vertex_list()
+        if not self._indexed:  # indexed points are the same, only the last triangle changes
+            self._update_position()
 
 
 class Rectangle(_AdvancedShapeBase):
@@ -720,7 +750,7 @@ class Rectangle(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(6, GL_TRIANGLES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
@@ -732,6 +762,10 @@ class Rectangle(_AdvancedShapeBase):
         y2 = self._height / 2
         self._vertices = [x1, y1, x2, y1, x2, y2, x1, y1, x1, y2, x2, y2]
 
+    def _get_consecutive_outer_vertices(self):
+        # two triangles sharing the diagonal: corners 0, 1, 2 of the first one, then the corner 4 of the second
+        return list(self._vertices[:6]) + list(self._vertices[8:10])
+
     def _update_color(self):
         self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * 6
         super()._update_color()
@@ -819,7 +853,7 @@ class Triangle(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
@@ -827,6 +861,9 @@ class Triangle(_AdvancedShapeBase):
     def _calculate_vertices(self):
         self._vertices = [0, 0, self._x2, self._y2, self._x3, self._y3]
 
+    def _get_consecutive_outer_vertices(self):
+        return list(self._vertices[:6])
+
     def _update_color(self):
         self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * 3
         super()._update_color()
@@ -937,7 +974,8 @@ class Triangle(_AdvancedShapeBase):
 
 class Star(_AdvancedShapeBase):
     def __init__(self, x, y, outer_radius, inner_radius, num_spikes, rotation=0, angle=360, start_angle=0,
-                 color=(255, 255, 255), opacity=255, anchor_visible=False, closed=False, outer_first=True, batch=None, group=None):
+                 color=(255, 255, 255), opacity=255, anchor_visible=False, closed=False, outer_first=True, indexed=False,
+                 batch=None, group=None):
         """Create a star, or a star sector.
 
         The star's anchor point (x, y) defaults to the center of the star.
@@ -972,6 +1010,9 @@ class Star(_AdvancedShapeBase):
                 If True, the ends of the sector will be connected.
             `outer_first` : bool
                 If True, the sector breaks in a point, else it breaks in the angle.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the star to.
             `group` : `~pyglet.graphics.Group`
@@ -985,6 +1026,7 @@ class Star(_AdvancedShapeBase):
         self._inner_radius = inner_radius
         self._num_spikes = num_spikes
         self._closed = closed
+        self._indexed = indexed
         self._outer_first = outer_first
         self._rotation = rotation
         self._rgb = color
@@ -993,12 +1035,18 @@ class Star(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
 
-        self._vertex_list = self._batch.add(int((self._num_spikes + 0.5) * 6), GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._vertex_list = self._add_fan_vertex_list()
         self._update_position()
         self._update_color()
 
+    def _rim_count(self):
+        return self._num_spikes * 2 + 1
+
+    def _get_consecutive_outer_vertices(self):
+        return self._get_fan_outer_vertices()
+
     def _calculate_vertices(self):
         r1 = self._outer_radius if self._outer_first else self._inner_radius
         r2 = self._inner_radius if self._outer_first else self._outer_radius
@@ -1015,16 +1063,10 @@ class Star(_AdvancedShapeBase):
         points.append([r1 * math.cos(2 * self._num_spikes * d_theta + start_angle), r1 * math.sin(2 * self._num_spikes * d_theta + start_angle)])
 
         # create a list of triangles from the points
-        self._vertices = []
-        for i in range(len(points) - 1):
-            self._vertices.extend(points[i] + [0, 0] + points[i + 1])
-        if self._closed:
-            self._vertices.extend(points[-1] + [0, 0] + points[0])
-        else:
-            self._vertices.extend(points[-1] + points[-1] + points[-1])
+        self._set_fan_vertices(points)
 
     def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * int((self._num_spikes + 0.5) * 6)
+        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * self._vertex_list.get_size()
         super()._update_color()
 
     @property
@@ -1055,6 +1097,7 @@ class Star(_AdvancedShapeBase):
     @num_spikes.setter
     def num_spikes(self, value):
         self._num_spikes = value
+        self._resize_fan_vertex_list()
         self._update_position()
 
     @property
@@ -1095,7 +1138,9 @@ class Star(_AdvancedShapeBase):
     @closed.setter
     def closed(self, value):
         self._closed = value
-        self._update_position()
+        self._resize_fan_vertex_list()
+        if not self._indexed:  # indexed points are the same, only the last triangle changes
+            self._update_position()
 
 
 class Line(_AdvancedShapeBase):
@@ -1153,7 +1198,7 @@ class Line(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(6, GL_TRIANGLES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
@@ -1309,7 +1354,7 @@ class LineBasic(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(2, GL_LINES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
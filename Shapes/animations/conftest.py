@@ -0,0 +1,14 @@
+"""
+pytest configuration of the animations tests
+
+pyglet chooses its OpenGL platform when pyglet.gl is first imported, by whichever test module comes first. The options
+are set here, before any test module is imported: no shadow window, and pyglet's headless (EGL) mode when EGL is
+installed, so the EngineWindow tests can create hidden windows without a display.
+"""
+import ctypes.util
+
+import pyglet
+
+pyglet.options['shadow_window'] = False
+if ctypes.util.find_library('EGL'):
+    pyglet.options['headless'] = True
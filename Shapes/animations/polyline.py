@@ -0,0 +1,402 @@
+"""
+Polyline: a thick line strip drawn as one indexed vertex list
+
+Instead of one Line shape (and one vertex list) per segment, a Polyline computes the geometry of every segment and
+join in one vectorized pass with NumPy (or a pure Python loop without it) and writes it to a single vertex list. When
+only some points move, set_points recomputes and uploads only the vertices around them.
+
+Each segment has its own 4 vertices. Joins:
+    * miter: the ends of consecutive segments meet at the miter points of their join. Joins whose miter would reach
+      further than miter_limit half widths from the point are beveled: the outer ends keep the width of their
+      segments, and 2 triangles per join (degenerate for mitered joins) fill the gap between them.
+    * bevel: a triangle of 3 more vertices fills the outer side of each join.
+
+    trace = Polyline(np.column_stack((xs, ys)), width=2, color=(255, 200, 0), batch=batch)
+    trace.set_points(1000, new_points)  # points 1000 to 1000 + len(new_points) moved
+"""
+import functools
+import os
+import sys
+
+import pyglet
+from pyglet.gl import GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+from pyglet.gl import GL_TRIANGLES
+from pyglet.graphics import Batch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shape_helpers import _fit_capacity, get_shape_group
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the geometry is then computed point by point
+    np = None
+
+
+JOINS = ('miter', 'bevel')
+
+
+def _vertex_count(count, join):
+    """Return the number of vertices of a polyline of count points."""
+    if join == 'miter':
+        return 4 * (count - 1)
+    return 4 * (count - 1) + 3 * (count - 2)
+
+
+@functools.lru_cache(maxsize=16)
+def _polyline_indices(count, join):
+    """Return the indices of the triangles of a polyline of count points, relative to its first vertex.
+
+    Segment i is made of 2 triangles through its left and right vertices at both ends, vertices 4i to 4i + 3. They
+    are followed by the triangles of the joins: with miter joins, 2 triangles between the ends of consecutive
+    segments, from their inner end to both outer ends (see _miter_vertices); with bevel joins, a triangle of 3 more
+    vertices for each join.
+    """
+    segments = count - 1
+    pattern = (0, 1, 2, 1, 3, 2)
+    join_pattern = (2, 3, 5, 3, 2, 4)  # end of segment i (left 2, right 3), start of segment i + 1 (left 4, right 5)
+    if np is not None:
+        indices = (np.arange(segments, dtype=np.uint32)[:, None] * 4 + np.array(pattern, dtype=np.uint32)).ravel()
+        if join == 'miter':
+            joins = (np.arange(segments - 1, dtype=np.uint32)[:, None] * 4
+                     + np.array(join_pattern, dtype=np.uint32)).ravel()
+        else:
+            joins = np.arange(4 * segments, 4 * segments + 3 * (segments - 1), dtype=np.uint32)
+        indices = np.concatenate((indices, joins))
+        indices.flags.writeable = False  # shared by every polyline with this count
+        return indices
+    indices = [4 * i + index for i in range(segments) for index in pattern]
+    if join == 'miter':
+        indices.extend(4 * i + index for i in range(segments - 1) for index in join_pattern)
+    else:
+        indices.extend(range(4 * segments, 4 * segments + 3 * (segments - 1)))
+    return tuple(indices)
+
+
+def _normals(points):
+    """Return the unit directions and left normals of the segments of points, an (n, 2) array."""
+    directions = points[1:] - points[:-1]
+    lengths = np.hypot(directions[:, 0], directions[:, 1])
+    lengths[lengths == 0] = 1  # repeated points make a segment without direction nor width
+    directions /= lengths[:, None]
+    return directions, np.column_stack((-directions[:, 1], directions[:, 0]))
+
+
+def _miter_vertices(points, half_width, miter_limit):
+    """Return the 4 vertices of each segment, as an (n - 1, 4, 2) array: left and right at its start, then at its end.
+
+    The ends of consecutive segments meet at the miter points of their join, if they are within miter_limit half
+    widths of the point. Otherwise the join is beveled: the outer ends keep their offsets, and the inner ends meet at
+    miter_limit half widths from the point, along the miter.
+    """
+    directions, normals = _normals(points)
+    offsets = normals * half_width
+    starts, ends = points[:-1], points[1:]
+    segments = np.stack((starts + offsets, starts - offsets, ends + offsets, ends - offsets), axis=1)
+    if len(points) < 3:
+        return segments
+    turns = directions[:-1, 0] * directions[1:, 1] - directions[:-1, 1] * directions[1:, 0]
+    sides = np.where(turns > 0, -1.0, 1.0)  # the outer side: right (-1) when the line turns left
+    # the miter goes along the mean of the normals, long enough to keep the segments' width
+    miters = normals[:-1] + normals[1:]
+    lengths = np.hypot(miters[:, 0], miters[:, 1])
+    reversed_ = lengths < 1e-9  # the line goes back on itself, the inner side is behind the point
+    miters[reversed_] = sides[reversed_, None] * directions[:-1][reversed_]
+    lengths[reversed_] = 1
+    miters /= lengths[:, None]
+    cosines = np.einsum('ij,ij->i', miters, normals[1:])
+    corners = points[1:-1]
+    incoming, outgoing = segments[:-1], segments[1:]  # views of the segments ending and starting at each join
+    mitered = cosines >= 1 / miter_limit
+    offsets = miters[mitered] * (half_width / cosines[mitered])[:, None]
+    incoming[mitered, 2] = outgoing[mitered, 0] = corners[mitered] + offsets
+    incoming[mitered, 3] = outgoing[mitered, 1] = corners[mitered] - offsets
+    beveled = np.flatnonzero(~mitered)
+    inner = corners[beveled] - miters[beveled] * (sides[beveled] * miter_limit * half_width)[:, None]
+    inner_sides = (sides[beveled] > 0).astype(np.intp)  # left (0) when the line turns left, else right (1)
+    incoming[beveled, 2 + inner_sides] = inner
+    outgoing[beveled, inner_sides] = inner
+    return segments
+
+
+def _bevel_vertices(points, half_width):
+    """Return the 4 vertices of each segment, as an (n - 1, 4, 2) array, and the 3 of each join, (n - 2, 3, 2)."""
+    directions, normals = _normals(points)
+    offsets = normals * half_width
+    starts, ends = points[:-1], points[1:]
+    segments = np.stack((starts + offsets, starts - offsets, ends + offsets, ends - offsets), axis=1)
+    # the join triangle fills the outer side: the right side when the line turns left
+    turns = directions[:-1, 0] * directions[1:, 1] - directions[:-1, 1] * directions[1:, 0]
+    sides = np.where(turns > 0, -1.0, 1.0)[:, None]
+    corners = points[1:-1]
+    joins = np.stack((corners, corners + sides * offsets[:-1], corners + sides * offsets[1:]), axis=1)
+    return segments, joins
+
+
+def _normals_python(points):
+    normals = []
+    directions = []
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx * dx + dy * dy) ** 0.5 or 1
+        directions.append((dx / length, dy / length))
+        normals.append((-dy / length, dx / length))
+    return directions, normals
+
+
+def _miter_vertices_python(points, half_width, miter_limit):
+    """Same as _miter_vertices, returns a flat list."""
+    directions, normals = _normals_python(points)
+    segments = []
+    for (x1, y1), (x2, y2), (nx, ny) in zip(points, points[1:], normals):
+        ox, oy = nx * half_width, ny * half_width
+        segments.extend((x1 + ox, y1 + oy, x1 - ox, y1 - oy, x2 + ox, y2 + oy, x2 - ox, y2 - oy))
+    for i in range(1, len(points) - 1):
+        (dx1, dy1), (dx2, dy2) = directions[i - 1], directions[i]
+        (nx1, ny1), (nx2, ny2) = normals[i - 1], normals[i]
+        side = -1 if dx1 * dy2 - dy1 * dx2 > 0 else 1
+        mx, my = nx1 + nx2, ny1 + ny2
+        length = (mx * mx + my * my) ** 0.5
+        if length < 1e-9:
+            mx, my, length = side * dx1, side * dy1, 1
+        mx, my = mx / length, my / length
+        cosine = mx * nx2 + my * ny2
+        x, y = points[i]
+        incoming, outgoing = 8 * i - 4, 8 * i  # the end of segment i - 1 and the start of segment i
+        if cosine >= 1 / miter_limit:
+            ox, oy = mx * half_width / cosine, my * half_width / cosine
+            segments[incoming:incoming + 4] = segments[outgoing:outgoing + 4] = (x + ox, y + oy, x - ox, y - oy)
+        else:
+            distance = -side * miter_limit * half_width
+            inner = 0 if side < 0 else 2
+            segments[incoming + inner:incoming + inner + 2] = segments[outgoing + inner:outgoing + inner + 2] = \
+                (x + mx * distance, y + my * distance)
+    return segments
+
+
+def _bevel_vertices_python(points, half_width):
+    """Same as _bevel_vertices, returns two flat lists."""
+    directions, normals = _normals_python(points)
+    segments = []
+    for (x1, y1), (x2, y2), (nx, ny) in zip(points, points[1:], normals):
+        ox, oy = nx * half_width, ny * half_width
+        segments.extend((x1 + ox, y1 + oy, x1 - ox, y1 - oy, x2 + ox, y2 + oy, x2 - ox, y2 - oy))
+    joins = []
+    for i in range(1, len(points) - 1):
+        (dx1, dy1), (dx2, dy2) = directions[i - 1], directions[i]
+        side = -1 if dx1 * dy2 - dy1 * dx2 > 0 else 1
+        x, y = points[i]
+        (nx1, ny1), (nx2, ny2) = normals[i - 1], normals[i]
+        joins.extend((x, y, x + side * nx1 * half_width, y + side * ny1 * half_width,
+                      x + side * nx2 * half_width, y + side * ny2 * half_width))
+    return segments, joins
+
+
+class Polyline(pyglet.shapes._ShapeBase):
+    _use_numpy = np is not None  # compute the geometry with NumPy, set to False to force the pure Python loop
+
+    def __init__(self, points, width=1, color=(255, 255, 255), opacity=255, join='miter', miter_limit=4,
+                 batch=None, group=None):
+        """Create a thick line through points.
+
+        :Parameters:
+            `points` : sequence
+                At least 2 points: (x, y) pairs, a flat sequence
+                [x1, y1, x2, y2...] or an (n, 2) NumPy array. They
+                are relative to the position of the polyline.
+            `width` : float
+                The width of the line.
+            `color` : (int, int, int)
+                The RGB color of the line, specified as a tuple of
+                three ints in the range of 0-255.
+            `opacity` : int
+                The transparency of the color, with a range of 0-255.
+                Defaults to 255 (no transparency).
+            `join` : str
+                'miter' or 'bevel', the shape of the joins.
+            `miter_limit` : float
+                With miter joins, the maximum distance of a join
+                corner from its point, in half widths. Joins
+                reaching further are beveled.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the polyline to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the polyline.
+        """
+        if join not in JOINS:
+            raise ValueError('join must be one of %s, not %r' % (JOINS, join))
+        self._width = width
+        self._rgb = color
+        self._opacity = opacity
+        self._join = join
+        self._miter_limit = miter_limit
+        self._points = self._to_points(points)
+
+        self._batch = batch or Batch()
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        count = len(self._points)
+        self._vertex_list = self._batch.add_indexed(_vertex_count(count, join), GL_TRIANGLES, self._group,
+                                                    _polyline_indices(count, join), 'v2f', 'c4B')
+        self._update_position()
+        self._update_color()
+
+    def _to_points(self, points, minimum=2):
+        if self._use_numpy:
+            points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        else:
+            points = list(points)
+            if points and not hasattr(points[0], '__len__'):  # flat sequence
+                points = list(zip(points[0::2], points[1::2]))
+            points = [tuple(point) for point in points]
+        if len(points) < minimum:
+            raise ValueError('a polyline needs at least %d points' % minimum)
+        return points
+
+    def _resize_vertex_list(self):
+        """Resize _vertex_list for the current number of points and join, keeping capacity as in v1 shapes."""
+        vertex_list = self._vertex_list
+        count = _vertex_count(len(self._points), self._join)
+        indices = _polyline_indices(len(self._points), self._join)
+        size = vertex_list.get_size()
+        capacity = _fit_capacity(size, count)
+        index_capacity = _fit_capacity(vertex_list.index_count, len(indices))
+        if capacity != size or index_capacity != vertex_list.index_count:
+            vertex_list.resize(capacity, index_capacity)
+        start = vertex_list.start
+        # unused indices point to the first vertex, making degenerate triangles
+        if self._use_numpy:
+            buffer = np.ctypeslib.as_array(vertex_list.indices)
+            buffer[:len(indices)] = indices
+            buffer[:len(indices)] += start
+            buffer[len(indices):] = start
+            np.ctypeslib.as_array(vertex_list.vertices)[count * 2:] = 0
+        else:
+            vertex_list.indices[:] = [start + i for i in indices] + [start] * (index_capacity - len(indices))
+            vertex_list.vertices[count * 2:] = (0,) * ((capacity - count) * 2)
+        if capacity != size:
+            self._update_color()
+
+    def _update_vertices(self, first, last):
+        """Recompute and upload the vertices that depend on the points first to last - 1."""
+        count = len(self._points)
+        if not self._visible:
+            vertex_count = _vertex_count(count, self._join)
+            self._vertex_list.vertices[:vertex_count * 2] = (0,) * (vertex_count * 2)
+            return
+        offset_x, offset_y = self._x - self._anchor_x, self._y - self._anchor_y
+        half_width = self._width / 2
+        # moving a point changes the joins of its neighbours, which depend on the points around them
+        context_first, context_last = max(first - 3, 0), min(last + 3, count)
+        if self._use_numpy:
+            points = self._points[context_first:context_last] + (offset_x, offset_y)
+            buffer = np.ctypeslib.as_array(self._vertex_list.vertices)
+        else:
+            points = [(x + offset_x, y + offset_y) for x, y in self._points[context_first:context_last]]
+            buffer = self._vertex_list.vertices
+
+        if self._join == 'miter':
+            # segment i ends at the joins of points i and i + 1, which depend on the points i - 1 to i + 2
+            segment_first, segment_last = max(first - 2, 0), min(last + 1, count - 1)
+            if self._use_numpy:
+                segments = _miter_vertices(points, half_width, self._miter_limit).reshape(-1)
+            else:
+                segments = _miter_vertices_python(points, half_width, self._miter_limit)
+            buffer[segment_first * 8:segment_last * 8] = \
+                segments[(segment_first - context_first) * 8:(segment_last - context_first) * 8]
+            return
+
+        # bevel: segment i joins points i and i + 1, join j is at point j + 1
+        segment_first, segment_last = max(first - 1, 0), min(last, count - 1)
+        join_first, join_last = max(first - 2, 0), min(last, count - 2)
+        if self._use_numpy:
+            segments, joins = _bevel_vertices(points, half_width)
+            segments, joins = segments.reshape(-1), joins.reshape(-1)
+        else:
+            segments, joins = _bevel_vertices_python(points, half_width)
+        buffer[segment_first * 8:segment_last * 8] = \
+            segments[(segment_first - context_first) * 8:(segment_last - context_first) * 8]
+        if join_last > join_first:
+            base = (count - 1) * 8  # joins are after the segments
+            buffer[base + join_first * 6:base + join_last * 6] = \
+                joins[(join_first - context_first) * 6:(join_last - context_first) * 6]
+
+    def _update_position(self):
+        self._update_vertices(0, len(self._points))
+
+    def _update_color(self):
+        colors = [*self._rgb, int(self._opacity)]
+        if self._use_numpy:
+            np.ctypeslib.as_array(self._vertex_list.colors).reshape(-1, 4)[:] = colors
+        else:
+            self._vertex_list.colors[:] = colors * self._vertex_list.get_size()
+
+    def set_points(self, start, points):
+        """Replace the points from index start with points, updating only the vertices around them.
+
+        The number of points does not change, points must fit after start.
+        """
+        points = self._to_points(points, minimum=0)
+        end = start + len(points)
+        if start < 0 or end > len(self._points):
+            raise IndexError('points %d to %d are out of the polyline' % (start, end - 1))
+        self._points[start:end] = points
+        self._update_vertices(start, end)
+
+    @property
+    def points(self):
+        """The points of the polyline, relative to its position.
+
+        Setting points can change their number, then the vertex list is resized.
+
+        :type: (n, 2) NumPy array, or list of (x, y) tuples without NumPy
+        """
+        return self._points
+
+    @points.setter
+    def points(self, values):
+        count = len(self._points)
+        self._points = self._to_points(values)
+        if len(self._points) != count:
+            self._resize_vertex_list()
+        self._update_position()
+
+    @property
+    def width(self):
+        """The width of the line.
+
+        :type: float
+        """
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        self._width = value
+        self._update_position()
+
+    @property
+    def join(self):
+        """The shape of the joins, 'miter' or 'bevel'.
+
+        :type: str
+        """
+        return self._join
+
+    @join.setter
+    def join(self, value):
+        if value not in JOINS:
+            raise ValueError('join must be one of %s, not %r' % (JOINS, value))
+        self._join = value
+        self._resize_vertex_list()
+        self._update_position()
+
+    @property
+    def miter_limit(self):
+        """The maximum distance of a miter join corner from its point, in half widths, beyond which it is beveled.
+
+        :type: float
+        """
+        return self._miter_limit
+
+    @miter_limit.setter
+    def miter_limit(self, value):
+        self._miter_limit = value
+        self._update_position()
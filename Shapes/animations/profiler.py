@@ -0,0 +1,161 @@
+"""
+Frame time profiler of EngineWindow
+
+A FrameProfiler attached to a window records, for each drawn frame, the time spent in update (and in the motion of
+each object), in vertex uploads of advanced shapes, in applying lazy shapes and in batch.draw. The last frames are kept
+in a ring buffer, can be shown as a graph over the window and exported to CSV or JSON. run_frames drives a window
+without the event loop, so frames can be collected on a hidden window, e.g. in CI:
+
+    window = EngineWindow(720, 480, batch=batch, visible=False)
+    profiler = FrameProfiler()
+    profiler.attach(window)
+    run_frames(window, 600)
+    profiler.to_csv('frames.csv')
+"""
+import collections
+import csv
+import json
+
+import pyglet
+
+import v1
+
+
+SECTIONS = ('update', 'motion', 'upload', 'flush', 'draw')  # columns always exported, in seconds
+
+
+class FrameProfiler():
+
+    def __init__(self, capacity=600, overlay=False, budget=1 / 60):
+        """Initialize a profiler keeping the times of the last capacity frames.
+
+        If overlay is True, the attached window draws a graph of the frame times over its content, one bar per frame,
+        red when the frame exceeds budget seconds, with the mean of each section.
+        """
+        self.capacity = capacity
+        self.overlay = overlay
+        self.budget = budget
+        self.frames = collections.deque(maxlen=capacity)  # dict section -> seconds, oldest frames dropped
+        self.frame_count = 0
+        self._current = {}
+        self._window = None
+        self._overlay_batch = None
+
+    def attach(self, window):
+        """Record the frames of an EngineWindow and the vertex uploads of advanced shapes."""
+        if self._window is not None:
+            self.detach()
+        self._window = window
+        window.profiler = self
+        v1.add_upload_timer(self._time_upload)
+
+    def detach(self):
+        """Stop recording. Other attached profilers keep recording."""
+        if self._window is not None and self._window.profiler is self:
+            self._window.profiler = None
+        self._window = None
+        v1.remove_upload_timer(self._time_upload)
+
+    def _time_upload(self, seconds):
+        self.add('upload', seconds)
+
+    def add(self, section, seconds):
+        """Add seconds to a section of the current frame."""
+        self._current[section] = self._current.get(section, 0) + seconds
+
+    def add_motion(self, key, seconds):
+        """Add seconds to the motion time of an object (or of a batch of objects) in the current frame."""
+        self.add('motion', seconds)
+        self.add('motion:' + str(key), seconds)
+
+    def end_frame(self):
+        """Store the current frame in the ring buffer and start the next one."""
+        frame = dict.fromkeys(SECTIONS, 0)
+        frame.update(self._current)
+        frame['frame'] = self.frame_count
+        self.frames.append(frame)
+        self.frame_count += 1
+        self._current = {}
+
+    def clear(self):
+        """Forget all recorded frames."""
+        self.frames.clear()
+        self._current = {}
+
+    def columns(self):
+        """Return the names of the recorded sections, main sections first then the motion of each object."""
+        keys = set()
+        for frame in self.frames:
+            keys.update(frame)
+        return ['frame'] + list(SECTIONS) + sorted(keys.difference(SECTIONS, ('frame',)))
+
+    def summary(self):
+        """Return a dict section -> (mean, maximum) in seconds over the recorded frames."""
+        frames = list(self.frames)
+        result = {}
+        for column in self.columns()[1:]:
+            values = [frame.get(column, 0) for frame in frames]
+            result[column] = (sum(values) / len(values), max(values)) if values else (0, 0)
+        return result
+
+    def to_csv(self, path):
+        """Write the recorded frames to a CSV file, one row per frame, times in seconds."""
+        columns = self.columns()
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+
+    def to_json(self, path):
+        """Write the recorded frames and their summary to a JSON file, times in seconds."""
+        with open(path, 'w') as file:
+            json.dump({'columns': self.columns(), 'frames': list(self.frames),
+                       'summary': {key: {'mean': mean, 'max': maximum}
+                                   for key, (mean, maximum) in self.summary().items()}}, file, indent=1)
+
+    def _build_overlay(self, window):
+        self._overlay_batch = pyglet.graphics.Batch()
+        # one vertical line per frame, plus the budget line
+        self._bars = self._overlay_batch.add((self.capacity + 1) * 2, pyglet.gl.GL_LINES, None, 'v2f', 'c4B')
+        self._label = pyglet.text.Label('', font_size=9, x=4, y=window.height - 4, anchor_y='top', multiline=True,
+                                        width=window.width, batch=self._overlay_batch, color=(255, 255, 255, 200))
+
+    def draw_overlay(self, window):
+        """Draw the graph of the recorded frame times at the bottom of window, height 2 * budget is 100 pixels."""
+        if self._overlay_batch is None:
+            self._build_overlay(window)
+        scale = 50 / self.budget
+        vertices = [0.0] * ((self.capacity + 1) * 4)
+        colors = [0] * ((self.capacity + 1) * 8)
+        step = window.width / self.capacity
+        for i, frame in enumerate(self.frames):
+            total = frame['update'] + frame['flush'] + frame['draw']
+            x = i * step
+            vertices[i * 4:i * 4 + 4] = x, 0, x, total * scale
+            colors[i * 8:i * 8 + 8] = ((220, 60, 60, 200) if total > self.budget else (60, 200, 60, 200)) * 2
+        vertices[-4:] = 0, 50, window.width, 50
+        colors[-8:] = (255, 255, 255, 120) * 2
+        self._bars.vertices[:] = vertices
+        self._bars.colors[:] = colors
+        self._label.y = window.height - 4
+        self._label.text = '\n'.join('%s %.2f ms' % (section, mean * 1000)
+                                     for section, (mean, _) in self.summary().items() if ':' not in section)
+        self._overlay_batch.draw()
+
+
+def run_frames(window, frames, dt=1 / 60):
+    """Update and draw window frames times without the event loop, advancing time by dt each frame.
+
+    The window can be hidden (visible=False), nothing needs to be shown on screen.
+    """
+    for _ in range(frames):
+        window.switch_to()
+        window.dispatch_events()
+        if window.fixed_step is not None:
+            window.tick(dt)
+        else:
+            window.update(dt)
+        # outside the event loop, window.dispatch_event only queues events, the handlers are called directly
+        pyglet.event.EventDispatcher.dispatch_event(window, 'on_draw')
+        window.flip()
+
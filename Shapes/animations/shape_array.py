@@ -0,0 +1,618 @@
+"""
+Shape arrays: many advanced shapes of the same kind updated in one array operation.
+
+Every shape of a ShapeArray shares one vertex list, and its properties (x, y, rotation,
+anchors, color...) are stored as NumPy arrays with one entry per shape. Modify the arrays
+in place and call update() (or update_colors()) once per frame to recompute and upload
+the vertices of every shape at once.
+
+The vertices generated match the ones of the equivalent shapes in v1.py, except that open
+CircleArray sectors keep a degenerate closing triangle so closed can change without resizing.
+"""
+import math
+
+import numpy as np
+import pyglet
+from pyglet.gl import GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+from pyglet.gl import GL_TRIANGLES
+from pyglet.graphics import Batch
+
+from v1 import get_shape_group
+
+
+def _as_column(value, count, dtype=np.float64):
+    """Return a new array of length count, filled from a scalar or a sequence of count values."""
+    array = np.empty(count, dtype=dtype)
+    array[:] = value
+    return array
+
+
+class _ShapeArrayBase:
+    """Base class for Shape Arrays."""
+
+    _vertices_per_shape = 0
+
+    def _init_arrays(self, count, x, y, rotation, color, opacity, batch, group):
+        self._count = count
+        self._x = _as_column(x, count)
+        self._y = _as_column(y, count)
+        self._rotation = _as_column(rotation, count)
+        self._anchor_x = np.zeros(count)
+        self._anchor_y = np.zeros(count)
+        self._anchor_position_x = np.zeros(count)
+        self._anchor_position_y = np.zeros(count)
+        self._visible = np.ones(count, dtype=bool)
+        self._colors = np.empty((count, 4), dtype=np.uint8)
+        self._colors[:, :3] = color
+        self._colors[:, 3] = opacity
+
+        self._batch = batch or Batch()
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._vertex_list = self._batch.add(count * self._vertices_per_shape, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+
+    def __len__(self):
+        return self._count
+
+    def _calculate_vertices(self):
+        """Return an array (count, vertices_per_shape, 2) with the vertices of every shape before rotation and translation."""
+        raise NotImplementedError
+
+    def update(self):
+        """Recompute the vertices of every shape and upload them to the vertex list."""
+        local = self._calculate_vertices()
+        rotation = np.radians(self._rotation)[:, None]
+        cr, sr = np.cos(rotation), np.sin(rotation)
+        x = local[:, :, 0] - self._anchor_x[:, None]
+        y = local[:, :, 1] - self._anchor_y[:, None]
+        vertices = np.empty(local.shape, dtype=np.float32)
+        vertices[:, :, 0] = cr * x - sr * y + (self._anchor_x + self._x - self._anchor_position_x)[:, None]
+        vertices[:, :, 1] = sr * x + cr * y + (self._anchor_y + self._y - self._anchor_position_y)[:, None]
+        vertices[~self._visible] = 0
+        np.ctypeslib.as_array(self._vertex_list.vertices)[:] = vertices.ravel()
+
+    def update_colors(self):
+        """Upload the colors of every shape to the vertex list."""
+        colors = np.ctypeslib.as_array(self._vertex_list.colors).reshape(self._count, self._vertices_per_shape, 4)
+        colors[:] = self._colors[:, None, :]
+
+    def draw(self):
+        """Draw all the shapes in the array.
+
+        Using this method is not recommended. Instead, add the
+        shapes to a `pyglet.graphics.Batch` for efficient rendering.
+        """
+        self._group.set_state_recursive()
+        self._vertex_list.draw(GL_TRIANGLES)
+        self._group.unset_state_recursive()
+
+    def delete(self):
+        self._vertex_list.delete()
+        self._vertex_list = None
+
+    @property
+    def x(self):
+        """X coordinates of the shapes.
+
+        :type: numpy.ndarray
+        """
+        return self._x
+
+    @x.setter
+    def x(self, values):
+        self._x[:] = values
+
+    @property
+    def y(self):
+        """Y coordinates of the shapes.
+
+        :type: numpy.ndarray
+        """
+        return self._y
+
+    @y.setter
+    def y(self, values):
+        self._y[:] = values
+
+    @property
+    def rotation(self):
+        """Rotations of the shapes in degrees.
+
+        :type: numpy.ndarray
+        """
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, values):
+        self._rotation[:] = values
+
+    @property
+    def anchor_x(self):
+        """X coordinates of the anchor rotation points.
+
+        :type: numpy.ndarray
+        """
+        return self._anchor_x
+
+    @anchor_x.setter
+    def anchor_x(self, values):
+        self._anchor_x[:] = values
+
+    @property
+    def anchor_y(self):
+        """Y coordinates of the anchor rotation points.
+
+        :type: numpy.ndarray
+        """
+        return self._anchor_y
+
+    @anchor_y.setter
+    def anchor_y(self, values):
+        self._anchor_y[:] = values
+
+    @property
+    def anchor_position_x(self):
+        """X coordinates of the anchor position points.
+
+        :type: numpy.ndarray
+        """
+        return self._anchor_position_x
+
+    @anchor_position_x.setter
+    def anchor_position_x(self, values):
+        self._anchor_position_x[:] = values
+
+    @property
+    def anchor_position_y(self):
+        """Y coordinates of the anchor position points.
+
+        :type: numpy.ndarray
+        """
+        return self._anchor_position_y
+
+    @anchor_position_y.setter
+    def anchor_position_y(self, values):
+        self._anchor_position_y[:] = values
+
+    @property
+    def visible(self):
+        """Whether each shape is drawn or not.
+
+        :type: numpy.ndarray
+        """
+        return self._visible
+
+    @visible.setter
+    def visible(self, values):
+        self._visible[:] = values
+
+    @property
+    def colors(self):
+        """RGBA colors of the shapes, an array of shape (count, 4) with values in the range of 0-255.
+
+        :type: numpy.ndarray
+        """
+        return self._colors
+
+    @colors.setter
+    def colors(self, values):
+        self._colors[:] = values
+
+    @property
+    def color(self):
+        """RGB colors of the shapes, an array of shape (count, 3).
+
+        :type: numpy.ndarray
+        """
+        return self._colors[:, :3]
+
+    @color.setter
+    def color(self, values):
+        self._colors[:, :3] = values
+
+    @property
+    def opacity(self):
+        """Opacities of the shapes.
+
+        :type: numpy.ndarray
+        """
+        return self._colors[:, 3]
+
+    @opacity.setter
+    def opacity(self, values):
+        self._colors[:, 3] = values
+
+
+class CircleArray(_ShapeArrayBase):
+    def __init__(self, count, x, y, radius, rotation=0, angle=360, start_angle=0, segments=None, color=(255, 255, 255),
+                 opacity=255, closed=False, batch=None, group=None):
+        """Create count circles (or sectors if angle is less than 360) sharing one vertex list.
+
+        All circles have the same segments, angle, start_angle and closed values.
+
+        :Parameters:
+            `count` : int
+                Number of circles.
+            `x` : float or sequence of floats
+                X coordinates of the circles.
+            `y` : float or sequence of floats
+                Y coordinates of the circles.
+            `radius` : float or sequence of floats
+                The radius of the circles.
+            `rotation` : float or sequence of floats
+                The rotation of the circles.
+            `angle` : float
+                The angle of the sectors, in degrees. Defaults to 360,
+                a full circle.
+            `start_angle` : float
+                The start angle of the sectors, in degrees. Defaults to 0.
+            `segments` : int
+                You can optionally specify how many distinct triangles
+                the circles should be made from. If not specified it will
+                be automatically calculated based using the formula:
+                `max(14, int(max(radius) / 1.25))`.
+            `color` : (int, int, int)
+                The RGB color of the circles.
+            `opacity` : int
+                The transparecy of the circles, with a range of 0-255.
+            `closed` : bool
+                If True, the ends of the sectors will be connected.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the circles to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the circles.
+        """
+        self._radius = _as_column(radius, count)
+        self._segments = segments or max(14, int(self._radius.max(initial=0) / 1.25))
+        self._angle = angle
+        self._start_angle = start_angle
+        self._closed = closed
+        self._vertices_per_shape = (self._segments + 1) * 3
+        self._update_template()
+        self._init_arrays(count, x, y, rotation, color, opacity, batch, group)
+        self.update()
+        self.update_colors()
+
+    def _update_template(self):
+        start_angle = math.radians(self._start_angle)
+        tau_segs = math.radians(self._angle) / self._segments
+        angles = np.arange(self._segments + 1) * tau_segs + start_angle
+        points = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        center = np.zeros((self._segments, 2))
+        triangles = np.stack([points[:-1], center, points[1:]], axis=1).reshape(-1, 2)
+        if self._closed:
+            last = np.stack([points[-1], [0, 0], points[0]])
+        else:
+            last = np.stack([points[-1], points[-1], points[-1]])
+        self._template = np.concatenate([triangles, last])
+
+    def _calculate_vertices(self):
+        return self._template[None, :, :] * self._radius[:, None, None]
+
+    @property
+    def radius(self):
+        """The radius of the circles.
+
+        :type: numpy.ndarray
+        """
+        return self._radius
+
+    @radius.setter
+    def radius(self, values):
+        self._radius[:] = values
+
+    @property
+    def angle(self):
+        """The angle of the sectors in degrees (360 = full circle).
+
+        :type: float
+        """
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        self._angle = value
+        self._update_template()
+
+    @property
+    def start_angle(self):
+        """The start angle of the sectors in degrees.
+
+        :type: float
+        """
+        return self._start_angle
+
+    @start_angle.setter
+    def start_angle(self, value):
+        self._start_angle = value
+        self._update_template()
+
+    @property
+    def closed(self):
+        """Whether the sectors are closed or not.
+
+        :type: bool
+        """
+        return self._closed
+
+    @closed.setter
+    def closed(self, value):
+        self._closed = value
+        self._update_template()
+
+
+class EllipseArray(_ShapeArrayBase):
+    def __init__(self, count, x, y, a, b, rotation=0, segments=None, color=(255, 255, 255), opacity=255,
+                 batch=None, group=None):
+        """Create count ellipses sharing one vertex list.
+
+        :Parameters:
+            `count` : int
+                Number of ellipses.
+            `x` : float or sequence of floats
+                X coordinates of the ellipses.
+            `y` : float or sequence of floats
+                Y coordinates of the ellipses.
+            `a` : float or sequence of floats
+                Semi-major axes of the ellipses.
+            `b`: float or sequence of floats
+                Semi-minor axes of the ellipses.
+            `rotation` : float or sequence of floats
+                The rotation of the ellipses.
+            `segments` : int
+                Number of triangles of every ellipse. If not specified it will
+                be calculated with `max(14, int(max(a, b) / 1.25))`.
+            `color` : (int, int, int)
+                The RGB color of the ellipses.
+            `opacity` : int
+                The transparecy of the ellipses, with a range of 0-255.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the ellipses to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the ellipses.
+        """
+        self._axes = np.empty((count, 2))
+        self._axes[:, 0] = a
+        self._axes[:, 1] = b
+        self._segments = segments or max(14, int(self._axes.max(initial=0) / 1.25))
+        self._vertices_per_shape = self._segments * 3
+        angles = np.arange(self._segments) * (math.pi * 2 / self._segments)
+        points = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        center = np.zeros((self._segments, 2))
+        self._template = np.stack([center, np.roll(points, 1, axis=0), points], axis=1).reshape(-1, 2)
+        self._init_arrays(count, x, y, rotation, color, opacity, batch, group)
+        self.update()
+        self.update_colors()
+
+    def _calculate_vertices(self):
+        return self._template[None, :, :] * self._axes[:, None, :]
+
+    @property
+    def a(self):
+        """The semi-major axes of the ellipses.
+
+        :type: numpy.ndarray
+        """
+        return self._axes[:, 0]
+
+    @a.setter
+    def a(self, values):
+        self._axes[:, 0] = values
+
+    @property
+    def b(self):
+        """The semi-minor axes of the ellipses.
+
+        :type: numpy.ndarray
+        """
+        return self._axes[:, 1]
+
+    @b.setter
+    def b(self, values):
+        self._axes[:, 1] = values
+
+
+class RectangleArray(_ShapeArrayBase):
+    _vertices_per_shape = 6
+    _template = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, -0.5], [-0.5, 0.5], [0.5, 0.5]])
+
+    def __init__(self, count, x, y, width, height, rotation=0, color=(255, 255, 255), opacity=255,
+                 batch=None, group=None):
+        """Create count rectangles sharing one vertex list.
+
+        The (x, y) coordinates of every rectangle are in its center.
+
+        :Parameters:
+            `count` : int
+                Number of rectangles.
+            `x` : float or sequence of floats
+                X coordinates of the rectangles.
+            `y` : float or sequence of floats
+                Y coordinates of the rectangles.
+            `width` : float or sequence of floats
+                The width of the rectangles.
+            `height` : float or sequence of floats
+                The height of the rectangles.
+            `rotation` : float or sequence of floats
+                The rotation of the rectangles.
+            `color` : (int, int, int)
+                The RGB color of the rectangles.
+            `opacity` : int
+                The transparecy of the rectangles, with a range of 0-255.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the rectangles to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the rectangles.
+        """
+        self._size = np.empty((count, 2))
+        self._size[:, 0] = width
+        self._size[:, 1] = height
+        self._init_arrays(count, x, y, rotation, color, opacity, batch, group)
+        self.update()
+        self.update_colors()
+
+    def _calculate_vertices(self):
+        return self._template[None, :, :] * self._size[:, None, :]
+
+    @property
+    def width(self):
+        """The width of the rectangles.
+
+        :type: numpy.ndarray
+        """
+        return self._size[:, 0]
+
+    @width.setter
+    def width(self, values):
+        self._size[:, 0] = values
+
+    @property
+    def height(self):
+        """The height of the rectangles.
+
+        :type: numpy.ndarray
+        """
+        return self._size[:, 1]
+
+    @height.setter
+    def height(self, values):
+        self._size[:, 1] = values
+
+
+class TriangleArray(_ShapeArrayBase):
+    _vertices_per_shape = 3
+
+    def __init__(self, count, x, y, x2, y2, x3, y3, rotation=0, color=(255, 255, 255), opacity=255,
+                 relative_points=False, batch=None, group=None):
+        """Create count triangles sharing one vertex list.
+
+        The anchor point of every triangle defaults to its first vertex point.
+
+        :Parameters:
+            `count` : int
+                Number of triangles.
+            `x`, `y` : float or sequence of floats
+                The first vertex of the triangles.
+            `x2`, `y2` : float or sequence of floats
+                The second vertex of the triangles.
+            `x3`, `y3` : float or sequence of floats
+                The third vertex of the triangles.
+            `rotation` : float or sequence of floats
+                The rotation of the triangles.
+            `color` : (int, int, int)
+                The RGB color of the triangles.
+            `opacity` : int
+                The transparecy of the triangles, with a range of 0-255.
+            `relative_points` : bool
+                if True, (x2, y3) and (x3, y3) values are read as an
+                offset from (x, y). Else, read as absolute coordinates.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the triangles to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the triangles.
+        """
+        self._init_arrays(count, x, y, rotation, color, opacity, batch, group)
+        self._points = np.zeros((count, 3, 2))
+        self._points[:, 1, 0] = x2
+        self._points[:, 1, 1] = y2
+        self._points[:, 2, 0] = x3
+        self._points[:, 2, 1] = y3
+        if not relative_points:
+            self._points[:, 1:, 0] -= self._x[:, None]
+            self._points[:, 1:, 1] -= self._y[:, None]
+        self.update()
+        self.update_colors()
+
+    def _calculate_vertices(self):
+        return self._points
+
+    @property
+    def points(self):
+        """Vertices of the triangles relative to (x, y), an array of shape (count, 3, 2).
+
+        The first vertex is always (0, 0).
+
+        :type: numpy.ndarray
+        """
+        return self._points
+
+
+class ShapeSystem:
+    def __init__(self, batch=None):
+        """Group several shape arrays drawn in the same batch, and update all of them at once.
+
+        :Parameters:
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch that shape arrays created with add_* will use.
+        """
+        self.batch = batch or Batch()
+        self.arrays = []
+
+    def add(self, shape_array):
+        """Add an existing shape array to the system and return it."""
+        self.arrays.append(shape_array)
+        return shape_array
+
+    def add_circles(self, count, x, y, radius, **kwargs):
+        return self.add(CircleArray(count, x, y, radius, batch=self.batch, **kwargs))
+
+    def add_ellipses(self, count, x, y, a, b, **kwargs):
+        return self.add(EllipseArray(count, x, y, a, b, batch=self.batch, **kwargs))
+
+    def add_rectangles(self, count, x, y, width, height, **kwargs):
+        return self.add(RectangleArray(count, x, y, width, height, batch=self.batch, **kwargs))
+
+    def add_triangles(self, count, x, y, x2, y2, x3, y3, **kwargs):
+        return self.add(TriangleArray(count, x, y, x2, y2, x3, y3, batch=self.batch, **kwargs))
+
+    def update(self):
+        """Recompute and upload the vertices of every shape array."""
+        for shape_array in self.arrays:
+            shape_array.update()
+
+    def update_colors(self):
+        """Upload the colors of every shape array."""
+        for shape_array in self.arrays:
+            shape_array.update_colors()
+
+    def draw(self):
+        self.batch.draw()
+
+    def delete(self):
+        for shape_array in self.arrays:
+            shape_array.delete()
+        self.arrays = []
+
+
+if __name__ == "__main__":
+    import random
+
+    window = pyglet.window.Window(1000, 1000, caption="ShapeSystem")
+    system = ShapeSystem()
+    num_particles = 10000
+    circles = system.add_circles(num_particles, [random.uniform(0, window.width) for _ in range(num_particles)],
+                                 [random.uniform(0, window.height) for _ in range(num_particles)], 4, segments=6,
+                                 opacity=180)
+    circles.color = [(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255)) for _ in range(num_particles)]
+    squares = system.add_rectangles(1000, [random.uniform(0, window.width) for _ in range(1000)],
+                                    [random.uniform(0, window.height) for _ in range(1000)], 12, 12, color=(255, 255, 0))
+    system.update_colors()
+    vx = np.random.uniform(-100, 100, num_particles)
+    vy = np.random.uniform(-100, 100, num_particles)
+    fps_display = pyglet.window.FPSDisplay(window)
+
+    @window.event
+    def on_draw():
+        window.clear()
+        system.draw()
+        fps_display.draw()
+
+    def update(dt):
+        circles.x += vx * dt
+        circles.y += vy * dt
+        circles.x %= window.width
+        circles.y %= window.height
+        squares.rotation += dt * 90
+        system.update()
+
+    pyglet.clock.schedule_interval(update, 1 / 120.0)
+    pyglet.app.run()
@@ -0,0 +1,101 @@
+"""
+Check the anchor markers shared by the v1 shapes of a batch: slot reuse, capacity doubling, and the vertices and colors
+of the markers.
+
+Run with pytest or directly with python.
+"""
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex lists are tested, no window needed
+
+import pytest
+
+import v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_batch import StubBatch
+
+
+def marker_vertices(markers, index):
+    return list(markers._vertex_list.vertices[index * 12:index * 12 + 12])
+
+
+def marker_colors(markers, index):
+    return list(markers._vertex_list.colors[index * 24:index * 24 + 24])
+
+
+def square(x, y, s=v1._AnchorMarkers._half_size):
+    """The two triangles of a marker centered on (x, y)."""
+    return [x - s, y - s, x + s, y - s, x + s, y + s, x - s, y - s, x - s, y + s, x + s, y + s]
+
+
+def test_markers_are_placed_and_colored_like_their_shape():
+    batch = StubBatch()
+    shape = v1.Rectangle(50, 40, 30, 20, color=(200, 100, 30), opacity=180, batch=batch)
+    shape.anchor_x, shape.anchor_y = 3, 5
+    shape.anchor_visible = True
+    shape.anchor_position_visible = True
+    markers = v1._anchor_markers[batch]
+    rotation, position = shape._anchor_rotation_marker, shape._anchor_position_marker
+    assert rotation != position
+    assert marker_vertices(markers, rotation) == pytest.approx(square(50 + 3, 40 + 5))
+    assert marker_vertices(markers, position) == pytest.approx(square(50, 40))
+    inverted = [55, 155, 225, 180] * 6
+    assert marker_colors(markers, rotation) == inverted
+    assert marker_colors(markers, position) == inverted
+
+    shape.position = (80, 10)
+    shape.color = (0, 255, 10)
+    shape.opacity = 90
+    assert marker_vertices(markers, position) == pytest.approx(square(80, 10))
+    assert marker_vertices(markers, rotation) == pytest.approx(square(80 + 3, 10 + 5))
+    assert marker_colors(markers, rotation) == [255, 0, 245, 90] * 6
+
+
+def test_hidden_and_deleted_markers_free_their_slot():
+    batch = StubBatch()
+    first = v1.Circle(20, 20, 5, anchor_visible=True, batch=batch)
+    markers = v1._anchor_markers[batch]
+    slots = {first._anchor_rotation_marker, first._anchor_position_marker}
+    assert len(slots) == 2
+
+    hidden = first._anchor_position_marker
+    first.anchor_position_visible = False
+    assert first._anchor_position_marker is None
+    assert not any(marker_vertices(markers, hidden))  # hidden: a degenerate square
+    second = v1.Circle(60, 30, 5, batch=batch)
+    second.anchor_position_visible = True
+    assert second._anchor_position_marker == hidden  # the free slot is used first
+    assert marker_vertices(markers, hidden) == pytest.approx(square(60, 30))
+
+    rotation = first._anchor_rotation_marker
+    first.delete()
+    assert not any(marker_vertices(markers, rotation))
+    third = v1.Circle(90, 30, 5, batch=batch)
+    third.anchor_visible = True
+    assert third._anchor_rotation_marker == rotation
+    assert markers._capacity == 16  # no slot was lost
+    assert sorted(markers._free) == sorted(set(range(16)) - {hidden, rotation})
+
+
+def test_capacity_doubles_keeping_the_markers():
+    batch = StubBatch()
+    shapes = []
+    for i in range(40):
+        shape = v1.Circle(i * 10, i * 5, 3, batch=batch)
+        shape.anchor_position_visible = True
+        shapes.append(shape)
+        markers = v1._anchor_markers[batch]
+        assert markers._capacity == (16 if i < 16 else 32 if i < 32 else 64)
+        assert markers._vertex_list.get_size() == markers._capacity * 6
+    assert sorted(shape._anchor_position_marker for shape in shapes) == list(range(40))
+    for i, shape in enumerate(shapes):  # markers added before a resize are kept
+        assert marker_vertices(markers, shape._anchor_position_marker) == pytest.approx(square(i * 10, i * 5))
+    for index in markers._free:  # slots never used are hidden, whatever the resize left in them
+        assert not any(marker_vertices(markers, index))
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
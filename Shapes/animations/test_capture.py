@@ -0,0 +1,145 @@
+"""
+Check FrameCapture and save_window: pipelined and synchronous pixels, dropped frames and closing.
+
+Run with pytest or directly with python. Windows are created in pyglet's headless (EGL) mode.
+"""
+import ctypes.util
+import gc
+import os
+import sys
+import threading
+import weakref
+
+import pyglet
+pyglet.options['shadow_window'] = False
+if ctypes.util.find_library('EGL'):
+    pyglet.options['headless'] = True  # hidden windows without a display, see conftest.py
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import improved_shapes
+from capture import FrameCapture
+
+RED, GREEN, BLUE = (255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255)
+
+
+def make_window():
+    try:
+        return pyglet.window.Window(32, 24, visible=False)
+    except Exception as exception:  # no EGL, or pyglet.window imported before the headless option was set
+        pytest.skip('no headless window: %s' % exception)
+
+
+def fill(window, color):
+    """Clear window with color, its bottom row with blue, to tell the image's top from its bottom."""
+    window.switch_to()
+    gl = pyglet.gl
+    gl.glClearColor(*(c / 255 for c in color))
+    window.clear()
+    gl.glEnable(gl.GL_SCISSOR_TEST)
+    gl.glScissor(0, 0, window.width, 1)
+    gl.glClearColor(0, 0, 1, 1)
+    window.clear()
+    gl.glDisable(gl.GL_SCISSOR_TEST)
+
+
+def corners(image):
+    return image.getpixel((0, 0)), image.getpixel((0, image.height - 1))
+
+
+@pytest.mark.parametrize('pbo', [True, False])
+def test_captured_pixels(pbo):
+    window = make_window()
+    try:
+        images = []
+        capture = FrameCapture(window.width, window.height, pbo=pbo)
+        fill(window, RED)
+        capture.capture(callback=lambda image: images.append(image.copy()))
+        if pbo:
+            capture._jobs.join()
+            assert images == []  # pipelined: the pixels wait in a PBO until the next capture
+        fill(window, GREEN)
+        capture.capture(callback=lambda image: images.append(image.copy()))
+        capture.close()
+        assert [corners(image) for image in images] == [(RED, BLUE), (GREEN, BLUE)]
+        assert (capture.captured_frames, capture.dropped_frames) == (2, 0)
+    finally:
+        window.close()
+
+
+def test_full_pool_drops_frames():
+    window = make_window()
+    try:
+        release = threading.Event()
+        images = []
+
+        def slow_callback(image):
+            release.wait(5)  # keeps the only buffer busy
+            images.append(image.copy())
+
+        capture = FrameCapture(window.width, window.height, pbo=False, buffers=1, workers=1, drop=True)
+        fill(window, RED)
+        capture.capture(callback=slow_callback)
+        fill(window, GREEN)
+        capture.capture(callback=slow_callback)
+        capture.capture(callback=slow_callback)
+        assert (capture.captured_frames, capture.dropped_frames) == (3, 2)
+        release.set()
+        capture.close()
+        assert [corners(image) for image in images] == [(RED, BLUE)]
+    finally:
+        window.close()
+
+
+def test_close_without_context_drops_the_pending_frame():
+    window = make_window()
+    images = []
+    capture = FrameCapture(window.width, window.height)
+    fill(window, RED)
+    capture.capture(callback=lambda image: images.append(image.copy()))
+    fill(window, GREEN)
+    capture.capture(callback=lambda image: images.append(image.copy()))  # hands the red frame to the encoders
+    window.close()
+    capture.close(save_pending=False)  # no OpenGL call: the green frame in its PBO is lost
+    assert [corners(image) for image in images] == [(RED, BLUE)]
+    assert capture.dropped_frames == 1
+    assert not any(worker.is_alive() for worker in capture._workers)
+
+
+def test_save_window(tmp_path):
+    window = make_window()
+    try:
+        fill(window, RED)
+        improved_shapes.save_window(window, str(tmp_path / 'sync.png'))
+        with Image.open(tmp_path / 'sync.png') as image:
+            assert corners(image) == (RED, BLUE)
+
+        fill(window, GREEN)
+        improved_shapes.save_window(window, str(tmp_path / 'first.png'), pipelined=True)
+        fill(window, RED)
+        improved_shapes.save_window(window, str(tmp_path / 'second.png'), pipelined=True)
+        improved_shapes.close_window_capture(window)
+        with Image.open(tmp_path / 'first.png') as first, Image.open(tmp_path / 'second.png') as second:
+            assert (corners(first), corners(second)) == ((GREEN, BLUE), (RED, BLUE))
+        assert window not in improved_shapes._window_captures
+    finally:
+        window.close()
+
+
+def test_save_window_keeps_neither_the_window_nor_its_capture_alive(tmp_path):
+    window = make_window()
+    fill(window, RED)
+    improved_shapes.save_window(window, str(tmp_path / 'pending.png'), pipelined=True)
+    capture = improved_shapes._window_captures[window].capture
+    window_ref = weakref.ref(window)
+    del window  # dropped without being closed
+    gc.collect()
+    assert window_ref() is None
+    assert not any(worker.is_alive() for worker in capture._workers)
+    assert capture.dropped_frames == 1
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
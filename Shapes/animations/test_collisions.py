@@ -0,0 +1,130 @@
+"""
+Check CollisionSystem against a brute-force pass over every pair of objects.
+
+Run with pytest or directly with python.
+"""
+import random
+import sys
+
+import pytest
+
+from window_engine import CollisionSystem, EngineObject
+
+
+class Point():
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def circle_hits_circle(c1, c2):
+    (x1, y1, r1), (x2, y2, r2) = c1, c2
+    return (x2 - x1) ** 2 + (y2 - y1) ** 2 <= (r1 + r2) ** 2
+
+
+def square_hits_square(s1, s2):
+    (x1, y1, w1, h1), (x2, y2, w2, h2) = s1, s2
+    return max(x1, x2) <= min(x1 + w1, x2 + w2) and max(y1, y2) <= min(y1 + h1, y2 + h2)
+
+
+def circle_hits_square(circle, square):
+    cx, cy, r = circle
+    x, y, w, h = square
+    if x - r <= cx <= x + w + r and y <= cy <= y + h or x <= cx <= x + w and y - r <= cy <= y + h + r:
+        return True
+    return any((cx - px) ** 2 + (cy - py) ** 2 <= r * r for px in (x, x + w) for py in (y, y + h))
+
+
+def brute_force_hit(obj, other):
+    x, y = obj.get_position()
+    ox, oy = other.get_position()
+    circles = [(x + dx, y + dy, r) for dx, dy, r in obj.hitboxes_circle]
+    squares = [(x + dx, y + dy, w, h) for dx, dy, w, h in obj.hitboxes_square]
+    other_circles = [(ox + dx, oy + dy, r) for dx, dy, r in other.hitboxes_circle]
+    other_squares = [(ox + dx, oy + dy, w, h) for dx, dy, w, h in other.hitboxes_square]
+    return (any(circle_hits_circle(c, o) for c in circles for o in other_circles) or
+            any(square_hits_square(s, o) for s in squares for o in other_squares) or
+            any(circle_hits_square(c, s) for c in circles for s in other_squares) or
+            any(circle_hits_square(c, s) for c in other_circles for s in squares))
+
+
+def brute_force_pairs(objects, callbacks):
+    """Every overlapping pair with a callback, ordered as its callback expects, or unordered within a category."""
+    pairs = set()
+    for i, first in enumerate(objects):
+        for second in objects[i + 1:]:
+            obj, other = first, second
+            if (obj.category, other.category) not in callbacks:
+                if (other.category, obj.category) not in callbacks:
+                    continue
+                obj, other = other, obj
+            if brute_force_hit(obj, other):
+                pairs.add(frozenset((obj, other)) if obj.category == other.category else (obj, other))
+    return pairs
+
+
+def random_objects(rng, count):
+    objects = []
+    for i in range(count):
+        kind = rng.randrange(4)
+        large = rng.random() < 0.05  # spans several cells
+        size = rng.uniform(40, 160) if large else rng.uniform(3, 25)
+        circles, squares = [], []
+        if kind in (0, 2):
+            circles.append((rng.uniform(-10, 10), rng.uniform(-10, 10), size / 2))
+        if kind in (1, 2):
+            squares.append((rng.uniform(-10, 10), rng.uniform(-10, 10), size, rng.uniform(0.3, 1.5) * size))
+        # kind 3: no hitbox
+        obj = EngineObject(category=rng.choice(('ship', 'rock', 'bullet', 'scenery')), shapes=Point(
+            rng.uniform(-50, 850), rng.uniform(-50, 650)), hitboxes_circle=circles, hitboxes_square=squares)
+        objects.append(obj)
+    return objects
+
+
+@pytest.mark.parametrize('cell_size', [16, 64, 200])
+def test_find_pairs_matches_brute_force(cell_size):
+    rng = random.Random(16)
+    objects = random_objects(rng, 800)
+    collisions = CollisionSystem(cell_size)
+    for pair in (('ship', 'rock'), ('rock', 'rock'), ('bullet', 'ship')):  # scenery has no callback
+        collisions.on_collision(*pair, lambda obj, other, window: None)
+    pairs = collisions.find_pairs(objects)
+    assert len(pairs) == len(set(pairs))  # each pair once, even when the objects share several cells
+    found = {frozenset(pair) if pair[0].category == pair[1].category else pair for pair in pairs}
+    assert found == brute_force_pairs(objects, collisions._callbacks)
+    kinds = {(bool(obj.hitboxes_circle), bool(other.hitboxes_circle)) for obj, other in pairs}
+    assert len(kinds) == 4  # the scene has circle/circle, square/square and mixed overlaps
+    assert not any('scenery' in (obj.category, other.category) for obj, other in pairs)
+
+
+def test_update_calls_each_callback_once_per_pair():
+    rng = random.Random(17)
+    objects = random_objects(rng, 300)
+    collisions = CollisionSystem()
+    calls = []
+    collisions.on_collision('ship', 'rock', lambda obj, other, window: calls.append(('ship hit', obj, other, window)))
+    collisions.on_collision('bullet', 'ship', lambda obj, other, window: calls.append(('shot', obj, other, window)))
+    window = object()
+    collisions.update(objects, window)
+    expected = brute_force_pairs(objects, collisions._callbacks)
+    assert expected and len(calls) == len(expected)
+    assert {(obj, other) for name, obj, other, w in calls} == expected
+    for name, obj, other, w in calls:
+        assert w is window
+        assert (obj.category, other.category) == {'ship hit': ('ship', 'rock'), 'shot': ('bullet', 'ship')}[name]
+
+
+def test_objects_spanning_cells_and_touching_hitboxes():
+    collisions = CollisionSystem(cell_size=10)
+    collisions.on_collision('a', 'b', lambda obj, other, window: None)
+    wide = EngineObject(category='a', shapes=Point(0, 0), hitboxes_square=[(0, 0, 95, 5)])
+    far_end = EngineObject(category='b', shapes=Point(90, 0), hitboxes_circle=[(0, 9, 4)])  # touches the square
+    apart = EngineObject(category='b', shapes=Point(50, 0), hitboxes_circle=[(0, 10, 4)])
+    no_hitbox = EngineObject(category='b', shapes=Point(50, 2))
+    assert collisions.find_pairs([wide, far_end, apart, no_hitbox]) == [(wide, far_end)]
+    assert CollisionSystem().find_pairs([wide, far_end]) == []  # no callback
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,116 @@
+"""
+Check freeze_rotation of v1 shapes on both pipelines: a read-only snapshot, reused buffers, and the vertices of an
+unfrozen shape.
+
+Run with pytest or directly with python.
+"""
+import math
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex lists are tested, no window needed
+
+import pytest
+
+import v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_batch import StubBatch
+
+PIPELINES = [False, True] if v1.np is not None else [False]
+SHAPES = {
+    'rectangle': lambda batch: v1.Rectangle(90, 70, 40, 24, batch=batch),
+    'ellipse': lambda batch: v1.Ellipse(90, 70, 30, 12, segments=24, batch=batch),
+    'circle': lambda batch: v1.Circle(90, 70, 25, segments=20, indexed=True, batch=batch),
+}
+
+
+def make_shape(kind, use_numpy, rotation, anchor):
+    v1._AdvancedShapeBase._use_numpy = use_numpy
+    try:
+        shape = SHAPES[kind](StubBatch())
+    finally:
+        v1._AdvancedShapeBase._use_numpy = v1.np is not None
+    shape._use_numpy = use_numpy  # a shape keeps the pipeline it was created with
+    shape.anchor_position = anchor
+    shape.rotation = rotation
+    return shape
+
+
+def points(shape):
+    vertices = list(shape._vertex_list.vertices)
+    return list(zip(vertices[::2], vertices[1::2]))
+
+
+def rotated(points, rotation, cx, cy):
+    """Rotate points around (cx, cy) as _rotate_vertices does."""
+    r = math.radians(rotation)
+    cr, sr = math.cos(r), math.sin(r)
+    return [(cx + (x - cx) * cr - (y - cy) * sr, cy + (x - cx) * sr + (y - cy) * cr) for x, y in points]
+
+
+def assert_points(actual, expected):
+    assert len(actual) == len(expected)
+    for point, expected_point in zip(actual, expected):
+        assert point == pytest.approx(expected_point, abs=1e-3)  # the vertex list stores float32
+
+
+@pytest.mark.parametrize('use_numpy', PIPELINES)
+def test_snapshot_is_read_only(use_numpy):
+    shape = make_shape('ellipse', use_numpy, 30, (5, -3))
+    shape.freeze_rotation()
+    snapshot = shape._frozen_vertices
+    with pytest.raises((ValueError, TypeError)):
+        snapshot[0] = 1.0
+    before = list(snapshot)
+    shape.rotation = 70
+    shape.position = (10, 20)
+    assert list(snapshot) == before
+
+
+@pytest.mark.parametrize('use_numpy', PIPELINES)
+def test_transforms_of_a_frozen_shape_reuse_their_buffers(use_numpy):
+    shape = make_shape('rectangle', use_numpy, 30, (5, -3))
+    shape.freeze_rotation()
+    shape.rotation = 10  # the first transforms allocate the buffers
+    translated = shape._translated_vertices
+    for step in range(5):
+        rotated_buffer = shape._rotated_vertices
+        shape.x += 3
+        assert shape._translated_vertices is translated
+        assert shape._rotated_vertices is rotated_buffer  # a move does not rotate again
+        shape.rotation += 15
+        assert shape._translated_vertices is translated
+        assert shape._local_vertices is shape._frozen_vertices  # read in place, never copied
+        if not use_numpy:  # NumPy rotates into a new array, the lists are refilled
+            assert shape._rotated_vertices is rotated_buffer
+
+
+@pytest.mark.parametrize('use_numpy', PIPELINES)
+@pytest.mark.parametrize('kind', list(SHAPES))
+def test_frozen_vertices_match_an_unfrozen_shape(kind, use_numpy):
+    frozen = make_shape(kind, use_numpy, 30, (5, -3))
+    unfrozen = make_shape(kind, use_numpy, 30, (5, -3))
+    frozen.anchor_x, frozen.anchor_y = 12, 4
+    unfrozen.anchor_x, unfrozen.anchor_y = 12, 4
+    frozen.freeze_rotation()
+    assert (frozen.rotation, frozen.anchor_x, frozen.anchor_y) == (0, 0, 0)
+    assert_points(points(frozen), points(unfrozen))
+
+    for shape in (frozen, unfrozen):
+        shape.position = (140, 55)
+    assert_points(points(frozen), points(unfrozen))
+
+    # the frozen shape now rotates around its new anchor, its position
+    frozen.rotation = 45
+    x, y = frozen.x - frozen.anchor_position[0], frozen.y - frozen.anchor_position[1]
+    assert_points(points(frozen), rotated(points(unfrozen), 45, x, y))
+
+    frozen.unfreeze_rotation()
+    unfrozen.rotation, unfrozen.anchor_x, unfrozen.anchor_y = 0, 0, 0
+    assert_points(points(frozen), points(unfrozen))
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
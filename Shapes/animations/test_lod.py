@@ -0,0 +1,90 @@
+"""
+Check LODPolicy bands and hysteresis, and the in place resizing of improved_shapes.Arc when its band changes.
+
+Run with pytest or directly with python.
+"""
+import math
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex lists are tested, no window needed
+
+import pytest
+
+from v1 import LODPolicy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import improved_shapes
+from stub_batch import StubBatch
+
+
+def band_limit(policy, band):
+    """Return the largest radius getting at most band segments, by bisection."""
+    low, high = 0.1, 1e6
+    for _ in range(200):
+        middle = (low + high) / 2
+        if policy.segments_for(middle) <= band:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def test_segments_are_bands_keeping_the_tolerance():
+    policy = LODPolicy(tolerance=0.5, min_segments=8, max_segments=512)
+    previous = 0
+    for radius in [0.01, 0.3, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 1e5]:
+        segments = policy.segments_for(radius)
+        assert segments in (8, 16, 32, 64, 128, 256, 512)
+        assert segments >= previous
+        previous = segments
+        if segments < 512:
+            # the middle of a segment is radius * (1 - cos(half its angle)) away from the circle
+            assert radius * (1 - math.cos(math.pi / segments)) <= 0.5
+    assert previous == 512
+    assert policy.segments_for(20, angle=90) < policy.segments_for(20)
+    policy.scale = 4
+    assert policy.segments_for(5) == LODPolicy().segments_for(20)
+
+
+def test_sizes_close_to_a_band_limit_do_not_flip_flop():
+    policy = LODPolicy(hysteresis=0.2)
+    limit = band_limit(policy, 16)
+    assert policy.segments_for(limit) == 16 and policy.segments_for(limit * 1.001) == 32
+    segments = policy.segments_for(limit * 1.001)
+    for step in range(20):  # a shape oscillating just around the limit
+        radius = limit * (0.99 if step % 2 else 1.01)
+        segments = policy.segments_for(radius, current=segments)
+        assert segments == 32
+    assert policy.segments_for(limit * 0.99) == 16  # without a current band, the smaller band
+    assert policy.segments_for(limit / 1.2 * 1.01, current=32) == 32
+    assert policy.segments_for(limit / 1.2 * 0.99, current=32) == 16  # shrunk by more than the hysteresis
+    assert policy.segments_for(limit * 1.001, current=16) == 32  # growing is immediate
+
+
+def test_arc_resizes_its_vertex_list_in_place():
+    batch = StubBatch()
+    policy = LODPolicy()
+    limit = band_limit(policy, 16)
+    arc = improved_shapes.Arc(100, 80, limit * 0.9, angle=360, rotation=30, color=(10, 200, 90), opacity=128,
+                              lod=policy, batch=batch)
+    vertex_list = arc._vertex_list
+    assert arc._segments == 16
+    for radius, segments in [(limit * 1.01, 32), (limit * 0.99, 32), (limit * 10, 64), (limit * 0.2, 8)]:
+        arc.radius = radius
+        assert arc._segments == segments
+        assert arc._vertex_list is vertex_list  # resized, neither deleted nor added again
+        reference = improved_shapes.Arc(100, 80, radius, segments=segments, angle=360, rotation=30,
+                                        color=(10, 200, 90), opacity=128, batch=batch)
+        count = len(reference._vertex_list.vertices)
+        assert list(vertex_list.vertices[:count]) == pytest.approx(list(reference._vertex_list.vertices))
+        assert not any(vertex_list.vertices[count:])  # unused vertices of the capacity are degenerate
+        assert list(vertex_list.colors) == [10, 200, 90, 128] * vertex_list.get_size()
+        reference.delete()
+    arc.delete()
+    assert arc not in policy._shapes
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
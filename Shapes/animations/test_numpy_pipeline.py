@@ -0,0 +1,206 @@
+"""
+Check the NumPy vertex pipeline of v1 against the pure Python one, and shape arrays against the same shapes built one
+by one.
+
+Run with pytest or directly with python.
+"""
+import os
+import random
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex math is tested, no window needed
+
+import pytest
+
+import v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_batch import StubBatch
+
+try:
+    import shape_array
+except ImportError:  # shape arrays need NumPy
+    shape_array = None
+
+requires_numpy = pytest.mark.skipif(v1.np is None, reason='NumPy is not installed')
+
+
+def make(factory, use_numpy):
+    v1._AdvancedShapeBase._use_numpy = use_numpy
+    try:
+        shape = factory(StubBatch())
+    finally:
+        v1._AdvancedShapeBase._use_numpy = v1.np is not None
+    shape._use_numpy = use_numpy  # a shape keeps the pipeline it was created with
+    return shape
+
+
+def assert_same_vertex_lists(shape, other):
+    assert list(shape._vertex_list.vertices) == pytest.approx(list(other._vertex_list.vertices), abs=1e-3)
+    assert list(shape._vertex_list.colors) == list(other._vertex_list.colors)
+    if getattr(shape._vertex_list, 'indexed', False):
+        assert list(shape._vertex_list.indices) == list(other._vertex_list.indices)
+
+
+SHAPES = {
+    'circle': lambda batch: v1.Circle(100, 80, 30, segments=20, color=(10, 200, 30), batch=batch),
+    'circle_indexed': lambda batch: v1.Circle(100, 80, 30, segments=20, indexed=True, batch=batch),
+    'sector': lambda batch: v1.Circle(100, 80, 30, angle=250, start_angle=40, segments=20, batch=batch),
+    'sector_closed': lambda batch: v1.Circle(100, 80, 30, angle=250, start_angle=40, segments=20, closed=True,
+                                             batch=batch),
+    'ellipse': lambda batch: v1.Ellipse(100, 80, 40, 15, segments=24, batch=batch),
+    'ellipse_indexed': lambda batch: v1.Ellipse(100, 80, 40, 15, segments=24, indexed=True, batch=batch),
+    'rectangle': lambda batch: v1.Rectangle(100, 80, 50, 20, rotation=10, batch=batch),
+    'triangle': lambda batch: v1.Triangle(100, 80, 150, 90, 120, 140, batch=batch),
+}
+
+GEOMETRY = {
+    'circle': lambda shape, rng: setattr(shape, 'radius', rng.uniform(5, 60)),
+    'ellipse': lambda shape, rng: (setattr(shape, 'a', rng.uniform(5, 60)), setattr(shape, 'b', rng.uniform(5, 60))),
+    'rectangle': lambda shape, rng: (setattr(shape, 'width', rng.uniform(5, 60)),
+                                     setattr(shape, 'height', rng.uniform(5, 60))),
+    'triangle': lambda shape, rng: setattr(shape, 'x3', rng.uniform(-60, 60)),
+}
+
+
+def changes(kind, seed):
+    """Return a list of functions(shape) changing one shape property each, the same for every shape built from seed."""
+    rng = random.Random(seed)
+    steps = []
+    for _ in range(30):
+        change = rng.choice(('position', 'rotation', 'anchor', 'anchor_position', 'geometry', 'color', 'opacity'))
+        values = [rng.uniform(-200, 200) for _ in range(2)]
+        if change == 'position':
+            steps.append(lambda shape, values=values: (setattr(shape, 'x', values[0]), setattr(shape, 'y', values[1])))
+        elif change == 'rotation':
+            steps.append(lambda shape, value=values[0]: setattr(shape, 'rotation', value))
+        elif change == 'anchor':
+            steps.append(lambda shape, values=values: (setattr(shape, 'anchor_x', values[0] / 10),
+                                                       setattr(shape, 'anchor_y', values[1] / 10)))
+        elif change == 'anchor_position':
+            steps.append(lambda shape, values=values: (setattr(shape, 'anchor_position_x', values[0] / 10),
+                                                       setattr(shape, 'anchor_position_y', values[1] / 10)))
+        elif change == 'geometry':
+            state = rng.random()
+            steps.append(lambda shape, state=state: GEOMETRY[kind.split('_')[0].replace('sector', 'circle')](
+                shape, random.Random(state)))
+        elif change == 'color':
+            color = tuple(rng.randrange(256) for _ in range(3))
+            steps.append(lambda shape, color=color: setattr(shape, 'color', color))
+        else:
+            opacity = rng.randrange(256)
+            steps.append(lambda shape, opacity=opacity: setattr(shape, 'opacity', opacity))
+    return steps
+
+
+@requires_numpy
+@pytest.mark.parametrize('kind', sorted(SHAPES))
+def test_numpy_and_pure_python_pipelines_match(kind):
+    shape, pure = make(SHAPES[kind], True), make(SHAPES[kind], False)
+    assert_same_vertex_lists(shape, pure)
+    for step in changes(kind, kind):
+        step(shape)
+        step(pure)
+        assert_same_vertex_lists(shape, pure)
+
+
+@pytest.mark.parametrize('use_numpy', [False, True] if v1.np is not None else [False])
+@pytest.mark.parametrize('indexed', [False, True])
+def test_shapes_resized_while_invisible(use_numpy, indexed):
+    shape = make(lambda batch: v1.Circle(100, 80, 30, segments=64, indexed=indexed, batch=batch), use_numpy)
+    shape.visible = False
+    for segments in (8, 100):  # shrinks, then grows, the vertex list
+        shape.segments = segments
+        assert set(shape._vertex_list.vertices) == {0}
+    shape.x = 120
+    shape.visible = True
+    expected = make(lambda batch: v1.Circle(120, 80, 30, segments=100, indexed=indexed, batch=batch), use_numpy)
+    size = expected._vertex_list.get_size()
+    assert list(shape._vertex_list.vertices[:size * 2]) == pytest.approx(list(expected._vertex_list.vertices), abs=1e-3)
+    assert set(shape._vertex_list.vertices[size * 2:]) <= {0}
+
+
+def shape_vertices(array, shape, i):
+    """Return the vertices and colors of shape i of array, and those of shape (built alone) to compare with them."""
+    count = array._vertices_per_shape
+    vertices = list(array._vertex_list.vertices[i * count * 2:(i + 1) * count * 2])
+    colors = list(array._vertex_list.colors[i * count * 4:(i + 1) * count * 4])
+    size = shape._vertex_list.get_size()
+    return (vertices[:size * 2], colors[:size * 4]), (list(shape._vertex_list.vertices), list(shape._vertex_list.colors))
+
+
+ARRAYS = {
+    'circle': (lambda count, p, batch: shape_array.CircleArray(count, p['x'], p['y'], p['size'], rotation=p['rotation'],
+                                                               segments=18, color=(30, 60, 90), batch=batch),
+               lambda p, i, batch: v1.Circle(p['x'][i], p['y'][i], p['size'][i], rotation=p['rotation'][i],
+                                             segments=18, color=(30, 60, 90), batch=batch)),
+    'sector': (lambda count, p, batch: shape_array.CircleArray(count, p['x'], p['y'], p['size'], rotation=p['rotation'],
+                                                               angle=200, start_angle=30, segments=18, batch=batch),
+               lambda p, i, batch: v1.Circle(p['x'][i], p['y'][i], p['size'][i], rotation=p['rotation'][i],
+                                             angle=200, start_angle=30, segments=18, batch=batch)),
+    'sector_closed': (lambda count, p, batch: shape_array.CircleArray(count, p['x'], p['y'], p['size'],
+                                                                      rotation=p['rotation'], angle=200, start_angle=30,
+                                                                      segments=18, closed=True, batch=batch),
+                      lambda p, i, batch: v1.Circle(p['x'][i], p['y'][i], p['size'][i], rotation=p['rotation'][i],
+                                                    angle=200, start_angle=30, segments=18, closed=True, batch=batch)),
+    'ellipse': (lambda count, p, batch: shape_array.EllipseArray(count, p['x'], p['y'], p['size'], p['other'],
+                                                                 rotation=p['rotation'], segments=20, batch=batch),
+                lambda p, i, batch: v1.Ellipse(p['x'][i], p['y'][i], p['size'][i], p['other'][i],
+                                               rotation=p['rotation'][i], segments=20, batch=batch)),
+    'rectangle': (lambda count, p, batch: shape_array.RectangleArray(count, p['x'], p['y'], p['size'], p['other'],
+                                                                     rotation=p['rotation'], batch=batch),
+                  lambda p, i, batch: v1.Rectangle(p['x'][i], p['y'][i], p['size'][i], p['other'][i],
+                                                   rotation=p['rotation'][i], batch=batch)),
+    'triangle': (lambda count, p, batch: shape_array.TriangleArray(count, p['x'], p['y'], p['x2'], p['y2'], p['x3'],
+                                                                   p['y3'], rotation=p['rotation'], batch=batch),
+                 lambda p, i, batch: v1.Triangle(p['x'][i], p['y'][i], p['x2'][i], p['y2'][i], p['x3'][i], p['y3'][i],
+                                                 rotation=p['rotation'][i], batch=batch)),
+}
+
+
+@pytest.mark.skipif(shape_array is None, reason='NumPy is not installed')
+@pytest.mark.parametrize('kind', sorted(ARRAYS))
+def test_shape_arrays_match_shapes_built_one_by_one(kind):
+    rng = random.Random(kind)
+    count = 12
+    p = {name: [rng.uniform(5, 200) for _ in range(count)] for name in ('x', 'y', 'size', 'other', 'x2', 'y2', 'x3', 'y3')}
+    p['rotation'] = [rng.uniform(-360, 360) for _ in range(count)]
+    create_array, create_shape = ARRAYS[kind]
+    batch = StubBatch()
+    array = create_array(count, p, batch)
+    shapes = [create_shape(p, i, batch) for i in range(count)]
+
+    # move, rotate and recolor every shape, through the arrays and through each shape
+    anchors = [(rng.uniform(-20, 20), rng.uniform(-20, 20)) for _ in range(count)]
+    anchor_positions = [(rng.uniform(-20, 20), rng.uniform(-20, 20)) for _ in range(count)]
+    array.anchor_x, array.anchor_y = [a[0] for a in anchors], [a[1] for a in anchors]
+    array.anchor_position_x = [a[0] for a in anchor_positions]
+    array.anchor_position_y = [a[1] for a in anchor_positions]
+    array.rotation += 33
+    array.x += 7
+    array.color = (200, 100, 50)
+    array.opacity = 120
+    array.update()
+    array.update_colors()
+    for shape, anchor, anchor_position in zip(shapes, anchors, anchor_positions):
+        shape.anchor_x, shape.anchor_y = anchor
+        shape.anchor_position_x, shape.anchor_position_y = anchor_position
+        shape.rotation += 33
+        shape.x += 7
+        shape.color = (200, 100, 50)
+        shape.opacity = 120
+
+    for i, shape in enumerate(shapes):
+        (vertices, colors), (expected_vertices, expected_colors) = shape_vertices(array, shape, i)
+        assert vertices == pytest.approx(expected_vertices, abs=1e-3)
+        assert colors == expected_colors
+        if kind == 'sector':
+            # open sectors of an array end with a degenerate triangle, so closed can change without resizing
+            extra = array._vertex_list.vertices[(i * array._vertices_per_shape + len(vertices) // 2) * 2:
+                                                (i + 1) * array._vertices_per_shape * 2]
+            assert len(extra) == 6 and extra[0:2] == extra[2:4] == extra[4:6]
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,83 @@
+"""
+Check advanced_shapes_v0 is_position_inside_shape on points inside, outside and on the edge of rotated shapes.
+
+Run with pytest or directly with python.
+"""
+import math
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex lists are tested, no window needed
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import advanced_shapes_v0
+from stub_batch import StubBatch
+
+X, Y = 120, 90
+
+
+def placed(points, rotation):
+    """Rotate points around the origin like _rotate_vertices, then move them to (X, Y)."""
+    r = math.radians(rotation)
+    cr, sr = math.cos(r), math.sin(r)
+    return [(X + x * cr - y * sr, Y + x * sr + y * cr) for x, y in points]
+
+
+def lerp(p, q, t):
+    return p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t
+
+
+def rectangle_points(width, height):
+    w, h = width / 2, height / 2
+    corners = [(-w, -h), (w, -h), (w, h), (-w, h)]
+    edges = corners + [lerp(corners[i - 1], corners[i], t) for i in range(4) for t in (0.5, 0.13)]
+    inside = [(0, 0), (w * 0.99, h * 0.99), (-w * 0.5, h * 0.9)]
+    outside = [(w * 1.01, 0), (0, -h * 1.01), (w * 1.01, h * 1.01), (-w * 3, 0), (0, h * 5)]
+    return inside, outside, edges
+
+
+def star_points(outer, inner, spikes):
+    step = math.pi / spikes
+    tips = [(outer * math.cos(2 * i * step), outer * math.sin(2 * i * step)) for i in range(spikes)]
+    valleys = [(inner * math.cos((2 * i + 1) * step), inner * math.sin((2 * i + 1) * step)) for i in range(spikes)]
+    edges = tips + valleys + [lerp(tips[i], valleys[i], t) for i in range(spikes) for t in (0.5, 0.8)] + \
+        [lerp(valleys[i - 1], tips[i], 0.3) for i in range(spikes)]
+    inside = [(0, 0)] + [(x * 0.97, y * 0.97) for x, y in tips + valleys]
+    outside = [(x * 1.03, y * 1.03) for x, y in tips + valleys] + [(outer * 2, 0)]
+    for i in range(spikes):  # just outside the middle of an edge, beyond its outward normal
+        (x1, y1), (x2, y2) = tips[i], valleys[i]
+        mx, my = lerp(tips[i], valleys[i], 0.5)
+        length = math.hypot(x2 - x1, y2 - y1)
+        outside.append((mx + (y2 - y1) / length * 0.01, my - (x2 - x1) / length * 0.01))
+    return inside, outside, edges
+
+
+@pytest.mark.parametrize('rotation', [0, 30, 137.5])
+@pytest.mark.parametrize('kind', ['rectangle', 'star', 'indexed star'])
+def test_inside_outside_and_on_the_edge(kind, rotation):
+    batch = StubBatch()
+    if kind == 'rectangle':
+        shape = advanced_shapes_v0.Rectangle(X, Y, 60, 25, rotation=rotation, batch=batch)
+        inside, outside, edges = rectangle_points(60, 25)
+    else:
+        shape = advanced_shapes_v0.Star(X, Y, 40, 15, 5, rotation=rotation, indexed=kind == 'indexed star',
+                                        batch=batch)
+        inside, outside, edges = star_points(40, 15, 5)
+    vertices = list(shape._vertex_list.vertices)
+    drawn = set(zip(vertices[::2], vertices[1::2]))
+    # the expected points are placed like the drawn vertices, stored as float32
+    assert all(min(math.dist(corner, point) for point in drawn) < 1e-3 for corner in placed(edges[:4], rotation))
+
+    for x, y in placed(inside, rotation):
+        assert shape.is_position_inside_shape(x, y), ('inside', x, y)
+    for x, y in placed(edges, rotation):
+        assert shape.is_position_inside_shape(x, y), ('edge', x, y)
+    for x, y in placed(outside, rotation):
+        assert not shape.is_position_inside_shape(x, y), ('outside', x, y)
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
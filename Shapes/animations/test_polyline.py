@@ -0,0 +1,132 @@
+"""
+Check the geometry of Polyline: NumPy and pure Python paths, partial updates and resizing.
+
+Run with pytest or directly with python.
+"""
+import math
+import os
+import random
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex math is tested, no window needed
+
+import polyline
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_batch import StubBatch
+
+
+def random_points(rng, count):
+    return [(rng.uniform(0, 500), rng.uniform(0, 500)) for _ in range(count)]
+
+
+def make(points, use_numpy, **kwargs):
+    polyline.Polyline._use_numpy = use_numpy
+    try:
+        line = polyline.Polyline(points, batch=StubBatch(), **kwargs)
+    finally:
+        polyline.Polyline._use_numpy = polyline.np is not None
+    line._use_numpy = use_numpy  # a polyline keeps the path it was created with
+    return line
+
+
+def vertices(line):
+    count = polyline._vertex_count(len(line.points), line.join)
+    return list(line._vertex_list.vertices[:count * 2])
+
+
+def triangles(line):
+    """Return the triangles drawn by line, as tuples of rounded points."""
+    result = []
+    data = line._vertex_list.vertices
+    indices = list(line._vertex_list.indices)
+    for i in range(0, len(indices), 3):
+        points = tuple((round(data[2 * j], 3), round(data[2 * j + 1], 3)) for j in indices[i:i + 3])
+        if len(set(points)) == 3:
+            result.append(points)
+    return sorted(result)
+
+
+def assert_close(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert math.isclose(x, y, rel_tol=1e-5, abs_tol=1e-3), (x, y)
+
+
+def test_straight_line():
+    for join in polyline.JOINS:
+        line = make([(0, 0), (10, 0), (20, 0)], False, width=4, join=join)
+        assert vertices(line)[:8] == [0, 2, 0, -2, 10, 2, 10, -2]  # the first segment
+
+
+def test_miter_keeps_width():
+    # a right angle: the corner vertex is at half width from both segments
+    line = make([(0, 0), (10, 0), (10, 10)], False, width=2)
+    assert_close(vertices(line)[4:8], [9, 1, 11, -1])
+
+
+def test_miter_limit():
+    line = make([(0, 0), (10, 0), (0, 0.1)], False, width=2, miter_limit=3)
+    x, y = vertices(line)[4:6]
+    assert math.hypot(x - 10, y) <= 3 + 1e-9
+
+
+def test_sharp_join_is_beveled():
+    # a near 180 degrees turn: the miter would reach 200 half widths away, the join is beveled instead
+    joint = (10, 0)
+    for use_numpy in ([False, True] if polyline.np is not None else [False]):
+        for miter_limit in (1, 2, 4):
+            line = make([(0, 0), joint, (0, 0.1)], use_numpy, width=2, miter_limit=miter_limit)
+            data = vertices(line)
+            ends = list(zip(data[4:12:2], data[5:12:2]))  # end of the first segment, start of the second one
+            for x, y in ends:
+                assert math.hypot(x - joint[0], y - joint[1]) <= line.width * miter_limit + 1e-9
+            # the outer (right) ends keep the width of their segment, a triangle fills the gap between them
+            dx, dy = -10 / math.hypot(10, 0.1), 0.1 / math.hypot(10, 0.1)
+            assert_close(ends[1] + ends[3], [10, -1, 10 + dy, -dx])
+            assert ends[0] == ends[2]  # the inner ends meet
+            corners = {tuple(round(c, 3) for c in corner) for corner in (ends[0], ends[1], ends[3])}
+            assert any(set(triangle) == corners for triangle in triangles(line))
+
+
+def test_numpy_matches_python():
+    if polyline.np is None:
+        return
+    rng = random.Random(1)
+    for join in polyline.JOINS:
+        points = random_points(rng, 50)
+        assert_close(vertices(make(points, True, width=3, join=join)), vertices(make(points, False, width=3, join=join)))
+
+
+def test_partial_update_matches_rebuild():
+    rng = random.Random(2)
+    for use_numpy in ([False, True] if polyline.np is not None else [False]):
+        for join in polyline.JOINS:
+            points = random_points(rng, 30)
+            line = make(points, use_numpy, width=5, join=join)
+            for _ in range(40):
+                start = rng.randrange(30)
+                moved = random_points(rng, rng.randint(1, 30 - start))
+                points[start:start + len(moved)] = moved
+                line.set_points(start, moved)
+                assert_close(vertices(line), vertices(make(points, use_numpy, width=5, join=join)))
+
+
+def test_resize_and_join_change():
+    rng = random.Random(3)
+    for use_numpy in ([False, True] if polyline.np is not None else [False]):
+        line = make(random_points(rng, 10), use_numpy, width=2)
+        for count in (40, 3, 17, 2, 100):
+            for join in polyline.JOINS:
+                points = random_points(rng, count)
+                line.join = join
+                line.points = points
+                assert triangles(line) == triangles(make(points, use_numpy, width=2, join=join))
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(name, 'passed')
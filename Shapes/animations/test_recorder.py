@@ -0,0 +1,138 @@
+"""
+Check the frame recorder: its sinks, the order of the written frames, its statistics and dropped frames.
+
+Run with pytest or directly with python. Windows are created in pyglet's headless (EGL) mode.
+"""
+import ctypes.util
+import os
+import sys
+import threading
+
+import pyglet
+pyglet.options['shadow_window'] = False
+if ctypes.util.find_library('EGL'):
+    pyglet.options['headless'] = True  # hidden windows without a display, see conftest.py
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import recorder
+from recorder import FrameRecorder, PipeSink, RawFileSink
+
+WIDTH, HEIGHT = 6, 4
+STEP = 10  # red value between recorded frames
+
+
+def bottom_up_frame(index):
+    """Return a frame as read from OpenGL: bottom-up rows, each pixel (index, row, column, 255)."""
+    return bytes(value for row in range(HEIGHT) for column in range(WIDTH) for value in (index, row, column, 255))
+
+
+def top_down(frame):
+    stride = WIDTH * 4
+    return b''.join(frame[row * stride:(row + 1) * stride] for row in reversed(range(HEIGHT)))
+
+
+@pytest.mark.parametrize('use_numpy', [False, True] if recorder.np is not None else [False])
+def test_raw_file_sink_grows_and_writes_top_row_first(tmp_path, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(recorder, 'np', None)
+    path = str(tmp_path / 'frames.rgba')
+    sink = RawFileSink(path, WIDTH, HEIGHT)
+    frames = [bottom_up_frame(i) for i in range(40)]  # the file grows from 16 to 32, then 64 frames
+    for frame in frames:
+        sink.write(frame)
+    assert sink._capacity == 64
+    sink.close()
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert data == b''.join(top_down(frame) for frame in frames)  # the file is cut to the written frames
+
+
+COPY_STDIN = 'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))'
+
+
+def test_pipe_sink(tmp_path):
+    path = str(tmp_path / 'piped.rgba')
+    sink = PipeSink([sys.executable, '-c', COPY_STDIN, path])  # like cat > path
+    frames = [bottom_up_frame(i) for i in range(5)]
+    for frame in frames:
+        sink.write(frame)
+    sink.close()
+    assert sink.frames == 5
+    with open(path, 'rb') as file:
+        assert file.read() == b''.join(frames)  # as read from OpenGL, the encoder flips them
+
+    sink = PipeSink([sys.executable, '-c', 'import sys; sys.stdin.buffer.read(); sys.exit(3)'])
+    sink.write(frames[0])
+    with pytest.raises(RuntimeError):
+        sink.close()
+
+
+class ListSink():
+    """Keeps the index of every frame, read from its red value, waiting for release before each write."""
+
+    def __init__(self):
+        self.frames = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, buffer):
+        self.release.wait(5)
+        self.frames.append(round(bytes(buffer[:1])[0] / STEP))  # the framebuffer may have fewer than 8 bits
+
+    def close(self):
+        pass
+
+
+def make_window():
+    try:
+        return pyglet.window.Window(WIDTH, HEIGHT, visible=False)
+    except Exception as exception:  # no EGL, or pyglet.window imported before the headless option was set
+        pytest.skip('no headless window: %s' % exception)
+
+
+def record(window, frame_recorder, index):
+    window.switch_to()
+    pyglet.gl.glClearColor(index * STEP / 255, 0, 0, 1)
+    window.clear()
+    frame_recorder.record()
+
+
+@pytest.mark.parametrize('pbo', [True, False])
+def test_frames_are_written_in_order(pbo):
+    window = make_window()
+    try:
+        sink = ListSink()
+        frame_recorder = FrameRecorder(WIDTH, HEIGHT, sink, queue_size=2, pbo=pbo)
+        for index in range(25):  # more frames than the queue: recording waits for the writer
+            record(window, frame_recorder, index)
+        frame_recorder.close()
+        assert sink.frames == list(range(25))
+        stats = frame_recorder.stats()
+        assert (stats['captured_frames'], stats['written_frames'], stats['dropped_frames']) == (25, 25, 0)
+        assert stats['max_queued'] <= 2
+    finally:
+        window.close()
+
+
+def test_full_queue_drops_frames():
+    window = make_window()
+    try:
+        sink = ListSink()
+        sink.release.clear()  # the writer is stuck on the first frame
+        frame_recorder = FrameRecorder(WIDTH, HEIGHT, sink, queue_size=2, drop=True, pbo=False)
+        for index in range(5):
+            record(window, frame_recorder, index)
+        sink.release.set()
+        frame_recorder.close()
+        stats = frame_recorder.stats()
+        # one frame in the writer and one queued, the 3 others found no free buffer
+        assert (stats['captured_frames'], stats['written_frames'], stats['dropped_frames']) == (5, 2, 3)
+        assert sink.frames == [0, 1]
+    finally:
+        window.close()
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,94 @@
+"""
+Check the closed-form rotation of advanced shapes against the previous asin based rotation.
+
+Run with pytest or directly with python.
+"""
+import math
+import os
+import random
+import sys
+import types
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex math is tested, no window needed
+
+import v0
+import v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import advanced_shapes_v0
+
+
+def asin_rotation(vertices, rotation, anchor_x, anchor_y):
+    """Rotation used before: recover the polar angle of each vertex with asin, add rotation and go back."""
+    vertices = list(vertices)
+    if rotation % 360 != 0:
+        rotation = math.radians(rotation)
+        for i in range(0, len(vertices), 2):
+            x, y = vertices[i] - anchor_x, vertices[i + 1] - anchor_y
+            r = math.sqrt(x * x + y * y)
+            if r == 0:
+                continue
+            angle = math.asin(y / r)
+            if x < 0:
+                angle = math.radians(180) - angle
+            angle += rotation
+            vertices[i] = math.cos(angle) * r + anchor_x
+            vertices[i + 1] = math.sin(angle) * r + anchor_y
+    return vertices
+
+
+def rotate(shape_class, vertices, rotation, anchor_x, anchor_y):
+    """Rotate vertices with the _rotate_vertices method of shape_class."""
+    shape = types.SimpleNamespace(_vertices=list(vertices), _rotation=rotation, _anchor_x=anchor_x, _anchor_y=anchor_y)
+    shape_class._rotate_vertices(shape)
+    return shape._vertices
+
+
+SHAPE_CLASSES = [v0._AdvancedShapeBase, v1._AdvancedShapeBase, advanced_shapes_v0._AdvancedShapeBase]
+
+
+def test_matches_asin_rotation():
+    rng = random.Random(0)
+    for shape_class in SHAPE_CLASSES:
+        for _ in range(200):
+            vertices = [rng.uniform(-500, 500) for _ in range(2 * rng.randint(1, 20))]
+            rotation = rng.uniform(-720, 720)
+            anchor_x, anchor_y = rng.uniform(-100, 100), rng.uniform(-100, 100)
+            expected = asin_rotation(vertices, rotation, anchor_x, anchor_y)
+            result = rotate(shape_class, vertices, rotation, anchor_x, anchor_y)
+            for a, b in zip(result, expected):
+                assert math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9), (shape_class.__module__, a, b)
+
+
+def test_no_rotation_keeps_vertices():
+    vertices = [1.5, -2.25, 0, 0, 1e6, 3]
+    for shape_class in SHAPE_CLASSES:
+        for rotation in (0, 360, -720):
+            assert rotate(shape_class, vertices, rotation, 7, 8) == vertices
+
+
+def test_exact_quarter_turns():
+    # a point on an axis must land on the next axis, where asin lost precision close to +-90 degrees
+    for shape_class in SHAPE_CLASSES:
+        x, y = rotate(shape_class, [10, 0], 90, 0, 0)
+        assert math.isclose(x, 0, abs_tol=1e-12) and math.isclose(y, 10, rel_tol=1e-15)
+        x, y = rotate(shape_class, [3, 4 + 1e-7], 180, 3, 4)
+        assert math.isclose(x, 3, abs_tol=1e-12) and math.isclose(y, 4 - 1e-7, abs_tol=1e-12)
+
+
+def test_points_near_vertical_axis():
+    # asin(y / r) is ill-conditioned when x is tiny, the matrix keeps full precision
+    for shape_class in SHAPE_CLASSES:
+        for x in (1e-3, 1e-6, -1e-6, 1e-9):
+            rx, ry = rotate(shape_class, [x, 100], 30, 0, 0)
+            cr, sr = math.cos(math.radians(30)), math.sin(math.radians(30))
+            assert math.isclose(rx, x * cr - 100 * sr, rel_tol=1e-14)
+            assert math.isclose(ry, x * sr + 100 * cr, rel_tol=1e-14)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(name, 'passed')
@@ -0,0 +1,66 @@
+"""
+Check that advanced_shapes_v0, improved_shapes and v1 share the helpers of shape_helpers, and the vertex lists of
+v0 shapes resized by them.
+
+Run with pytest or directly with python.
+"""
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False  # only the vertex lists are tested, no window needed
+
+import pytest
+
+import v1
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import advanced_shapes_v0
+import improved_shapes
+import shape_helpers
+from stub_batch import StubBatch
+
+
+def test_modules_share_groups_and_unit_circles():
+    batch = StubBatch()
+    shapes = [advanced_shapes_v0.Circle(50, 50, 20, segments=37, batch=batch),
+              v1.Circle(50, 50, 20, segments=37, batch=batch),
+              v1.Ellipse(50, 50, 20, 10, segments=37, batch=batch),
+              advanced_shapes_v0.Rectangle(50, 50, 20, 10, batch=batch),
+              improved_shapes.RectangleWithBorder(50, 50, 20, 10, batch=batch)]
+    # the same group object, not only equal groups: one registry, so one draw call per batch
+    assert all(shape._group is shape_helpers.get_shape_group() for shape in shapes)
+
+    hits = shape_helpers.unit_circle_cache_info().hits
+    improved_shapes.Arc(50, 50, 20, segments=37, batch=batch)
+    v1.Circle(80, 80, 30, segments=37, batch=batch)
+    assert shape_helpers.unit_circle_cache_info().hits >= hits + 2
+    assert v1.unit_circle_cache_info() == improved_shapes.unit_circle_cache_info()
+
+
+V0_RESIZED = {
+    'star': (lambda count, batch: advanced_shapes_v0.Star(100, 80, 40, 20, count, batch=batch), 'num_spikes'),
+    'polygon': (lambda count, batch: advanced_shapes_v0.RegularPolygon(100, 80, count, radius=30, batch=batch),
+                'num_sides'),
+}
+
+
+@pytest.mark.parametrize('kind', sorted(V0_RESIZED))
+def test_v0_shapes_resized_while_invisible(kind):
+    create, attribute = V0_RESIZED[kind]
+    shape = create(12, StubBatch())
+    shape.visible = False
+    for count in (4, 40):  # shrinks, then grows, the vertex list: the grown region holds stale data
+        setattr(shape, attribute, count)
+        assert set(shape._vertex_list.vertices) == {0}
+    shape.x = 120
+    shape.visible = True
+    expected = create(40, StubBatch())
+    expected.x = 120
+    size = expected._vertex_list.get_size()
+    assert list(shape._vertex_list.vertices[:size * 2]) == pytest.approx(list(expected._vertex_list.vertices), abs=1e-3)
+    assert set(shape._vertex_list.vertices[size * 2:]) <= {0}
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,157 @@
+"""
+Check TransformNode: dirty propagation, update order and world matrices against explicit composition.
+
+Run with pytest or directly with python.
+"""
+import math
+import random
+import sys
+
+import pytest
+
+import window_engine
+from window_engine import TransformNode, update_transforms
+
+
+class ShapeStub():
+    """Records the transforms a node gives to its shapes."""
+
+    def __init__(self):
+        self.transforms = []
+
+    def set_transform(self, x, y, rotation):
+        self.transforms.append((x, y, rotation))
+
+
+@pytest.fixture
+def tree():
+    """root -> (child -> grandchild, sibling), all up to date."""
+    update_transforms()
+    root = TransformNode(10, 20, 30)
+    child = TransformNode(5, 0, 45, parent=root)
+    grandchild = TransformNode(0, 3, -15, parent=child)
+    sibling = TransformNode(-4, 2, 0, parent=root)
+    update_transforms()
+    return root, child, grandchild, sibling
+
+
+def test_moving_a_node_dirties_its_subtree_only(tree):
+    root, child, grandchild, sibling = tree
+    child.x = 7
+    assert (root._dirty, child._dirty, grandchild._dirty, sibling._dirty) == (False, True, True, False)
+    assert child._local is None and grandchild._local is not None  # the grandchild keeps its local matrix
+    assert window_engine._dirty_nodes == {child}  # descendants are reached through their dirty parent
+    update_transforms()
+    assert not any(node._dirty for node in tree) and not window_engine._dirty_nodes
+
+
+def test_invalidation_stops_at_dirty_nodes(tree, monkeypatch):
+    root, child, grandchild, sibling = tree
+    root.rotation = 50
+    invalidated = []
+    invalidate = TransformNode._invalidate
+
+    def recording_invalidate(node, local=True):
+        invalidated.append(node)
+        invalidate(node, local)
+
+    monkeypatch.setattr(TransformNode, '_invalidate', recording_invalidate)
+    child.y = 1
+    assert invalidated == [child]  # already dirty: neither the grandchild nor the set are visited again
+    assert child._local is None  # but its local matrix is recomputed
+    assert window_engine._dirty_nodes == {root}
+    update_transforms()
+    assert child.world_matrix == pytest.approx(compose(root, child))
+
+
+def test_update_recomputes_parents_first_and_each_node_once(tree, monkeypatch):
+    root, child, grandchild, sibling = tree
+    updated = []
+    update_world = TransformNode._update_world
+
+    def recording_update_world(node):
+        updated.append(node)
+        update_world(node)
+
+    monkeypatch.setattr(TransformNode, '_update_world', recording_update_world)
+    grandchild.rotation = 10  # changed before its ancestors: first in the set but deepest
+    sibling.x = 0
+    root.x = 0
+    shape = ShapeStub()
+    grandchild.attach(shape)
+    update_transforms()
+    assert updated.index(root) < updated.index(child) < updated.index(grandchild)
+    assert updated.index(root) < updated.index(sibling)
+    assert sorted(map(id, updated)) == sorted(map(id, tree))
+    assert len(shape.transforms) == 1
+    x, y, rotation = shape.transforms[0]
+    a, b, c, d, tx, ty = compose(root, child, grandchild)
+    assert (x, y) == pytest.approx((tx, ty)) and rotation == pytest.approx(30 + 45 + 10)
+
+
+def local(node):
+    """Explicit 3x3 matrix of a rotation followed by a translation, as TransformNode documents it."""
+    r = math.radians(node.rotation)
+    return [[math.cos(r), -math.sin(r), node.x],
+            [math.sin(r), math.cos(r), node.y],
+            [0, 0, 1]]
+
+
+def compose(*path):
+    """World matrix of the last node of path, from the root, as (a, b, c, d, tx, ty)."""
+    m = [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    for node in path:
+        n = local(node)
+        m = [[sum(m[i][k] * n[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+    return m[0][0], m[1][0], m[0][1], m[1][1], m[0][2], m[1][2]
+
+
+def ancestors(node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = node.parent
+    return path[::-1]
+
+
+def test_world_matrices_match_explicit_composition():
+    update_transforms()
+    rng = random.Random(14)
+    nodes = [TransformNode(rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(-180, 180))]
+    shapes = {}
+    for i in range(1, 30):
+        nodes.append(TransformNode(rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(-180, 180),
+                                   parent=rng.choice(nodes)))
+        shapes[nodes[-1]] = ShapeStub()
+        nodes[-1].attach(shapes[nodes[-1]])
+    for step in range(200):
+        node = rng.choice(nodes)
+        action = rng.randrange(4)
+        if action == 0:
+            node.position = rng.uniform(-50, 50), rng.uniform(-50, 50)
+        elif action == 1:
+            node.rotation += rng.uniform(-90, 90)
+        elif action == 2:
+            # re-parent to a node outside its subtree, keeping the local transform
+            candidates = [other for other in nodes if node not in ancestors(other)]
+            rng.choice(candidates).add_child(node)
+        elif node.parent is not None:
+            node.parent.remove_child(node)
+        if step % 7 == 0:
+            update_transforms()
+            for other in nodes:
+                assert other.world_matrix == pytest.approx(compose(*ancestors(other)), abs=1e-9)
+                assert other.depth == len(ancestors(other)) - 1
+                if other in shapes:
+                    a, b, c, d, tx, ty = compose(*ancestors(other))
+                    x, y, rotation = shapes[other].transforms[-1]
+                    assert (x, y) == pytest.approx((tx, ty), abs=1e-9)
+                    assert (math.cos(math.radians(rotation)), math.sin(math.radians(rotation))) == \
+                        pytest.approx((a, b), abs=1e-9)
+    for node in nodes:  # read without update_transforms(): the properties update dirty nodes
+        node.x += 1
+        assert node.world_matrix == pytest.approx(compose(*ancestors(node)), abs=1e-9)
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
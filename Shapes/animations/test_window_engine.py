@@ -0,0 +1,231 @@
+"""
+Check EngineWindow updates: batch motions against their plain form, the object registry, fixed steps with
+interpolation and the profiler.
+
+Run with pytest or directly with python. Windows are created in pyglet's headless (EGL) mode.
+"""
+import ctypes.util
+import os
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False
+if ctypes.util.find_library('EGL'):
+    pyglet.options['headless'] = True  # hidden windows without a display, see conftest.py
+
+import pytest
+
+import v1
+import window_engine
+from profiler import FrameProfiler, run_frames
+from window_engine import EngineObject, EngineWindow, bounce_motion, oscillate_motion, warp_motion
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from stub_batch import StubBatch
+
+
+def make_window(**kwargs):
+    try:
+        return EngineWindow(200, 150, visible=False, **kwargs)
+    except Exception as exception:  # no EGL, or pyglet.window imported before the headless option was set
+        pytest.skip('no headless window: %s' % exception)
+
+
+def mixed_shapes(batch):
+    return [v1.Rectangle(20, 30, 40, 25, batch=batch),
+            v1.Circle(100, 80, 15, batch=batch),
+            v1.Triangle(50, 50, 90, 60, 70, 100, batch=batch),
+            pyglet.shapes.Line(10, 10, 60, 40, width=3, batch=batch)]
+
+
+def moving_object(shape, motion, i):
+    obj = EngineObject(shapes=shape, motion=motion)
+    obj.vx, obj.vy, obj.ax, obj.ay = 240 - 70 * i, 130 + 40 * i, 15 * i, -900
+    obj.x0, obj.y0, obj.amplitude_x, obj.amplitude_y, obj.frequency, obj.phase = 100, 75, 60, 40, 0.7 + i, i
+    return obj
+
+
+def run_scene(use_numpy, ticks=90):
+    """Return the vertices of every shape of a scene mixing batch and plain motions after ticks updates."""
+    saved_np = window_engine.np
+    if not use_numpy:
+        window_engine.np = None  # every motion runs in its plain form
+    window = make_window()
+    try:
+        batch = StubBatch()
+        order = []
+
+        def follow_motion(shape, dt, window, object):
+            # reads a shape moved by a batch motion: its value depends on the order of the updates
+            shape.x = object.leader.x + 5
+            order.append(object.leader.x)
+
+        objects = []
+        for motion in (bounce_motion, warp_motion, oscillate_motion):
+            for i, shape in enumerate(mixed_shapes(batch)):
+                objects.append(moving_object(shape, motion, i))
+        follower = EngineObject(shapes=v1.Circle(0, 0, 5, batch=batch), motion=follow_motion)
+        follower.leader = objects[1].shapes[0]
+        objects.insert(2, follower)
+        pair = moving_object([v1.Rectangle(60, 60, 10, 10, batch=batch), v1.Circle(30, 90, 5, batch=batch)],
+                             bounce_motion, 1)
+        objects.append(pair)  # several shapes: the plain motion updates the object once per shape
+        window.add_objects(objects)
+        for _ in range(ticks):
+            window.update(1 / 60)
+        v1.flush_shapes()
+        return [list(shape._vertex_list.vertices) for obj in objects for shape in obj.shapes], order
+    finally:
+        window_engine.np = saved_np
+        window.close()
+
+
+@pytest.mark.skipif(window_engine.np is None, reason='batch motions need NumPy')
+def test_batch_motions_match_plain_motions():
+    batch_vertices, batch_order = run_scene(use_numpy=True)
+    plain_vertices, plain_order = run_scene(use_numpy=False)
+    assert batch_order == pytest.approx(plain_order)
+    assert len(batch_vertices) == len(plain_vertices)
+    for batch_shape, plain_shape in zip(batch_vertices, plain_vertices):
+        assert batch_shape == pytest.approx(plain_shape, abs=1e-6)
+
+
+def test_remove_objects_by_name_removes_every_object_with_the_name():
+    window = make_window()
+    try:
+        batch = StubBatch()
+        named = [EngineObject(name='enemy', shapes=v1.Circle(10 * i, 10, 5, batch=batch)) for i in range(5)]
+        others = [EngineObject(name='player', shapes=v1.Circle(0, 0, 5, batch=batch)),
+                  EngineObject(shapes=v1.Circle(0, 0, 5, batch=batch))]
+        window.add_objects([others[0], named[0], named[1], others[1], named[2], named[3], named[4]])
+        assert window.get_object('enemy') is named[0]
+        assert window.get_objects('enemy') == named
+        window.remove_objects_by_name('enemy')
+        window.update(1 / 60)
+        assert window.objects == others
+        assert window.get_object('enemy') is None
+        assert window.get_object('player') is others[0]
+
+        # removing one object of a shared name keeps the others reachable
+        kept = [EngineObject(name='enemy', shapes=v1.Circle(0, 0, 5, batch=batch)) for _ in range(2)]
+        window.add_objects(kept)
+        window.remove_objects(kept[0])
+        window.update(1 / 60)
+        assert window.get_object('enemy') is kept[1]
+        window.remove_objects_by_name(['enemy', 'player'])
+        window.update(1 / 60)
+        assert window.objects == [others[1]]
+    finally:
+        window.close()
+
+
+def test_removals_follow_the_order_objects_were_chosen_in():
+    window = make_window()
+    try:
+        batch = StubBatch()
+        deleted = []
+
+        class RecordingObject(EngineObject):
+            def delete(self):
+                deleted.append(self)
+                super().delete()
+
+        objects = [RecordingObject(name=i % 3, shapes=v1.Circle(i, 0, 5, batch=batch)) for i in range(12)]
+        window.add_objects(objects)
+        window.remove_objects([objects[7], objects[2]])
+        window.remove_objects_by_index([0, 7])  # objects[7] is already chosen: it keeps its place
+        window.remove_objects_by_name(1)
+        window.update(1 / 60)
+        removed = [objects[7], objects[2], objects[0], objects[1], objects[4], objects[10]]
+        assert deleted == removed
+        # each removal moves the last object into the place of the removed one
+        remaining = list(objects)
+        for obj in removed:
+            index = remaining.index(obj)
+            last = remaining.pop()
+            if last is not obj:
+                remaining[index] = last
+        assert window.objects == remaining
+        assert all(window.objects[index] is obj for obj, index in window._indices.items())
+    finally:
+        window.close()
+
+
+def test_detached_profiler_keeps_other_profilers_recording():
+    window = make_window(batch=pyglet.graphics.Batch())
+    other_window = make_window(batch=pyglet.graphics.Batch())
+    try:
+        circle = v1.Circle(50, 50, 20, batch=window.batch)
+        window.add_objects(EngineObject(shapes=circle, motion=lambda shape, dt, window, object: setattr(shape, 'x', dt)))
+        profiler, other_profiler = FrameProfiler(), FrameProfiler()
+        profiler.attach(window)
+        other_profiler.attach(other_window)
+        other_profiler.detach()
+        run_frames(window, 5)
+        assert profiler.frame_count == 5  # every frame was drawn
+        assert all(frame['upload'] > 0 for frame in profiler.frames)
+        assert other_window.profiler is None
+        profiler.detach()
+        assert window.profiler is None and not v1._upload_timers
+    finally:
+        window.close()
+        other_window.close()
+
+
+def test_interpolation_draws_between_states_without_changing_attributes():
+    window = make_window(batch=pyglet.graphics.Batch(), fixed_step=0.1)
+    try:
+        rectangle = v1.Rectangle(0, 0, 40, 20, rotation=359, batch=window.batch)
+        line = pyglet.shapes.Line(0, 0, 30, 0, width=2, batch=window.batch)
+
+        def turn_motion(shape, dt, window, object):
+            shape.x += 10
+            if shape is rectangle:
+                shape.rotation = (shape.rotation + 2) % 360
+
+        window.add_objects([EngineObject(shapes=rectangle, motion=turn_motion),
+                            EngineObject(shapes=line, motion=turn_motion)])
+        uploads = []
+        v1.add_upload_timer(uploads.append)
+        try:
+            window.tick(0.15)  # one fixed step, half a step left
+            assert window.alpha == pytest.approx(0.5)
+            del uploads[:]
+            window.switch_to()
+            window.on_draw()
+            assert len(uploads) == 1  # the interpolated vertices, the simulated ones are not written back
+        finally:
+            v1.remove_upload_timer(uploads.append)
+        # drawn halfway, turning from 359 to 1 degrees through 0, while the attributes keep the simulated state
+        expected = v1.Rectangle(5, 0, 40, 20, rotation=0, batch=StubBatch())
+        assert list(rectangle._vertex_list.vertices) == pytest.approx(list(expected._vertex_list.vertices), abs=1e-4)
+        assert (rectangle.x, rectangle.rotation) == (10, 1)
+        assert line.x == pytest.approx(5)  # shapes without set_render_transform hold the drawn state until the next step
+
+        window.tick(0.1)
+        assert (rectangle.x, rectangle.rotation, line.x) == (20, 3, 20)
+    finally:
+        window.close()
+
+
+def test_tick_keeps_the_remainder_of_a_hitch_and_removes_objects_while_paused():
+    window = make_window(fixed_step=0.1, max_steps=3)
+    try:
+        steps = []
+        obj = EngineObject(shapes=v1.Circle(0, 0, 5, batch=StubBatch()),
+                           motion=lambda shape, dt, window, object: steps.append(dt))
+        window.add_objects(obj)
+        window.tick(1.05)  # ten steps late: three are simulated, the other whole steps are dropped
+        assert len(steps) == 3
+        assert window.alpha == pytest.approx(0.5)
+
+        window.toggle_pause()
+        window.remove_objects(obj)
+        window.tick(0.1)
+        assert window.objects == [] and len(steps) == 3
+    finally:
+        window.close()
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
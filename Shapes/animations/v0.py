@@ -96,18 +96,15 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
 
     def _rotate_vertices(self):
         if self._rotation % 360 != 0:
+            # cos and sin are computed once, then each vertex is rotated around the anchor with a 2x2 matrix
             rotation = math.radians(self._rotation)
-            for i in range(0, len(self._vertices), 2):
-                x, y = self._vertices[i] - self._anchor_x, self._vertices[i + 1] - self._anchor_y
-                r = math.sqrt(x * x + y * y)
-                if r == 0:  # dot in anchor, no need to rotate
-                    continue
-                angle = math.asin(y / r)
-                if x < 0:
-                    angle = math.radians(180) - angle
-                angle += rotation
-                self._vertices[i] = math.cos(angle) * r + self._anchor_x
-                self._vertices[i + 1] = math.sin(angle) * r + self._anchor_y
+            cr, sr = math.cos(rotation), math.sin(rotation)
+            ax, ay = self._anchor_x, self._anchor_y
+            vertices = self._vertices
+            for i in range(0, len(vertices), 2):
+                x, y = vertices[i] - ax, vertices[i + 1] - ay
+                vertices[i] = x * cr - y * sr + ax
+                vertices[i + 1] = x * sr + y * cr + ay
 
     def _translate_vertices(self):
         for i in range(0, len(self._vertices), 2):
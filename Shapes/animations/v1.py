@@ -4,115 +4,437 @@ from pyglet.gl import GL_TRIANGLES, GL_LINES
 from pyglet.graphics import Batch
 
 import math
+import os
+import sys
+import time
+import weakref
+from array import array
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python vertex pipeline is used without it
+    np = None
 
-class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
+# caches, group registry and round shape layout shared with advanced_shapes_v0 and improved_shapes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shape_helpers import UNIT_CIRCLE_CACHE_SIZE, _FanVertexListMixin, _unit_circle
+from shape_helpers import get_shape_group, unit_circle_cache_info
+
+
+# what changed in a shape since its vertices were last updated, each change includes the work of the previous ones
+_TRANSLATION = 1  # x, y or anchor position: add an offset to the cached rotated vertices
+_ROTATION = 2  # rotation or anchor rotation: rotate the cached vertices again, without calculating them
+_GEOMETRY = 3  # anything else: calculate, rotate and translate the vertices
+
+_anchor_markers = weakref.WeakKeyDictionary()  # batch -> _AnchorMarkers drawing the anchor points of its shapes
+_dirty_shapes = set()  # lazy shapes waiting for flush_shapes() to recompute their vertices
+_upload_timers = []  # callables receiving the seconds spent in each vertex upload, see add_upload_timer
+
+
+def flush_shapes():
+    """Recompute the vertices of every lazy shape modified since the last flush. Call it once before drawing."""
+    while _dirty_shapes:
+        _dirty_shapes.pop()._flush()
+
+
+def add_upload_timer(timer):
+    """Call timer(seconds) with the duration of every vertex upload of advanced shapes."""
+    _upload_timers.append(timer)
+
+
+def remove_upload_timer(timer):
+    """Stop calling a timer added with add_upload_timer, other timers keep running."""
+    if timer in _upload_timers:
+        _upload_timers.remove(timer)
+
+
+def set_lazy_default(value):
+    """Choose whether new and existing advanced shapes without an explicit lazy value defer updates."""
+    _AdvancedShapeBase._lazy = value
+
+
+def _refill(buffer, source):
+    """Copy source into the list buffer and return it, or return a new list if buffer is missing or has another length."""
+    if buffer is None or len(buffer) != len(source):
+        return list(source)
+    buffer[:] = source
+    return buffer
+
+
+def count_draw_calls(batch):
+    """Return the number of draw calls issued by batch.draw(), one for every vertex domain of every group."""
+    return sum(len(domain_map) for domain_map in batch.group_map.values())
+
+
+def _get_anchor_markers(batch):
+    markers = _anchor_markers.get(batch)
+    if markers is None:
+        markers = _anchor_markers[batch] = _AnchorMarkers(batch)
+    return markers
+
+
+class _AnchorMarkers:
+    """Anchor points of all the advanced shapes of a batch, drawn as small squares from one shared vertex list."""
+
+    _half_size = 2
+
+    def __init__(self, batch, capacity=16):
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self._vertex_list = batch.add(capacity * 6, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._capacity = capacity
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        capacity = self._capacity * 2
+        self._vertex_list.resize(capacity * 6)
+        # vertices of the new markers may contain garbage, hide them
+        self._vertex_list.vertices[self._capacity * 12:] = (0,) * (self._capacity * 12)
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def add(self):
+        """Reserve a marker and return its index."""
+        if not self._free:
+            self._grow()
+        return self._free.pop()
+
+    def remove(self, index):
+        """Hide the marker and make its index available again."""
+        self._vertex_list.vertices[index * 12:index * 12 + 12] = (0,) * 12
+        self._free.append(index)
+
+    def move(self, index, x, y):
+        s = self._half_size
+        x1, y1, x2, y2 = x - s, y - s, x + s, y + s
+        self._vertex_list.vertices[index * 12:index * 12 + 12] = (x1, y1, x2, y1, x2, y2, x1, y1, x1, y2, x2, y2)
+
+    def set_color(self, index, rgba):
+        self._vertex_list.colors[index * 24:index * 24 + 24] = rgba * 6
+
+    def draw(self):
+        self._group.set_state_recursive()
+        self._vertex_list.draw(GL_TRIANGLES)
+        self._group.unset_state_recursive()
+
+
+class LODPolicy:
+    """Choose the segments of round shapes from their size on screen.
+
+    The segments are the fewest for which the distance between the true curve and its segments stays under
+    tolerance pixels, rounded up to a band (min_segments times a power of two, up to max_segments). Vertex lists
+    are only reallocated when a shape moves to another band, and a shape only drops to a lower band once it is
+    smaller than the band limit by more than the hysteresis ratio, so sizes close to a limit do not thrash.
+
+    Set scale to the zoom of the scene: shapes using the policy pick their segments again when it changes.
+    """
+
+    def __init__(self, tolerance=0.5, min_segments=8, max_segments=512, hysteresis=0.2, scale=1):
+        """Create a level of detail policy.
+
+        :Parameters:
+            `tolerance` : float
+                Maximum distance in pixels between a curve and its segments.
+            `min_segments` : int
+                Segments of the smallest band.
+            `max_segments` : int
+                Segments of the largest band.
+            `hysteresis` : float
+                Ratio by which a shape must shrink below a band limit to drop to a lower band.
+            `scale` : float
+                Pixels per unit of the scene, the radius of shapes is multiplied by it.
+        """
+        self.tolerance = tolerance
+        self.min_segments = min_segments
+        self.max_segments = max_segments
+        self.hysteresis = hysteresis
+        self._scale = scale
+        self._shapes = weakref.WeakSet()
+
+    def add(self, shape):
+        """Update the segments of shape when the scale changes."""
+        self._shapes.add(shape)
+
+    def discard(self, shape):
+        self._shapes.discard(shape)
+
+    def _required_segments(self, radius, angle):
+        r = abs(radius) * self._scale
+        if r <= self.tolerance / 2:
+            return 1
+        # a segment spanning theta radians is at most r * (1 - cos(theta / 2)) away from the arc
+        return math.ceil(math.radians(abs(angle)) / (2 * math.acos(1 - self.tolerance / r)))
+
+    def _band(self, segments):
+        band = self.min_segments
+        while band < segments and band < self.max_segments:
+            band *= 2
+        return min(band, self.max_segments)
+
+    def segments_for(self, radius, angle=360, current=None):
+        """Return the segments of a shape with this radius and angle (in degrees), currently using current segments."""
+        segments = self._band(self._required_segments(radius, angle))
+        if current is not None and segments < current:
+            segments = min(current, self._band(self._required_segments(radius * (1 + self.hysteresis), angle)))
+        return segments
+
+    @property
+    def scale(self):
+        """Pixels per unit of the scene.
+
+        :type: float
+        """
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+        for shape in list(self._shapes):
+            shape._lod_changed()
+
+
+class _AdvancedShapeBase(_FanVertexListMixin, pyglet.shapes._ShapeBase):
     """Base class for Advanced Shapes."""
 
     _rotation = 0
     _anchor_rotation_visible = False
-    _anchor_rotation_circle = None
+    _anchor_rotation_marker = None  # index of the marker of the anchor rotation point in _AnchorMarkers
     _anchor_position_visible = False
-    _anchor_position_circle = None
+    _anchor_position_marker = None  # index of the marker of the anchor position point in _AnchorMarkers
     _anchor_position_x = 0
     _anchor_position_y = 0
     _vertices = []
     _frozen_vertices = None
+    _local_vertices = None  # vertices before rotation and translation
+    _rotated_vertices = None  # vertices after rotation, before translation
+    _translated_vertices = None  # reusable buffer receiving the translated vertices that are uploaded
+    _pending_change = 0
+    _color_buffer = None  # RGBA bytes of every vertex, as uploaded to the vertex list
+    _use_numpy = np is not None  # transform vertices with NumPy, set to False to force the pure Python pipeline
+    _indexed = False  # if True, round shapes store their rim points once plus a center, drawn with a cached index buffer
+    _closed = False
+    _lod = None  # LODPolicy choosing the segments of round shapes
+    _lazy = False  # if True, changes only mark the shape as dirty until flush_shapes() is called
+    _dirty = False
+    _render_transform = None  # (x, y, rotation) the vertices were drawn at by set_render_transform, if not the attributes
     _verbose = False  # used to print debug messages
 
     def __del__(self):
         super().__del__()
-        if self._anchor_rotation_circle is not None:
-            self._anchor_rotation_circle.__del__()
-        if self._anchor_position_circle is not None:
-            self._anchor_position_circle.__del__()
+        self._remove_anchor_markers()
 
     def draw(self):
         super().draw()
-        if self._anchor_rotation_circle is not None:
-            self._anchor_rotation_circle.draw()
-        if self._anchor_position_circle is not None:
-            self._anchor_position_circle.draw()
+        if self._anchor_rotation_marker is not None or self._anchor_position_marker is not None:
+            _get_anchor_markers(self._batch).draw()
 
     def delete(self):
+        _dirty_shapes.discard(self)
+        self._dirty = False
+        if self._lod is not None:
+            self._lod.discard(self)
         super().delete()
-        if self._anchor_rotation_circle is not None:
-            self._anchor_rotation_circle.delete()
-        if self._anchor_position_circle is not None:
-            self._anchor_position_circle.delete()
+        self._remove_anchor_markers()
+
+    def _remove_anchor_markers(self):
+        markers = _anchor_markers.get(self._batch)
+        if markers is not None:
+            if self._anchor_rotation_marker is not None:
+                markers.remove(self._anchor_rotation_marker)
+            if self._anchor_position_marker is not None:
+                markers.remove(self._anchor_position_marker)
+        self._anchor_rotation_marker = None
+        self._anchor_position_marker = None
 
     def _update_anchor_position(self):
         if self._anchor_rotation_visible:
-            if self._anchor_rotation_circle is None:
-                self._anchor_rotation_circle = Circle(0, 0, 2, opacity=0, batch=self._batch)
+            markers = _get_anchor_markers(self._batch)
+            if self._anchor_rotation_marker is None:
+                self._anchor_rotation_marker = markers.add()
                 self._update_anchor_color()
-            self._anchor_rotation_circle.position = (self._x + self._anchor_x - self._anchor_position_x,
-                                                     self._y + self._anchor_y - self._anchor_position_y)
-            self._anchor_rotation_circle.visible = True
-        elif self._anchor_rotation_circle is not None:
-            self._anchor_rotation_circle.visible = False
+            markers.move(self._anchor_rotation_marker, self._x + self._anchor_x - self._anchor_position_x,
+                         self._y + self._anchor_y - self._anchor_position_y)
+        elif self._anchor_rotation_marker is not None:
+            _get_anchor_markers(self._batch).remove(self._anchor_rotation_marker)
+            self._anchor_rotation_marker = None
         if self._anchor_position_visible:
-            if self._anchor_position_circle is None:
-                self._anchor_position_circle = Circle(0, 0, 2, opacity=0, batch=self._batch)
+            markers = _get_anchor_markers(self._batch)
+            if self._anchor_position_marker is None:
+                self._anchor_position_marker = markers.add()
                 self._update_anchor_color()
-            self._anchor_position_circle.position = (self._x, self._y)
-            self._anchor_position_circle.visible = True
-        elif self._anchor_position_circle is not None:
-            self._anchor_position_circle.visible = False
+            markers.move(self._anchor_position_marker, self._x, self._y)
+        elif self._anchor_position_marker is not None:
+            _get_anchor_markers(self._batch).remove(self._anchor_position_marker)
+            self._anchor_position_marker = None
 
     def _update_anchor_color(self):
-        if self._anchor_rotation_circle is not None:
-            self._anchor_rotation_circle._rgb = (255 - c for c in self._rgb)
-            self._anchor_rotation_circle._opacity = self._opacity
-            self._anchor_rotation_circle._update_color()
-        if self._anchor_position_circle is not None:
-            self._anchor_position_circle._rgb = (255 - c for c in self._rgb)
-            self._anchor_position_circle._opacity = self._opacity
-            self._anchor_position_circle._update_color()
-
-    def _update_position(self):
+        if self._anchor_rotation_marker is None and self._anchor_position_marker is None:
+            return
+        markers = _get_anchor_markers(self._batch)
+        rgba = [255 - c for c in self._rgb] + [int(self._opacity)]
+        if self._anchor_rotation_marker is not None:
+            markers.set_color(self._anchor_rotation_marker, rgba)
+        if self._anchor_position_marker is not None:
+            markers.set_color(self._anchor_position_marker, rgba)
+
+    def _update_position(self, change=_GEOMETRY):
+        if change == _GEOMETRY and self._lod is not None:
+            self._update_lod()
+        if self._render_transform is not None:
+            # the cached rotated vertices may be those of the render transform, not of the rotation attribute
+            if self._render_transform[2] != self._rotation:
+                change = max(change, _ROTATION)
+            self._render_transform = None
+        self._pending_change = max(self._pending_change, change)
+        if not self._lazy:
+            self._update_vertices()
+        elif not self._dirty:
+            self._dirty = True
+            _dirty_shapes.add(self)
+
+    def _flush(self):
+        self._dirty = False
+        self._update_vertices()
+
+    def _update_vertices(self):
+        change, self._pending_change = self._pending_change, 0
         if not self._visible:
-            self._vertices = (0,) * len(self._vertices)
+            # the whole vertex list: it may have been resized since the vertices were calculated
+            self._vertices = (0,) * (self._vertex_list.get_size() * 2)
+            self._local_vertices = None  # calculated again, at the current size, once the shape is visible
         else:
-            self._get_vertices()
-            self._rotate_vertices()
-            self._translate_vertices()
-        self._vertex_list.vertices[:] = tuple(self._vertices)
+            if change == _GEOMETRY or self._local_vertices is None:
+                self._get_vertices()
+                self._local_vertices = self._vertices
+                change = _ROTATION
+            if change == _ROTATION or self._rotated_vertices is None:
+                if self._use_numpy:
+                    self._vertices = self._local_vertices
+                    self._rotate_vertices_numpy()
+                else:
+                    self._vertices = _refill(self._rotated_vertices, self._local_vertices)
+                    self._rotate_vertices()
+                self._rotated_vertices = self._vertices
+            if self._use_numpy:
+                self._translate_vertices_numpy()
+            else:
+                self._vertices = self._translated_vertices = _refill(self._translated_vertices, self._rotated_vertices)
+                self._translate_vertices()
+        self._upload_vertices()
         self._update_anchor_position()
 
+    def _upload_vertices(self):
+        start = time.perf_counter() if _upload_timers else None
+        # the vertex list may be larger than _vertices, see _resize_vertex_list
+        if self._use_numpy:
+            np.ctypeslib.as_array(self._vertex_list.vertices)[:len(self._vertices)] = self._vertices
+        else:
+            self._vertex_list.vertices[:len(self._vertices)] = self._vertices
+        if start is not None:
+            seconds = time.perf_counter() - start
+            for timer in _upload_timers:
+                timer(seconds)
+
     def _update_color(self):
+        self._color_buffer = array('B', (*self._rgb, int(self._opacity))) * self._vertex_list.get_size()
+        memoryview(self._vertex_list.colors).cast('B')[:] = self._color_buffer
+        self._update_anchor_color()
+
+    def _update_opacity(self):
+        """Write only the alpha channel of every vertex."""
+        alpha = array('B', (int(self._opacity),)) * self._vertex_list.get_size()
+        self._color_buffer[3::4] = alpha
+        memoryview(self._vertex_list.colors).cast('B')[3::4] = alpha
         self._update_anchor_color()
 
     def _calculate_vertices(self):
         """Calculate vertices before rotation and translation. Requires filling list _vertices."""
         raise NotImplementedError
 
+    def _lod_size(self):
+        """Return the (radius, angle) used by the LOD policy to choose segments."""
+        raise NotImplementedError
+
+    def _update_lod(self):
+        """Resize the vertex list if the LOD policy chooses other segments. Return True if it did."""
+        radius, angle = self._lod_size()
+        segments = self._lod.segments_for(radius, angle, self._segments)
+        if segments == self._segments:
+            return False
+        self._segments = segments
+        self._resize_fan_vertex_list()
+        return True
+
+    def _lod_changed(self):
+        if self._update_lod():
+            self._update_position()
+
     def _get_vertices(self):
         if self._frozen_vertices is None:
             self._calculate_vertices()
         else:
-            self._vertices = self._frozen_vertices.copy()
+            self._vertices = self._frozen_vertices  # read-only, the transforms write into their own buffers
 
     def _rotate_vertices(self):
         if self._rotation % 360 != 0:
+            # cos and sin are computed once, then each vertex is rotated around the anchor with a 2x2 matrix
             rotation = math.radians(self._rotation)
-            for i in range(0, len(self._vertices), 2):
-                x, y = self._vertices[i] - self._anchor_x, self._vertices[i + 1] - self._anchor_y
-                r = math.sqrt(x * x + y * y)
-                if r == 0:  # dot in anchor, no need to rotate
-                    continue
-                angle = math.asin(y / r)
-                if x < 0:
-                    angle = math.radians(180) - angle
-                angle += rotation
-                self._vertices[i] = math.cos(angle) * r + self._anchor_x
-                self._vertices[i + 1] = math.sin(angle) * r + self._anchor_y
+            cr, sr = math.cos(rotation), math.sin(rotation)
+            ax, ay = self._anchor_x, self._anchor_y
+            vertices = self._vertices
+            for i in range(0, len(vertices), 2):
+                x, y = vertices[i] - ax, vertices[i + 1] - ay
+                vertices[i] = x * cr - y * sr + ax
+                vertices[i + 1] = x * sr + y * cr + ay
 
     def _translate_vertices(self):
         for i in range(0, len(self._vertices), 2):
             self._vertices[i] += self._x - self._anchor_position_x
             self._vertices[i + 1] += self._y - self._anchor_position_y
 
+    def _rotate_vertices_numpy(self):
+        """Rotate _vertices around the anchor with a 2x2 matrix, storing a (n, 2) array in _vertices."""
+        points = np.asarray(self._vertices, dtype=np.float64).reshape(-1, 2)
+        if self._rotation % 360 != 0:
+            rotation = math.radians(self._rotation)
+            cr, sr = math.cos(rotation), math.sin(rotation)
+            anchor = np.array([self._anchor_x, self._anchor_y])
+            points = (points - anchor) @ np.array([[cr, sr], [-sr, cr]]) + anchor
+        self._vertices = points
+
+    def _translate_vertices_numpy(self):
+        """Translate the rotated vertices into a reusable float32 buffer, storing it flattened in _vertices."""
+        rotated = self._rotated_vertices
+        if self._translated_vertices is None or self._translated_vertices.shape != rotated.shape:
+            self._translated_vertices = np.empty(rotated.shape, dtype=np.float32)
+        offset = (self._x - self._anchor_position_x, self._y - self._anchor_position_y)
+        np.add(rotated, offset, out=self._translated_vertices)
+        self._vertices = self._translated_vertices.ravel()
+
+    def set_transform(self, x, y, rotation):
+        """Set x, y and rotation at once, updating the vertices a single time."""
+        change = _TRANSLATION if rotation == self._rotation else _ROTATION
+        self._x = x
+        self._y = y
+        self._rotation = rotation
+        self._update_position(change)
+
+    def set_render_transform(self, x, y, rotation):
+        """Draw the shape at x, y and rotation without changing its attributes, until they change or this is called
+        again. Used to draw shapes between two simulated states; pass the attributes to draw the shape at them again.
+        """
+        drawn = self._render_transform or (self._x, self._y, self._rotation)
+        if (x, y, rotation) == drawn and not self._pending_change:
+            return
+        self._pending_change = max(self._pending_change, _TRANSLATION if rotation == drawn[2] else _ROTATION)
+        if self._dirty:  # the pending changes are applied now
+            _dirty_shapes.discard(self)
+            self._dirty = False
+        attributes = self._x, self._y, self._rotation
+        self._x, self._y, self._rotation = x, y, rotation
+        self._update_vertices()
+        self._x, self._y, self._rotation = attributes
+        self._render_transform = None if (x, y, rotation) == attributes else (x, y, rotation)
+
     def freeze_rotation(self):
         """Store vertices after rotation and set rotation back to 0, so vertices can be rotated again from a different anchor point.
 
@@ -120,8 +442,14 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
         Only rotation, position and color changes will be displayed.
         """
         self._get_vertices()
+        self._vertices = list(self._vertices)
         self._rotate_vertices()
-        self._frozen_vertices = self._vertices.copy()
+        # a compact read-only snapshot, transforms read it without copying
+        if self._use_numpy:
+            self._frozen_vertices = np.array(self._vertices, dtype=np.float32)
+            self._frozen_vertices.flags.writeable = False
+        else:
+            self._frozen_vertices = memoryview(array('f', self._vertices)).toreadonly()
         self._rotation = 0
         self._anchor_x = 0
         self._anchor_y = 0
@@ -135,6 +463,147 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
         self._anchor_y = 0
         self._update_position()
 
+    @property
+    def x(self):
+        """X coordinate of the shape.
+
+        :type: int or float
+        """
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        self._update_position(_TRANSLATION)
+
+    @property
+    def y(self):
+        """Y coordinate of the shape.
+
+        :type: int or float
+        """
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self._update_position(_TRANSLATION)
+
+    @property
+    def position(self):
+        """The (x, y) coordinates of the shape, as a tuple.
+
+        :Parameters:
+            `x` : int or float
+                X coordinate of the shape.
+            `y` : int or float
+                Y coordinate of the shape.
+        """
+        return self._x, self._y
+
+    @position.setter
+    def position(self, values):
+        self._x, self._y = values
+        self._update_position(_TRANSLATION)
+
+    @property
+    def anchor_x(self):
+        """The X coordinate of the anchor rotation point.
+
+        :type: int or float
+        """
+        return self._anchor_x
+
+    @anchor_x.setter
+    def anchor_x(self, value):
+        self._anchor_x = value
+        self._update_position(_ROTATION)
+
+    @property
+    def anchor_y(self):
+        """The Y coordinate of the anchor rotation point.
+
+        :type: int or float
+        """
+        return self._anchor_y
+
+    @anchor_y.setter
+    def anchor_y(self, value):
+        self._anchor_y = value
+        self._update_position(_ROTATION)
+
+    @property
+    def anchor_position(self):
+        """The (x, y) coordinates of the anchor rotation point, as a tuple.
+
+        :Parameters:
+            `x` : int or float
+                X coordinate of the anchor rotation point.
+            `y` : int or float
+                Y coordinate of the anchor rotation point.
+        """
+        return self._anchor_x, self._anchor_y
+
+    @anchor_position.setter
+    def anchor_position(self, values):
+        self._anchor_x, self._anchor_y = values
+        self._update_position(_ROTATION)
+
+    @property
+    def opacity(self):
+        """Blend opacity.
+
+        This property sets the alpha component of the color of the shape.
+        With the default blend mode (see the constructor), this allows the
+        shape to be drawn with fractional opacity, blending with the
+        background.
+
+        An opacity of 255 (the default) has no effect.  An opacity of 128
+        will make the shape appear translucent.
+
+        :type: int
+        """
+        return self._opacity
+
+    @opacity.setter
+    def opacity(self, value):
+        self._opacity = value
+        self._update_opacity()
+
+    @property
+    def lazy(self):
+        """True if changes to the shape are applied on the next flush_shapes() call instead of immediately.
+
+        Setting several properties of a lazy shape in the same frame recomputes its vertices only once.
+
+        :type: bool
+        """
+        return self._lazy
+
+    @lazy.setter
+    def lazy(self, value):
+        self._lazy = value
+        if not value and self._dirty:
+            _dirty_shapes.discard(self)
+            self._flush()
+
+    @property
+    def lod(self):
+        """LODPolicy choosing the segments of the shape from its size, or None to keep them fixed.
+
+        :type: LODPolicy
+        """
+        return self._lod
+
+    @lod.setter
+    def lod(self, value):
+        if self._lod is not None:
+            self._lod.discard(self)
+        self._lod = value
+        if value is not None:
+            value.add(self)
+            self._lod_changed()
+
     @property
     def anchor_visible(self):
         """True if anchor rotation point (center of rotation) is drawn. Same as self.anchor_rotation_visible.
@@ -184,7 +653,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
     @rotation.setter
     def rotation(self, value):
         self._rotation = value
-        self._update_position()
+        self._update_position(_ROTATION)
 
     @property
     def anchor_position_x(self):
@@ -197,7 +666,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
     @anchor_position_x.setter
     def anchor_position_x(self, value):
         self._anchor_position_x = value
-        self._update_position()
+        self._update_position(_TRANSLATION)
 
     @property
     def anchor_position_y(self):
@@ -210,7 +679,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
     @anchor_position_y.setter
     def anchor_position_y(self, value):
         self._anchor_position_y = value
-        self._update_position()
+        self._update_position(_TRANSLATION)
 
     @property
     def anchor_position_position(self):
@@ -227,7 +696,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
     @anchor_position_position.setter
     def anchor_position_position(self, values):
         self._anchor_position_x, self._anchor_position_y = values
-        self._update_position()
+        self._update_position(_TRANSLATION)
 
     @property
     def anchor_rotation_x(self):
@@ -272,7 +741,7 @@ class _AdvancedShapeBase(pyglet.shapes._ShapeBase):
 
 class Circle(_AdvancedShapeBase):
     def __init__(self, x, y, radius, rotation=0, angle=360, start_angle=0, segments=None, color=(255, 255, 255), opacity=255,
-                 anchor_visible=False, closed=False, batch=None, group=None):
+                 anchor_visible=False, closed=False, indexed=False, lod=None, batch=None, group=None):
         """Create a circle, or a sector if angle is less than 360.
 
         The circle's anchor point (x, y) defaults to the center of the circle.
@@ -307,6 +776,12 @@ class Circle(_AdvancedShapeBase):
                 Whether to show anchor points or not.
             `closed` : bool
                 If True, the ends of the sector will be connected.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
+            `lod` : `LODPolicy`
+                Optional policy choosing the segments from the size of
+                the shape on screen, instead of fixed segments.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -318,42 +793,39 @@ class Circle(_AdvancedShapeBase):
         self._start_angle = start_angle
         self._radius = radius
         self._rotation = rotation
-        self._segments = segments or max(14, int(radius / 1.25))
+        self._segments = lod.segments_for(radius, angle) if lod is not None else segments or max(14, int(radius / 1.25))
         self._closed = closed
+        self._indexed = indexed
+        self._lod = lod
         self._rgb = color
         self._opacity = opacity
         self._anchor_rotation_visible = anchor_visible
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
 
-        self._vertex_list = self._batch.add((self._segments + 1) * 3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._vertex_list = self._add_fan_vertex_list()
+        if lod is not None:
+            lod.add(self)
         self._update_position()
         self._update_color()
 
+    def _rim_count(self):
+        return self._segments + 1
+
+    def _lod_size(self):
+        return self._radius, self._angle
+
     def _calculate_vertices(self):
         r = self._radius
-        start_angle = math.radians(self._start_angle)
-        tau_segs = math.radians(self._angle) / self._segments
 
-        # calculate the outer points of the circle
+        # scale the cached unit circle to get the outer points of the circle
         # the extra segment (+1) is to close sector if needed
-        points = [[r * math.cos(i * tau_segs + start_angle),
-                   r * math.sin(i * tau_segs + start_angle)] for i in range(self._segments + 1)]
+        points = [[r * c, r * s] for c, s in _unit_circle(self._segments, self._angle, self._start_angle)]
 
         # create a list of triangles from the points
-        self._vertices = []
-        for i in range(len(points) - 1):
-            self._vertices.extend(points[i] + [0, 0] + points[i + 1])
-        if self._closed:
-            self._vertices.extend(points[-1] + [0, 0] + points[0])
-        else:
-            self._vertices.extend(points[-1] + points[-1] + points[-1])
-
-    def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * (self._segments + 1) * 3
-        super()._update_color()
+        self._set_fan_vertices(points)
 
     @property
     def radius(self):
@@ -406,12 +878,30 @@ class Circle(_AdvancedShapeBase):
     @closed.setter
     def closed(self, value):
         self._closed = value
+        self._resize_fan_vertex_list()
+        if not self._indexed:  # indexed points are the same, only the last triangle changes
+            self._update_position()
+
+    @property
+    def segments(self):
+        """The number of triangles the circle is made from. If lod is set, it may choose other segments.
+
+        :type: int
+        """
+        return self._segments
+
+    @segments.setter
+    def segments(self, value):
+        self._segments = value
+        self._resize_fan_vertex_list()
         self._update_position()
 
 
 class Ellipse(_AdvancedShapeBase):
+    _closed = True
+
     def __init__(self, x, y, a, b, rotation=0, segments=None, color=(255, 255, 255), opacity=255,
-                 anchor_visible=False, batch=None, group=None):
+                 anchor_visible=False, indexed=False, lod=None, batch=None, group=None):
         """Create an ellipse.
 
         The ellipse's anchor point (x, y) defaults to the center of the ellipse.
@@ -428,6 +918,12 @@ class Ellipse(_AdvancedShapeBase):
             `color` : (int, int, int)
                 The RGB color of the ellipse. specify as a tuple of
                 three ints in the range of 0~255.
+            `indexed` : bool
+                If True, store each outer point once plus the center and
+                draw the triangles through a cached index buffer.
+            `lod` : `LODPolicy`
+                Optional policy choosing the segments from the size of
+                the shape on screen, instead of fixed segments.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -438,33 +934,41 @@ class Ellipse(_AdvancedShapeBase):
         self._a = a
         self._b = b
         self._rotation = rotation
-        self._segments = segments or max(14, int(max(a, b) / 1.25))
+        self._segments = lod.segments_for(max(a, b)) if lod is not None else segments or max(14, int(max(a, b) / 1.25))
+        self._indexed = indexed
+        self._lod = lod
         self._rgb = color
         self._opacity = opacity
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
 
-        self._vertex_list = self._batch.add(self._segments * 3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
+        self._vertex_list = self._add_fan_vertex_list()
+        if lod is not None:
+            lod.add(self)
         self._update_position()
         self._update_color()
 
+    def _rim_count(self):
+        return self._segments
+
+    def _lod_size(self):
+        return max(self._a, self._b), 360
+
     def _calculate_vertices(self):
-        tau_segs = math.pi * 2 / self._segments
+        a, b = self._a, self._b
 
-        # calculate the outer points of the ellipse
-        points = [[self._a * math.cos(i * tau_segs),
-                   self._b * math.sin(i * tau_segs)] for i in range(self._segments)]
+        # scale the cached unit circle to get the outer points of the ellipse (the last point repeats the first one)
+        points = [[a * c, b * s] for c, s in _unit_circle(self._segments)[:-1]]
+        if self._indexed:
+            self._set_fan_vertices(points)
+            return
 
         # create a list of lines from the points
         self._vertices = []
         for i, point in enumerate(points):
             self._vertices.extend([0, 0] + points[i - 1] + point)
 
-    def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * self._segments * 3
-        super()._update_color()
-
     @property
     def a(self):
         """The semi-major axes of the ellipse.
@@ -535,7 +1039,7 @@ class Rectangle(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(6, GL_TRIANGLES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
@@ -547,10 +1051,6 @@ class Rectangle(_AdvancedShapeBase):
         y2 = self._height / 2
         self._vertices = [x1, y1, x2, y1, x2, y2, x1, y1, x1, y2, x2, y2]
 
-    def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * 6
-        super()._update_color()
-
     @property
     def width(self):
         """The width of the rectangle.
@@ -634,7 +1134,7 @@ class Triangle(_AdvancedShapeBase):
         self._anchor_position_visible = anchor_visible
 
         self._batch = batch or Batch()
-        self._group = pyglet.shapes._ShapeGroup(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
+        self._group = get_shape_group(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, group)
         self._vertex_list = self._batch.add(3, GL_TRIANGLES, self._group, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
@@ -642,10 +1142,6 @@ class Triangle(_AdvancedShapeBase):
     def _calculate_vertices(self):
         self._vertices = [0, 0, self._x2, self._y2, self._x3, self._y3]
 
-    def _update_color(self):
-        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * 3
-        super()._update_color()
-
     def set_vertices(self, x1=None, y1=None, x2=None, y2=None, x3=None, y3=None, relative_points=False):
         """Update any vertices in the triangle. If relative_points, (x2, y2) and (x3, y3) are an offset of (x, y)."""
         self._x = x1 if x1 is not None else self._x
@@ -669,7 +1165,7 @@ class Triangle(_AdvancedShapeBase):
     @x1.setter
     def x1(self, value):
         self._x = value
-        self._update_position()
+        self._update_position(_TRANSLATION)
 
     @property
     def x2(self):
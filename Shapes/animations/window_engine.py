@@ -3,15 +3,403 @@
 First approach to engine
 """
 import math
+import time
 import pyglet
 
+from v1 import count_draw_calls, flush_shapes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, motions with a batch form then run shape by shape
+    np = None
+
+
+_dirty_nodes = set()  # transform nodes changed since the last update_transforms(), whose parent did not change
+
+
+def update_transforms():
+    """Recompute the world transform of changed nodes and their descendants, and move the shapes attached to them."""
+    nodes = sorted(_dirty_nodes, key=lambda node: node.depth)  # parents before children
+    _dirty_nodes.clear()
+    for node in nodes:
+        if node._dirty:
+            node._update_world()
+
+
+def _multiply(m, n):
+    """Multiply two 2D affine matrices (a, b, c, d, tx, ty), that is [[a, c, tx], [b, d, ty]]."""
+    a, b, c, d, tx, ty = m
+    a2, b2, c2, d2, tx2, ty2 = n
+    return (a * a2 + c * b2, b * a2 + d * b2,
+            a * c2 + c * d2, b * c2 + d * d2,
+            a * tx2 + c * ty2 + tx, b * tx2 + d * ty2 + ty)
+
+
+class TransformNode():
+
+    def __init__(self, x=0, y=0, rotation=0, parent=None, shapes=None):
+        """Initialize a node of a scene graph, placed at (x, y) and rotated (degrees) relative to its parent.
+
+        Every node caches its local and world matrices. Moving or rotating a node marks it and its descendants as
+        dirty, and update_transforms() (called by EngineWindow after each update) recomputes the world matrix of
+        dirty nodes only, parents first. Shapes attached to a node are leaves placed at the node origin: they
+        receive the world position and rotation through set_transform (advanced shapes from v1).
+        """
+        self._x = x
+        self._y = y
+        self._rotation = rotation
+        self._parent = None
+        self.depth = 0
+        self.children = []
+        self.shapes = []
+        self._local = None
+        self._world = None
+        self._dirty = False
+        self._invalidate()
+        if parent is not None:
+            parent.add_child(self)
+        for shape in (shapes if type(shapes) is list else ([shapes] if shapes is not None else [])):
+            self.attach(shape)
+
+    def add_child(self, node):
+        """Make node a child of this node, keeping its local transform."""
+        if node._parent is not None:
+            node._parent.children.remove(node)
+        node._parent = self
+        self.children.append(node)
+        node._set_depth(self.depth + 1)
+        node._dirty = False  # force invalidation of the whole subtree
+        node._invalidate()
+
+    def remove_child(self, node):
+        """Detach node, which becomes a root keeping its local transform."""
+        self.children.remove(node)
+        node._parent = None
+        node._set_depth(0)
+        node._dirty = False
+        node._invalidate()
+
+    def attach(self, shape):
+        """Attach an advanced shape, moved with the world transform of the node."""
+        self.shapes.append(shape)
+        if self._world is not None and not self._dirty:
+            shape.set_transform(*self._world_position_rotation())
+
+    def detach(self, shape):
+        self.shapes.remove(shape)
+
+    def _set_depth(self, depth):
+        self.depth = depth
+        for child in self.children:
+            child._set_depth(depth + 1)
+
+    def _invalidate(self, local=True):
+        """Mark the world matrix of the node and its descendants as dirty. Stops at nodes already dirty."""
+        if local:
+            self._local = None
+        if self._dirty:
+            return
+        self._dirty = True
+        if self._parent is None or not self._parent._dirty:
+            _dirty_nodes.add(self)
+        for child in self.children:
+            child._invalidate(local=False)
+
+    def _update_world(self):
+        if self._local is None:
+            r = math.radians(self._rotation)
+            cr, sr = math.cos(r), math.sin(r)
+            self._local = (cr, sr, -sr, cr, self._x, self._y)
+        self._world = self._local if self._parent is None else _multiply(self._parent._world, self._local)
+        self._dirty = False
+        if self.shapes:
+            x, y, rotation = self._world_position_rotation()
+            for shape in self.shapes:
+                shape.set_transform(x, y, rotation)
+        for child in self.children:
+            if child._dirty:
+                child._update_world()
+
+    def _world_position_rotation(self):
+        a, b, c, d, tx, ty = self._world
+        return tx, ty, math.degrees(math.atan2(b, a))
+
+    @property
+    def local_matrix(self):
+        """Transform relative to the parent, as (a, b, c, d, tx, ty) for the matrix [[a, c, tx], [b, d, ty]]."""
+        if self._local is None:
+            update_transforms()
+        return self._local
+
+    @property
+    def world_matrix(self):
+        """Transform relative to the scene, as (a, b, c, d, tx, ty) for the matrix [[a, c, tx], [b, d, ty]]."""
+        if self._dirty:
+            update_transforms()
+        return self._world
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        self._invalidate()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self._invalidate()
+
+    @property
+    def position(self):
+        return self._x, self._y
+
+    @position.setter
+    def position(self, values):
+        self._x, self._y = values
+        self._invalidate()
+
+    @property
+    def rotation(self):
+        """Rotation relative to the parent, in degrees, with the same direction as advanced shapes rotation."""
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self._rotation = value
+        self._invalidate()
+
+
+def _circles_overlap(c1, c2):
+    x1, y1, r1 = c1
+    x2, y2, r2 = c2
+    return (x1 - x2) ** 2 + (y1 - y2) ** 2 <= (r1 + r2) ** 2
+
+
+def _squares_overlap(s1, s2):
+    x1, y1, w1, h1 = s1
+    x2, y2, w2, h2 = s2
+    return x1 <= x2 + w2 and x2 <= x1 + w1 and y1 <= y2 + h2 and y2 <= y1 + h1
+
+
+def _circle_square_overlap(circle, square):
+    cx, cy, r = circle
+    x, y, w, h = square
+    dx = cx - min(max(cx, x), x + w)
+    dy = cy - min(max(cy, y), y + h)
+    return dx * dx + dy * dy <= r * r
+
+
+def _motion_name(motion):
+    """Name under which the profiler records the time of unnamed objects using motion."""
+    return getattr(motion, '__name__', type(motion).__name__)
+
+
+def batch_motion(batch):
+    """Decorate a motion(shape, dt, window, object) with its batch form batch(shapes, objects, dt, window).
+
+    EngineWindow.update calls the batch form once for consecutive objects sharing the motion, with the shape of each
+    object, and it must leave them as the plain motion would. Objects with several shapes use the plain motion, which
+    updates the object once per shape. The batch form is expected to work on NumPy arrays, so the plain motion is used
+    when NumPy is not installed.
+    """
+    def decorator(motion):
+        motion.batch = batch
+        return motion
+    return decorator
+
+
+def _gather(items, *names):
+    """Return one float array per attribute name, with the attribute of every item."""
+    return [np.fromiter((getattr(item, name) for item in items), dtype=float, count=len(items)) for name in names]
+
+
+def _scatter(items, name, values):
+    for item, value in zip(items, values.tolist()):
+        setattr(item, name, value)
+
+
+def _set_positions(shapes, x, y):
+    # x then y, like the plain motions: the position of a Triangle, Line or Polygon is more than (x, y)
+    for shape, x, y in zip(shapes, x.tolist(), y.tolist()):
+        shape.x = x
+        shape.y = y
+
+
+def _move_batch(shapes, objects, dt):
+    x, y = _gather(shapes, 'x', 'y')
+    vx, vy, ax, ay = _gather(objects, 'vx', 'vy', 'ax', 'ay')
+    x += vx * dt + 0.5 * ax * dt * dt
+    y += vy * dt + 0.5 * ay * dt * dt
+    vx += ax * dt
+    vy += ay * dt
+    return x, y, vx, vy
+
+
+def _bounce_batch(shapes, objects, dt, window):
+    x, y, vx, vy = _move_batch(shapes, objects, dt)
+    vx = np.where(x < 0, np.abs(vx), np.where(x >= window.width, -np.abs(vx), vx))
+    vy = np.where(y < 0, np.abs(vy), np.where(y >= window.height, -np.abs(vy), vy))
+    _set_positions(shapes, x, y)
+    _scatter(objects, 'vx', vx)
+    _scatter(objects, 'vy', vy)
+
+
+@batch_motion(_bounce_batch)
+def bounce_motion(shape, dt, window, object):
+    """Move with object.vx, vy and acceleration ax, ay, bouncing on the window borders."""
+    shape.x += object.vx * dt + 0.5 * object.ax * dt * dt
+    shape.y += object.vy * dt + 0.5 * object.ay * dt * dt
+    object.vx += object.ax * dt
+    object.vy += object.ay * dt
+    if shape.x < 0:
+        object.vx = abs(object.vx)
+    if shape.x >= window.width:
+        object.vx = -abs(object.vx)
+    if shape.y < 0:
+        object.vy = abs(object.vy)
+    if shape.y >= window.height:
+        object.vy = -abs(object.vy)
+
+
+def _warp_batch(shapes, objects, dt, window):
+    x, y, vx, vy = _move_batch(shapes, objects, dt)
+    _set_positions(shapes, x % window.width, y % window.height)
+    _scatter(objects, 'vx', vx)
+    _scatter(objects, 'vy', vy)
+
+
+@batch_motion(_warp_batch)
+def warp_motion(shape, dt, window, object):
+    """Move with object.vx, vy and acceleration ax, ay, reappearing on the opposite side of the window."""
+    shape.x += object.vx * dt + 0.5 * object.ax * dt * dt
+    shape.y += object.vy * dt + 0.5 * object.ay * dt * dt
+    object.vx += object.ax * dt
+    object.vy += object.ay * dt
+    shape.x = shape.x % window.width
+    shape.y = shape.y % window.height
+
+
+def _oscillate_batch(shapes, objects, dt, window):
+    x0, y0, amplitude_x, amplitude_y, frequency, phase = _gather(
+        objects, 'x0', 'y0', 'amplitude_x', 'amplitude_y', 'frequency', 'phase')
+    s = np.sin(2 * math.pi * frequency * window.t + phase)
+    _set_positions(shapes, x0 + amplitude_x * s, y0 + amplitude_y * s)
+
+
+@batch_motion(_oscillate_batch)
+def oscillate_motion(shape, dt, window, object):
+    """Oscillate around (object.x0, y0) by (amplitude_x, amplitude_y), object.frequency times per second from phase."""
+    s = math.sin(2 * math.pi * object.frequency * window.t + object.phase)
+    shape.x = object.x0 + object.amplitude_x * s
+    shape.y = object.y0 + object.amplitude_y * s
+
+
+class CollisionSystem():
+
+    def __init__(self, cell_size=64):
+        """Initialize collision detection between the hitboxes of engine objects.
+
+        Objects are placed in a uniform grid of cell_size pixels (a spatial hash rebuilt every step) and only objects
+        sharing a cell are tested against each other, so the cost grows linearly with the number of objects as long
+        as cell_size is close to the size of the objects. Only categories with a registered callback are tested.
+        """
+        self.cell_size = cell_size
+        self._callbacks = {}  # (category, category) -> callback(object, other_object, window)
+        self._categories = set()
+
+    def on_collision(self, category, other_category, callback):
+        """Call callback(object, other_object, window) on every step where objects of these categories overlap."""
+        self._callbacks[(category, other_category)] = callback
+        self._categories.update((category, other_category))
+
+    def _world_hitboxes(self, obj):
+        """Return circles (x, y, radius), squares (x, y, width, height) and bounding box of obj in window coordinates."""
+        x, y = obj.get_position()
+        circles = [(x + dx, y + dy, r) for dx, dy, r in obj.hitboxes_circle]
+        squares = [(x + dx, y + dy, w, h) for dx, dy, w, h in obj.hitboxes_square]
+        boxes = [(cx - r, cy - r, cx + r, cy + r) for cx, cy, r in circles] + \
+                [(sx, sy, sx + w, sy + h) for sx, sy, w, h in squares]
+        bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+        return circles, squares, bounds
+
+    def find_pairs(self, objects):
+        """Return the (object, other_object) pairs of overlapping objects with a registered callback, once each."""
+        if not self._callbacks:
+            return []
+        size = self.cell_size
+        cells = {}
+        hitboxes = {}
+        for obj in objects:
+            if obj.category not in self._categories or not (obj.hitboxes_circle or obj.hitboxes_square):
+                continue
+            circles, squares, (x1, y1, x2, y2) = hitboxes[obj] = self._world_hitboxes(obj)
+            for i in range(int(x1 // size), int(x2 // size) + 1):
+                for j in range(int(y1 // size), int(y2 // size) + 1):
+                    cells.setdefault((i, j), []).append(obj)
+
+        pairs = []
+        tested = set()
+        for cell_objects in cells.values():
+            for a in range(len(cell_objects)):
+                for b in range(a + 1, len(cell_objects)):
+                    obj, other = cell_objects[a], cell_objects[b]
+                    if (obj.category, other.category) not in self._callbacks:
+                        if (other.category, obj.category) not in self._callbacks:
+                            continue
+                        obj, other = other, obj
+                    key = (id(obj), id(other))
+                    if key in tested:
+                        continue
+                    tested.add(key)
+                    if self._overlap(hitboxes[obj], hitboxes[other]):
+                        pairs.append((obj, other))
+        return pairs
+
+    @staticmethod
+    def _overlap(hitboxes, other_hitboxes):
+        circles, squares, (x1, y1, x2, y2) = hitboxes
+        other_circles, other_squares, (ox1, oy1, ox2, oy2) = other_hitboxes
+        if x1 > ox2 or ox1 > x2 or y1 > oy2 or oy1 > y2:
+            return False
+        return (any(_circles_overlap(c, o) for c in circles for o in other_circles) or
+                any(_squares_overlap(s, o) for s in squares for o in other_squares) or
+                any(_circle_square_overlap(c, s) for c in circles for s in other_squares) or
+                any(_circle_square_overlap(c, s) for c in other_circles for s in squares))
+
+    def update(self, objects, window):
+        """Call the callback of every pair of overlapping objects."""
+        for obj, other in self.find_pairs(objects):
+            self._callbacks[(obj.category, other.category)](obj, other, window)
+
 
 class EngineWindow(pyglet.window.Window):
 
-    def __init__(self, width: int, height: int, batch=None, interval=1 / 30, *args, **kwargs):
+    _interpolated_attributes = ('x', 'y', 'rotation')
+
+    def __init__(self, width: int, height: int, batch=None, interval=1 / 30, fixed_step=None, max_steps=5, interpolate=True,
+                 *args, **kwargs):
         """Initailize window, and objects inside.
 
         Choose window attributes: width, height, caption, resizable, style, fullscreen, visible, vsync.
+
+        By default update is called every interval seconds with the elapsed time. If fixed_step is set, the simulation
+        instead advances in steps of exactly fixed_step seconds, as many as the elapsed time allows (at most max_steps
+        per frame, the rest of the time is dropped), while rendering runs every frame (uncapped, or at the refresh rate
+        with vsync). If interpolate is True, shapes are drawn between their two last simulated states (x, y and
+        rotation, turning the shortest way), according to the time left in the accumulator. Shapes with a
+        set_render_transform method (v1 shapes) keep their simulated attributes; the attributes of other shapes hold
+        the drawn state until the next fixed step.
         """
         super().__init__(width, height, *args, **kwargs)
 
@@ -20,61 +408,210 @@ class EngineWindow(pyglet.window.Window):
         self.batch = batch
 
         self.interval = interval
-
-        self.objects = []
+        self.draw_calls = 0  # draw calls issued by the last on_draw
+        self.profiler = None  # FrameProfiler recording frame times, see profiler.FrameProfiler.attach
+        self.recorder = None  # FrameRecorder capturing each drawn frame, see recorder.FrameRecorder.attach
+
+        self.fixed_step = fixed_step
+        self.max_steps = max_steps
+        self.interpolate = interpolate
+        self.alpha = 0  # fraction of a fixed step between the last simulated state and the time of the frame
+        self._accumulator = 0
+        self._states = {}  # object -> [(shape, [(attribute, value before, value after the last fixed step)])]
+        self._drawn_states = []  # (object, shape, attribute, simulated value) of attributes set to an interpolated value
+
+        self.objects = []  # removing an object moves the last object to its place
+        self._indices = {}  # object -> index in self.objects
+        self._objects_by_name = {}  # name -> dict of the objects with this name (keys), in the order they were added
+        self._removed_objects = {}  # objects (keys) to remove at the end of the current tick, in the order they were chosen
+        self.collisions = CollisionSystem()
 
     def add_objects(self, objects):
-        """Extend objects."""
+        """Extend objects. The objects themselves are the handles to get or remove them later."""
+        objects = [objects] if type(objects) is not list else objects
+        for obj in objects:
+            self._indices[obj] = len(self.objects)
+            self.objects.append(obj)
+            if obj.name is not None:
+                self._objects_by_name.setdefault(obj.name, {})[obj] = None
+
+    def get_object(self, name):
+        """Return the first added object with the chosen name, or None."""
+        return next(iter(self._objects_by_name.get(name, ())), None)
+
+    def get_objects(self, name):
+        """Return the list of objects with the chosen name."""
+        return list(self._objects_by_name.get(name, ()))
+
+    def remove_objects(self, objects):
+        """Remove the chosen objects at the end of the next update, all at once (see apply_removals)."""
         objects = [objects] if type(objects) is not list else objects
-        self.objects.extend(objects)
+        self._removed_objects.update((obj, None) for obj in objects if obj in self._indices)
 
     def remove_objects_by_index(self, indices):
-        """Remove all objects with chosen object indices."""
-        new_objects = []
-        removed_objects = []
+        """Remove all objects with chosen object indices, as they are when this is called."""
         indices = [indices] if type(indices) is int else indices
-        for i, obj in enumerate(self.objects):
-            if i in indices:
-                removed_objects.append(obj)
-            else:
-                new_objects.append(obj)
-        self.objects = new_objects
-        for obj in removed_objects:
-            obj.delete()
+        self.remove_objects([self.objects[i] for i in indices])
 
     def remove_objects_by_name(self, names):
         """Remove all objects with chosen object names."""
-        new_objects = []
-        removed_objects = []
-        names = [names] if type(names) is int else names
-        for obj in self.objects:
-            if obj.name in names:
-                removed_objects.append(obj)
-            else:
-                new_objects.append(obj)
-        self.objects = new_objects
-        for obj in removed_objects:
-            obj.delete()
+        names = [names] if type(names) in (str, int) else names
+        self.remove_objects([obj for name in names for obj in self._objects_by_name.get(name, ())])
+
+    def apply_removals(self):
+        """Remove and delete the objects scheduled for removal in the order they were chosen, moving the last objects
+        into their places."""
+        while self._removed_objects:  # objects whose delete() removes other objects are followed by them
+            removed, self._removed_objects = self._removed_objects, {}
+            for obj in removed:
+                index = self._indices.pop(obj)
+                last = self.objects.pop()
+                if last is not obj:
+                    self.objects[index] = last
+                    self._indices[last] = index
+                if obj.name is not None:
+                    named = self._objects_by_name[obj.name]
+                    del named[obj]
+                    if not named:
+                        del self._objects_by_name[obj.name]
+                obj.delete()
 
     def on_draw(self):
-        """Clear the screen and draw objects in self.batch."""
+        """Clear the screen, apply pending changes of lazy shapes, and draw objects in self.batch."""
         self.clear()
+        if self.fixed_step is not None and self.interpolate:
+            self._interpolate_states()
+        profiler = self.profiler
+        start = time.perf_counter()
+        flush_shapes()
+        flushed = time.perf_counter()
         if self.batch is not None:
             self.batch.draw()
+            self.draw_calls = count_draw_calls(self.batch)
         else:
             for obj in self.objects:
                 obj.draw()
+            self.draw_calls = sum(len(obj.shapes) for obj in self.objects)
+        if self.recorder is not None:
+            self.recorder.record()
+        if profiler is not None:
+            drawn = time.perf_counter()
+            profiler.add('flush', flushed - start)
+            profiler.add('draw', drawn - flushed)
+            if profiler.overlay:
+                profiler.draw_overlay(self)
+            profiler.end_frame()
 
     def update(self, dt):
-        """Animate objects."""
+        """Animate objects, move the shapes attached to transform nodes that changed, and remove objects."""
+        profiler = self.profiler
+        start = time.perf_counter()
         if not self.paused:
             self.t += dt
+            groups = {}  # motion with a batch form -> consecutive objects using it
             for obj in self.objects:
-                obj.update(dt, self)
+                if np is not None and len(obj.shapes) == 1 and getattr(obj.motion, 'batch', None) is not None:
+                    groups.setdefault(obj.motion, []).append(obj)
+                    continue
+                # batch motions only change their own objects, running them first keeps the order of the objects
+                self._update_groups(groups, dt)
+                if profiler is None:
+                    obj.update(dt, self)
+                else:
+                    motion_start = time.perf_counter()
+                    obj.update(dt, self)
+                    profiler.add_motion(obj.name if obj.name is not None else _motion_name(obj.motion),
+                                        time.perf_counter() - motion_start)
+            self._update_groups(groups, dt)
+            update_transforms()
+            self.collisions.update(self.objects, self)
+        self.apply_removals()
+        if profiler is not None:
+            profiler.add('update', time.perf_counter() - start)
+
+    def _update_groups(self, groups, dt):
+        """Call the batch form of each motion once for its objects, and empty groups."""
+        profiler = self.profiler
+        for motion, objects in groups.items():
+            motion_start = time.perf_counter()
+            motion.batch([obj.shapes[0] for obj in objects], objects, dt, self)
+            if profiler is not None:
+                profiler.add_motion(_motion_name(motion), time.perf_counter() - motion_start)
+        groups.clear()
+
+    def tick(self, dt):
+        """Advance the simulation by as many fixed steps as fit in the elapsed time, keeping the remainder for later."""
+        if self.paused:
+            self.apply_removals()
+            return
+        self._accumulator += dt
+        steps = int(self._accumulator / self.fixed_step)
+        if steps > self.max_steps:  # too far behind, drop the whole steps that cannot be caught up
+            self._accumulator -= (steps - self.max_steps) * self.fixed_step
+            steps = self.max_steps
+        if steps:
+            self._restore_states()
+        for i in range(steps):
+            if self.interpolate and i == steps - 1:
+                self._save_states()
+            self.update(self.fixed_step)
+            self._accumulator -= self.fixed_step
+        if steps and self.interpolate:
+            self._complete_states()
+        self.alpha = self._accumulator / self.fixed_step
+
+    def _save_states(self):
+        """Record the attributes of the shapes before the last fixed step."""
+        self._states = {obj: [(shape, [(attribute, getattr(shape, attribute))
+                                       for attribute in self._interpolated_attributes if hasattr(shape, attribute)])
+                              for shape in obj.shapes]
+                        for obj in self.objects}
+
+    def _complete_states(self):
+        """Add the attributes of the shapes after the last fixed step, forgetting removed and added objects."""
+        states = self._states
+        self._states = {obj: [(shape, [(attribute, previous, getattr(shape, attribute)) for attribute, previous in values])
+                              for shape, values in states[obj]]
+                        for obj in self.objects if obj in states}
+
+    def _interpolate_states(self):
+        """Draw shapes between their two last simulated states.
+
+        v1 shapes are drawn with set_render_transform, other shapes get interpolated attributes, restored before the
+        next fixed step.
+        """
+        alpha = self.alpha
+        self._drawn_states = []
+        for obj in self.objects:
+            for shape, values in self._states.get(obj, ()):
+                interpolated = []
+                for attribute, previous, current in values:
+                    change = current - previous
+                    if attribute == 'rotation':
+                        change = (change + 180) % 360 - 180  # 359 to 1 degrees turns by 2 degrees, not -358
+                    interpolated.append(previous + change * alpha if change else current)
+                set_render_transform = getattr(shape, 'set_render_transform', None)
+                if set_render_transform is not None:
+                    set_render_transform(*interpolated)
+                    continue
+                for (attribute, previous, current), value in zip(values, interpolated):
+                    if previous != current:
+                        setattr(shape, attribute, value)
+                        self._drawn_states.append((obj, shape, attribute, current))
+
+    def _restore_states(self):
+        """Set back the simulated attributes changed by _interpolate_states, skipping removed objects."""
+        for obj, shape, attribute, value in self._drawn_states:
+            if obj in self._indices:
+                setattr(shape, attribute, value)
+        self._drawn_states = []
 
     def run(self):
-        """Start run."""
-        pyglet.clock.schedule_interval(self.update, self.interval)
+        """Start run, updating every interval seconds, or every frame in fixed steps if fixed_step is set."""
+        if self.fixed_step is None:
+            pyglet.clock.schedule_interval(self.update, self.interval)
+        else:
+            pyglet.clock.schedule(self.tick)
         pyglet.app.run()
 
     def toggle_pause(self):
@@ -88,12 +625,14 @@ class EngineObject():
         """Initialize engine object.
 
         Every object can have:
-            * a unique name
+            * a name, which several objects may share
             * a category (this should be an enum)
             * a list of shapes that will be drawn (if only one, there is no need to pass a list)
             * a motion function with logic on how every shape will be transformed on update
                 def motion(shape, dt, window, object)
-            * hitboxes
+              with an optional batch form for all the objects sharing it (see batch_motion)
+            * hitboxes, relative to get_position(): circles (dx, dy, radius) and squares (dx, dy, width, height),
+              where (dx, dy) is the lower left corner; tested by EngineWindow.collisions
         """
         self.name = name
         self.category = category
@@ -130,6 +669,10 @@ class EngineObject():
         """Return anchor position, by default it is the anchor of the first shape."""
         return self.shapes[0].anchor_position
 
+    def get_position(self):
+        """Return the position hitboxes are relative to, by default the position of the first shape."""
+        return self.shapes[0].x, self.shapes[0].y
+
 
 def main():
     """Main function."""
@@ -144,27 +687,7 @@ def main():
     circle_object = EngineObject(shapes=circle, motion=circle_motion)
 
     ball = pyglet.shapes.Circle(360, 240, 30, color=(255, 0, 255), batch=batch)
-    def ball_motion_warp(shape, dt, window, object):
-        shape.x += object.vx * dt + 0.5 * object.ax * dt * dt
-        shape.y += object.vy * dt + 0.5 * object.ay * dt * dt
-        object.vx += object.ax * dt
-        object.vy += object.ay * dt
-        shape.x = shape.x % window.width
-        shape.y = shape.y % window.height
-    def ball_motion_bounce(shape, dt, window, object):
-        shape.x += object.vx * dt + 0.5 * object.ax * dt * dt
-        shape.y += object.vy * dt + 0.5 * object.ay * dt * dt
-        object.vx += object.ax * dt
-        object.vy += object.ay * dt
-        if shape.x < 0:
-            object.vx = abs(object.vx)
-        if shape.x >= window.width:
-            object.vx = -abs(object.vx)
-        if shape.y < 0:
-            object.vy = abs(object.vy)
-        if shape.y >= window.height:
-            object.vy = -abs(object.vy)
-    ball_object = EngineObject(shapes=ball, motion=ball_motion_bounce)
+    ball_object = EngineObject(shapes=ball, motion=bounce_motion)
     ball_object.vx = 300
     ball_object.vy = 0
     ball_object.ax = 0
@@ -0,0 +1,264 @@
+"""
+Benchmarks of the advanced shapes
+
+Creates count shapes of each kind (Circle, Ellipse, Rectangle, Triangle, Star, Line of advanced_shapes_v0, and the
+animations/v1 Circle, with its indexed and pure Python variants, Ellipse, Rectangle and Triangle), then animates
+their rotation, scale, color and anchor for a fixed number of frames. Values come from a fake clock advanced by a fixed
+step each frame, so every run does the same work and ends with the same vertices. Reports, for each shape and
+operation, the number of shape updates per second.
+
+No display is needed: by default shapes are added to a StubBatch (vertices are computed and written to memory, but not
+sent to OpenGL); with --headless they use a real batch in pyglet's headless (EGL) mode.
+
+Results are compared with a JSON baseline: different final vertices or colors fail the run (exit code 1). Throughputs
+depend on the machine, they are only reported, unless --check-throughput is given (or the BENCHMARK_CHECK_THROUGHPUT
+environment variable is set to 1): then a throughput lower than the baseline by more than the tolerance also fails the
+run. Record the baseline on the machine checking throughputs with --update.
+
+    python run_benchmarks.py                  # compare with baseline.json
+    python run_benchmarks.py --update         # record baseline.json
+    python run_benchmarks.py --check-throughput --tolerance 0.3 --baseline my_machine.json
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+import pyglet
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHAPES_DIR = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+OPERATIONS = ('create', 'rotation', 'scale', 'color', 'anchor')
+
+
+def _place(i):
+    return 20 + (i * 37) % 760, 20 + (i * 53) % 560
+
+
+def shape_specs(shapes):
+    """Return a dict name -> (create(i, batch), scale(shape, s)) for each benchmarked shape of module shapes."""
+    place = _place
+
+    def scale_triangle(shape, s):
+        shape.x2, shape.y2 = shape.x + 40 * s, shape.y
+        shape.x3, shape.y3 = shape.x + 20 * s, shape.y + 30 * s
+
+    def scale_line(shape, s):
+        shape.x2, shape.y2 = shape.x + 50 * s, shape.y + 20 * s
+        shape.width = 4 * s
+
+    return {
+        'Circle': (lambda i, batch: shapes.Circle(*place(i), 20, batch=batch),
+                   lambda shape, s: setattr(shape, 'radius', 20 * s)),
+        'Ellipse': (lambda i, batch: shapes.Ellipse(*place(i), 30, 15, batch=batch),
+                    lambda shape, s: (setattr(shape, 'a', 30 * s), setattr(shape, 'b', 15 * s))),
+        'Rectangle': (lambda i, batch: shapes.Rectangle(*place(i), 40, 25, batch=batch),
+                      lambda shape, s: (setattr(shape, 'width', 40 * s), setattr(shape, 'height', 25 * s))),
+        'Triangle': (lambda i, batch: shapes.Triangle(*place(i), place(i)[0] + 40, place(i)[1],
+                                                      place(i)[0] + 20, place(i)[1] + 30, batch=batch),
+                     scale_triangle),
+        'Star': (lambda i, batch: shapes.Star(*place(i), 25, 10, 5, batch=batch),
+                 lambda shape, s: (setattr(shape, 'outer_radius', 25 * s), setattr(shape, 'inner_radius', 10 * s))),
+        'Line': (lambda i, batch: shapes.Line(*place(i), place(i)[0] + 50, place(i)[1] + 20, width=4, batch=batch),
+                 scale_line),
+    }
+
+
+def v1_shape_specs(v1):
+    """Return the specs of the benchmarked shapes of animations/v1, see shape_specs."""
+    place = _place
+
+    def scale_triangle(shape, s):
+        # v1 keeps the second and third points relative to the first one
+        shape.x2, shape.y2 = 40 * s, 0
+        shape.x3, shape.y3 = 20 * s, 30 * s
+
+    def pure_circle(i, batch):
+        v1._AdvancedShapeBase._use_numpy = False
+        try:
+            circle = v1.Circle(*place(i), 20, batch=batch)
+        finally:
+            v1._AdvancedShapeBase._use_numpy = v1.np is not None
+        circle._use_numpy = False  # a shape keeps the pipeline it was created with
+        return circle
+
+    scale_circle = lambda shape, s: setattr(shape, 'radius', 20 * s)
+    return {
+        'v1 Circle': (lambda i, batch: v1.Circle(*place(i), 20, batch=batch), scale_circle),
+        'v1 Circle indexed': (lambda i, batch: v1.Circle(*place(i), 20, indexed=True, batch=batch), scale_circle),
+        'v1 Circle pure': (pure_circle, scale_circle),
+        'v1 Ellipse': (lambda i, batch: v1.Ellipse(*place(i), 30, 15, batch=batch),
+                       lambda shape, s: (setattr(shape, 'a', 30 * s), setattr(shape, 'b', 15 * s))),
+        'v1 Rectangle': (lambda i, batch: v1.Rectangle(*place(i), 40, 25, batch=batch),
+                         lambda shape, s: (setattr(shape, 'width', 40 * s), setattr(shape, 'height', 25 * s))),
+        'v1 Triangle': (lambda i, batch: v1.Triangle(*place(i), place(i)[0] + 40, place(i)[1],
+                                                     place(i)[0] + 20, place(i)[1] + 30, batch=batch),
+                        scale_triangle),
+    }
+
+
+def animate(operation, shapes, scale, t, frame):
+    """Apply operation to every shape for the frame at fake time t, scaling shapes with scale(shape, s)."""
+    if operation == 'rotation':
+        for i, shape in enumerate(shapes):
+            shape.rotation = 90 * t + i
+    elif operation == 'scale':
+        s = 1 + 0.5 * math.sin(t * 2)
+        for shape in shapes:
+            scale(shape, s)
+    elif operation == 'color':
+        for i, shape in enumerate(shapes):
+            shape.color = ((frame * 3 + i) % 256, (frame * 5 + i) % 256, (frame * 7 + i) % 256)
+    elif operation == 'anchor':
+        for shape in shapes:
+            shape.anchor_position = (10 * math.cos(t), 10 * math.sin(t))
+
+
+def checksum(shapes):
+    """Return the sums of the vertices and colors of shapes, to detect changes of the drawn output."""
+    vertices = math.fsum(math.fsum(shape._vertex_list.vertices) for shape in shapes)
+    colors = sum(sum(shape._vertex_list.colors) for shape in shapes)
+    return [vertices, colors]
+
+
+def run(specs, batch_factory, count, frames, dt=1 / 60):
+    """Run the benchmarks of specs (see shape_specs) once.
+
+    Return a dict shape -> {'throughput': {operation: updates per second}, 'checksum'}.
+    """
+    results = {}
+    for name, (create, scale) in specs.items():
+        batch = batch_factory()
+        shapes, chunk_times = [], []
+        chunk = max(1, count // 10)
+        for first in range(0, count, chunk):
+            start = time.perf_counter()
+            shapes.extend(create(i, batch) for i in range(first, min(first + chunk, count)))
+            chunk_times.append((time.perf_counter() - start) * chunk / (len(shapes) - first))
+        throughput = {'create': chunk / max(statistics.median(chunk_times), 1e-9)}
+        frame_times = {operation: [] for operation in OPERATIONS[1:]}
+        for frame in range(frames):
+            t = frame * dt  # fake clock, independent of the time the frame takes
+            for operation in OPERATIONS[1:]:
+                start = time.perf_counter()
+                animate(operation, shapes, scale, t, frame)
+                frame_times[operation].append(time.perf_counter() - start)
+        # the median frame ignores frames slowed down by other processes
+        throughput.update((operation, count / max(statistics.median(times), 1e-9))
+                          for operation, times in frame_times.items())
+        results[name] = {'throughput': throughput, 'checksum': checksum(shapes)}
+        for shape in shapes:
+            shape.delete()
+    return results
+
+
+def best_of(runs):
+    """Merge several runs keeping the best throughput of each operation (the least disturbed by other processes)."""
+    merged = runs[0]
+    for result in runs[1:]:
+        for name, shape_result in result.items():
+            throughput = merged[name]['throughput']
+            for operation, value in shape_result['throughput'].items():
+                throughput[operation] = max(throughput[operation], value)
+    return merged
+
+
+def compare(results, baseline, tolerance, check_throughput=False):
+    """Return the list of regressions of results against baseline: changed checksums, and throughputs lower than the
+    baseline by more than tolerance if check_throughput is True.
+    """
+    failures = []
+    for name, shape_result in results.items():
+        expected = baseline['results'].get(name)
+        if expected is None:
+            continue
+        for operation, value in shape_result['throughput'].items():
+            reference = expected['throughput'].get(operation)
+            if check_throughput and reference is not None and value < reference * (1 - tolerance):
+                failures.append('%s %s: %.0f updates/s, baseline %.0f (-%.0f%%)'
+                                % (name, operation, value, reference, 100 * (1 - value / reference)))
+        for value, reference, what in zip(shape_result['checksum'], expected['checksum'], ('vertices', 'colors')):
+            if not math.isclose(value, reference, rel_tol=1e-6, abs_tol=1e-3):
+                failures.append('%s: %s changed, checksum %r, baseline %r' % (name, what, value, reference))
+    return failures
+
+
+def report(results, baseline=None):
+    print('%-18s' % 'shape' + ''.join('%12s' % operation for operation in OPERATIONS) + '   (updates/s)')
+    for name, shape_result in results.items():
+        line = '%-18s' % name
+        for operation in OPERATIONS:
+            line += '%12.0f' % shape_result['throughput'][operation]
+        print(line)
+        if baseline is not None and name in baseline['results']:
+            reference = baseline['results'][name]['throughput']
+            print('%-18s' % '' + ''.join('%+11.0f%%' % (100 * (shape_result['throughput'][operation] / reference[operation] - 1))
+                                         if operation in reference else '%12s' % '' for operation in OPERATIONS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the advanced shapes without a display.')
+    parser.add_argument('--count', type=int, default=200, help='shapes of each kind')
+    parser.add_argument('--frames', type=int, default=60, help='animated frames')
+    parser.add_argument('--repeat', type=int, default=3, help='runs, the best throughput is kept')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON file of the baseline')
+    parser.add_argument('--update', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--check-throughput', action='store_true',
+                        default=os.environ.get('BENCHMARK_CHECK_THROUGHPUT') == '1',
+                        help='also fail on throughput losses (default: BENCHMARK_CHECK_THROUGHPUT=1)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed throughput loss with --check-throughput, as a fraction')
+    parser.add_argument('--headless', action='store_true', help="use real batches in pyglet's headless (EGL) mode")
+    args = parser.parse_args(argv)
+
+    # options must be set before pyglet.gl is imported by the shapes
+    if args.headless:
+        pyglet.options['headless'] = True
+    else:
+        pyglet.options['shadow_window'] = False
+    sys.path.insert(0, SHAPES_DIR)
+    sys.path.insert(0, os.path.join(SHAPES_DIR, 'animations'))
+    import advanced_shapes_v0
+    import v1
+    if args.headless:
+        batch_factory = pyglet.graphics.Batch
+    else:
+        from stub_batch import StubBatch
+        batch_factory = StubBatch
+
+    specs = shape_specs(advanced_shapes_v0)
+    specs.update(v1_shape_specs(v1))
+    results = best_of([run(specs, batch_factory, args.count, args.frames) for _ in range(args.repeat)])
+    config = {'count': args.count, 'frames': args.frames, 'headless': args.headless}
+
+    if args.update:
+        with open(args.baseline, 'w') as file:
+            json.dump({'config': config, 'results': results}, file, indent=1)
+        report(results)
+        print('baseline written to', args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        report(results)
+        print('no baseline at %s, run with --update to record one' % args.baseline)
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline['config'] != config:
+        report(results)
+        print('baseline was recorded with %r, not %r; run with the same options or --update' % (baseline['config'], config))
+        return 1
+    report(results, baseline)
+    failures = compare(results, baseline, args.tolerance, args.check_throughput)
+    for failure in failures:
+        print('REGRESSION', failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Capture of the window framebuffer without stalling the render loop
+
+FrameCapture reads the pixels of the current framebuffer into pixel buffer objects (PBO), two of them in turn: the
+read of a frame is queued on the GPU, and its pixels are only copied out on the next capture (or flush), when the
+transfer is done. Pixels are copied into a pool of reused buffers and images are encoded by background threads, so
+the render thread never waits for the GPU transfer or for PNG compression. Without PBO support (OpenGL < 2.1, or
+pbo=False), pixels are read with a blocking glReadPixels into the same reused buffers.
+
+    capture = FrameCapture(window.width, window.height)
+    frame = 0
+
+    @window.event
+    def on_draw():
+        global frame
+        window.clear()
+        batch.draw()
+        capture.capture('frames/%05d.png' % frame)  # the image of a frame is saved while the next frames are drawn
+        frame += 1
+
+    capture.close()  # saves the pending images
+"""
+import ctypes
+import queue
+import threading
+
+import pyglet
+from PIL import Image
+
+
+gl = pyglet.gl  # pyglet's lazy module proxy: OpenGL is only loaded on first use, once pyglet.options are set
+
+
+class FrameCapture():
+
+    def __init__(self, width, height, pbo=True, buffers=4, workers=2, drop=False):
+        """Initialize a capture of the width x height lower left pixels of the framebuffer.
+
+        At most buffers captured frames wait for encoding. When all are in use, capture blocks until one is free, or
+        drops the frame if drop is True (counted in dropped_frames). Images are encoded by workers threads. Must be
+        used from the thread owning the OpenGL context, which must be current.
+        """
+        self.width = width
+        self.height = height
+        self.size = width * height * 4  # RGBA bytes
+        self._use_pbo = pbo
+        self._pbos = None  # created on the first capture, when a context is current
+        self._pbo_index = 0
+        self._pending = None  # (pbo, target, callback) of the frame read one capture ago, copied on the next one
+
+        self._free_buffers = queue.Queue()
+        self._buffer_count = 0
+        self._max_buffers = max(buffers, 1)
+        self.drop = drop
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self._jobs = queue.Queue()
+        self._errors = []
+        self._workers = [threading.Thread(target=self._encode_loop, daemon=True) for _ in range(max(workers, 1))]
+        for worker in self._workers:
+            worker.start()
+
+    def _init_pbos(self):
+        supported = gl.gl_info.have_version(2, 1) or gl.gl_info.have_extension('GL_ARB_pixel_buffer_object')
+        if not (self._use_pbo and supported):
+            self._pbos = []
+            return
+        pbos = (gl.GLuint * 2)()
+        gl.glGenBuffers(2, pbos)
+        for pbo in pbos:
+            gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, pbo)
+            gl.glBufferData(gl.GL_PIXEL_PACK_BUFFER, self.size, None, gl.GL_STREAM_READ)
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        self._pbos = list(pbos)
+
+    def _get_buffer(self):
+        """Return a free pixel buffer, allocating up to the maximum number of buffers, then waiting for one.
+
+        If drop is True, return None instead of waiting.
+        """
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            if self._buffer_count < self._max_buffers:
+                self._buffer_count += 1
+                return (gl.GLubyte * self.size)()
+            if self.drop:
+                self.dropped_frames += 1
+                return None
+            return self._free_buffers.get()
+
+    def capture(self, target=None, callback=None):
+        """Capture the framebuffer.
+
+        When its pixels are available, the image is saved to target (a filename or file object, the format is chosen
+        from the extension) and/or passed to callback(image) with a PIL image, in a background thread. The image
+        shares the memory of a reused buffer, callback must copy it (image.copy()) to keep it.
+        """
+        self.captured_frames += 1
+        if self._pbos is None:
+            self._init_pbos()
+        if not self._pbos:
+            buffer = self._get_buffer()
+            if buffer is None:
+                return
+            gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, buffer)
+            self._jobs.put((buffer, target, callback))
+            return
+        pbo = self._pbos[self._pbo_index]
+        self._pbo_index = 1 - self._pbo_index
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, pbo)
+        gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, 0)  # returns at once
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        self.flush()  # the previous frame, read into the other PBO one capture ago
+        self._pending = (pbo, target, callback)
+
+    def flush(self):
+        """Hand the frame waiting in a PBO to the encoders, waiting for its transfer if needed."""
+        if self._pending is None:
+            return
+        pbo, target, callback = self._pending
+        self._pending = None
+        buffer = self._get_buffer()
+        if buffer is None:
+            return
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, pbo)
+        pointer = gl.glMapBuffer(gl.GL_PIXEL_PACK_BUFFER, gl.GL_READ_ONLY)
+        if pointer:
+            ctypes.memmove(buffer, pointer, self.size)
+            gl.glUnmapBuffer(gl.GL_PIXEL_PACK_BUFFER)
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        if not pointer:
+            self._free_buffers.put(buffer)
+            raise RuntimeError('could not map the pixel buffer object')
+        self._jobs.put((buffer, target, callback))
+
+    def _encode_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            buffer = job[0]
+            try:
+                self._process(*job)
+            except Exception as exception:
+                self._errors.append(exception)
+            finally:
+                self._free_buffers.put(buffer)
+                self._jobs.task_done()
+
+    def _process(self, buffer, target, callback):
+        """Save or hand over the pixels of a captured frame, in an encoder thread."""
+        # OpenGL rows go upwards, the negative stride flips the image without copying it
+        image = Image.frombuffer('RGBA', (self.width, self.height), buffer, 'raw', 'RGBA', 0, -1)
+        if target is not None:
+            image.save(target)
+        if callback is not None:
+            callback(image)
+
+    def wait(self):
+        """Flush and wait until every captured image is saved. Raise the first error of the encoders, if any."""
+        self.flush()
+        self._jobs.join()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0]
+
+    def close(self, save_pending=True):
+        """Save the pending images, stop the encoders and delete the PBOs.
+
+        If save_pending is False, the OpenGL context is gone: the frame left in a PBO is dropped (counted in
+        dropped_frames) and the PBOs are left to the context, images already copied out are still saved.
+        """
+        if not save_pending:
+            if self._pending is not None:
+                self.dropped_frames += 1
+            self._pending = None
+            self._pbos = None
+        try:
+            self.wait()
+        finally:
+            for _ in self._workers:
+                self._jobs.put(None)
+            for worker in self._workers:
+                worker.join()
+            if self._pbos:
+                gl.glDeleteBuffers(2, (gl.GLuint * 2)(*self._pbos))
+            self._pbos = None
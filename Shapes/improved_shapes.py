@@ -1,7 +1,10 @@
 import pyglet
 import math
 import time
-from PIL import Image
+import weakref
+
+from capture import FrameCapture
+from shape_helpers import UNIT_CIRCLE_CACHE_SIZE, _FanVertexListMixin, _unit_circle, get_shape_group, unit_circle_cache_info
 
 
 """
@@ -15,9 +18,11 @@ Summary of chages:
 """
 
 
-class Arc(pyglet.shapes.Arc):
+class Arc(_FanVertexListMixin, pyglet.shapes.Arc):
+    _indexed = False
+
     def __init__(self, x, y, radius, rotation=0, segments=None, angle=360, start_angle=0,
-                 closed=False, color=(255, 255, 255), opacity=255, anchor_visible=False,
+                 closed=False, color=(255, 255, 255), opacity=255, anchor_visible=False, lod=None,
                  batch=None, group=None):
         """Create an Arc.
 
@@ -54,6 +59,9 @@ class Arc(pyglet.shapes.Arc):
             `opacity` : int
                 The transparecy of the color, with a range of 0-255.
                 Defaults to 255 (no transparency).
+            `lod` : `LODPolicy`
+                Optional level of detail policy (see animations/v1.py)
+                choosing the segments from the size of the arc on screen.
             `batch` : `~pyglet.graphics.Batch`
                 Optional batch to add the circle to.
             `group` : `~pyglet.graphics.Group`
@@ -61,16 +69,34 @@ class Arc(pyglet.shapes.Arc):
         """
         self._anchor_visible = anchor_visible
         self._anchor_circle = None
+        self._lod = lod
+        if lod is not None:
+            segments = lod.segments_for(radius, angle)
         super().__init__(x, y, radius, segments=segments, angle=angle, start_angle=start_angle,
                          closed=True, color=color, batch=batch, group=group)
         self._closed = closed  # closed set to True, then overwritten, so extra vertex is created
         self.rotation = rotation
         self.opacity = opacity
+        if lod is not None:
+            lod.add(self)
 
     def delete(self):
         super().delete()
         if self._anchor_circle is not None:
             self._anchor_circle.delete()
+        if self._lod is not None:
+            self._lod.discard(self)
+
+    def _update_lod(self):
+        """Resize the vertex list in place if the LOD policy chooses other segments."""
+        segments = self._lod.segments_for(self._radius, self._angle, self._segments)
+        if segments != self._segments:
+            self._segments = segments
+            self._num_verts = segments * 2 + 2
+            self._resize_vertex_list(self._num_verts)
+
+    def _lod_changed(self):
+        self._update_position()
 
     def draw(self):
         """Draw the shape at its current position.
@@ -84,18 +110,18 @@ class Arc(pyglet.shapes.Arc):
 
     def _update_position(self):
         # rewritten to allow flexibility with closed, to change angles to degrees, and to show/hide anchor
+        if self._lod is not None:
+            self._update_lod()
         if not self._visible:
             vertices = (0,) * self._segments * 4
         else:
             x = self._x + self._anchor_x
             y = self._y + self._anchor_y
             r = self._radius
-            tau_segs = math.radians(self._angle) / self._segments
-            start_angle = math.radians(self._start_angle - self._rotation)
 
-            # calculate the outer points of the arc
-            points = [(x + (r * math.cos((i * tau_segs) + start_angle)),
-                       y + (r * math.sin((i * tau_segs) + start_angle))) for i in range(self._segments + 1)]
+            # scale and move the cached unit circle to get the outer points of the arc
+            points = [(x + r * c, y + r * s)
+                      for c, s in _unit_circle(self._segments, self._angle, self._start_angle - self._rotation)]
 
             # create a list of doubled-up points from the points
             vertices = []
@@ -121,10 +147,11 @@ class Arc(pyglet.shapes.Arc):
             elif self._anchor_circle is not None:
                 self._anchor_circle.visible = False
 
-        self._vertex_list.vertices[:] = vertices
+        # the vertex list may hold more vertices than the arc after a LOD change, they stay zeroed
+        self._vertex_list.vertices[:len(vertices)] = vertices
 
     def _update_color(self):
-        super()._update_color()
+        self._vertex_list.colors[:] = [*self._rgb, int(self._opacity)] * self._vertex_list.get_size()
         if self._anchor_circle is not None:
             self._anchor_circle.color = (255 - c for c in self._rgb)
             self._anchor_circle.opacity = self._opacity
@@ -260,12 +287,9 @@ class Circle(pyglet.shapes.Circle):
             x = self._x + self._anchor_x
             y = self._y + self._anchor_y
             r = self._radius
-            tau_segs = math.pi * 2 / self._segments
-            start_angle = -math.radians(self._rotation)
 
-            # calculate the outer points of the circle
-            points = [(x + (r * math.cos((i * tau_segs) + start_angle)),
-                       y + (r * math.sin((i * tau_segs) + start_angle))) for i in range(self._segments)]
+            # scale and move the cached unit circle to get the outer points of the circle
+            points = [(x + r * c, y + r * s) for c, s in _unit_circle(self._segments, 360, -self._rotation)[:-1]]
 
             # create a list of triangles from the points
             vertices = []
@@ -392,12 +416,10 @@ class Sector(pyglet.shapes.Sector):
             x = self._x + self._anchor_x
             y = self._y + self._anchor_y
             r = self._radius
-            tau_segs = math.radians(self._angle) / self._segments
-            start_angle = math.radians(self._start_angle - self._rotation)
 
-            # calculate the outer points of the sector
-            points = [(x + (r * math.cos((i * tau_segs) + start_angle)),
-                       y + (r * math.sin((i * tau_segs) + start_angle))) for i in range(self._segments + 1)]
+            # scale and move the cached unit circle to get the outer points of the sector
+            points = [(x + r * c, y + r * s)
+                      for c, s in _unit_circle(self._segments, self._angle, self._start_angle - self._rotation)]
 
             # create a list of triangles from the points
             vertices = []
@@ -575,62 +597,83 @@ class Line(pyglet.shapes.Line):
 
 
 class RectangleWithBorder(pyglet.shapes.Rectangle):
+    # 12 vertices: the fill corners (0-3), then the inner (4-7) and outer (8-11) corners of the border, which is
+    # centered on the edges of the rectangle; the fill is drawn first, then the border ring
+    _indices = (0, 1, 2, 0, 2, 3) + tuple(index for i in range(4)
+                                          for index in (4 + i, 8 + i, 8 + (i + 1) % 4, 4 + i, 8 + (i + 1) % 4, 4 + (i + 1) % 4))
+
     def __init__(self, x, y, width, height, border=1, color=(255, 255, 255), border_color=(0, 0, 0), batch=None, group=None):
-        self._border_lines = []  # _update_position uses self._border_lines and is called in super.__init__, so initialize it to empty
-        super().__init__(x, y, width, height, color=color, batch=batch, group=group)
+        """Create a rectangle with a border, drawn as one indexed mesh.
+
+        The rectangle's anchor point defaults to the (x, y) coordinates,
+        which are at the bottom left.
+
+        :Parameters:
+            `x` : float
+                The X coordinate of the rectangle.
+            `y` : float
+                The Y coordinate of the rectangle.
+            `width` : float
+                The width of the rectangle.
+            `height` : float
+                The height of the rectangle.
+            `border` : float
+                The width of the border, centered on the edges.
+            `color` : (int, int, int)
+                The RGB color of the rectangle, specified as
+                a tuple of three ints in the range of 0-255.
+            `border_color` : (int, int, int)
+                The RGB color of the border.
+            `batch` : `~pyglet.graphics.Batch`
+                Optional batch to add the rectangle to.
+            `group` : `~pyglet.graphics.Group`
+                Optional parent group of the rectangle.
+        """
+        self._x = x
+        self._y = y
+        self._width = width
+        self._height = height
+        self._rotation = 0
+        self._rgb = color
         self._border = border
         self._brgb = border_color
         self._border_opacity = 255
         self._border_visible = True
-        self._border_lines = [
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group)
-        ]
+
+        self._batch = batch or pyglet.graphics.Batch()
+        self._group = get_shape_group(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA, group)
+        self._vertex_list = self._batch.add_indexed(12, pyglet.gl.GL_TRIANGLES, self._group, self._indices, 'v2f', 'c4B')
         self._update_position()
         self._update_color()
 
-    def delete(self):
-        super().delete()
-        for line in self._border_lines:
-            line.delete()
-
-    def draw(self):
-        """Draw the shape at its current position.
-
-        Using this method is not recommended. Instead, add the
-        shape to a `pyglet.graphics.Batch` for efficient rendering.
-        """
-        super().draw()
-        for line in self._border_lines:
-            line.draw()
-
     def _update_position(self):
-        super()._update_position()
-        vertices = self._vertex_list.vertices[:][0:6] + self._vertex_list.vertices[:][10:12] + self._vertex_list.vertices[:][0:2]
-        for i, line in enumerate(self._border_lines):
-            line._visible = self._border_visible
-            line.x = vertices[2 * i]
-            line.y = vertices[2 * i + 1]
-            line.x2 = vertices[2 * i + 2]
-            line.y2 = vertices[2 * i + 3]
-            line._width = self._border
-            # correct for line width
-            leg_x, leg_y = line.x - line.x2, line.y - line.y2
-            hypotenuse = (leg_x ** 2 + leg_y ** 2) ** 0.5
-            line.x += self._border / 2 * leg_x / hypotenuse
-            line.x2 -= self._border / 2 * leg_x / hypotenuse
-            line.y += self._border / 2 * leg_y / hypotenuse
-            line.y2 -= self._border / 2 * leg_y / hypotenuse
-            line._update_position()
+        if not self._visible:
+            self._vertex_list.vertices[:] = (0,) * 24
+            return
+        x1 = -self._anchor_x
+        y1 = -self._anchor_y
+        x2 = x1 + self._width
+        y2 = y1 + self._height
+        b = self._border / 2
+        corners = [x1, y1, x2, y1, x2, y2, x1, y2,
+                   x1 + b, y1 + b, x2 - b, y1 + b, x2 - b, y2 - b, x1 + b, y2 - b,
+                   x1 - b, y1 - b, x2 + b, y1 - b, x2 + b, y2 + b, x1 - b, y2 + b]
+        # rotate clockwise around (x, y) and translate, in one pass
+        r = -math.radians(self._rotation)
+        cr, sr = math.cos(r), math.sin(r)
+        x, y = self._x, self._y
+        vertices = []
+        for i in range(0, 24 if self._border_visible else 8, 2):
+            dx, dy = corners[i], corners[i + 1]
+            vertices.append(dx * cr - dy * sr + x)
+            vertices.append(dy * cr + dx * sr + y)
+        if not self._border_visible:
+            vertices.extend((0,) * 16)  # degenerate border triangles
+        self._vertex_list.vertices[:] = vertices
 
     def _update_color(self):
-        super()._update_color()
-        for line in self._border_lines:
-            line._rgb = self._brgb
-            line._opacity = self._border_opacity
-            line._update_color()
+        self._vertex_list.colors[:] = ([*self._rgb, int(self._opacity)] * 4 +
+                                       [*self._brgb, int(self._border_opacity)] * 8)
 
     @property
     def border(self):
@@ -652,7 +695,7 @@ class RectangleWithBorder(pyglet.shapes.Rectangle):
 
     @property
     def border_opacity(self):
-        return self._opacity
+        return self._border_opacity
 
     @border_opacity.setter
     def border_opacity(self, value):
@@ -669,14 +712,82 @@ class RectangleWithBorder(pyglet.shapes.Rectangle):
         self._update_position()
 
 
-def save_window(window, filename="window.png"):
-    """Save window as image."""
-    buffer = (pyglet.gl.GLubyte * (4 * window.width * window.height))(0)
-    pyglet.gl.glReadPixels(0, 0, window.width, window.height,
-                           pyglet.gl.GL_RGBA, pyglet.gl.GL_UNSIGNED_BYTE, buffer)
-    image = Image.frombytes(mode="RGBA", size=(window.width, window.height), data=buffer)
-    image = image.transpose(Image.FLIP_TOP_BOTTOM)
-    image.save(filename)
+_window_captures = weakref.WeakKeyDictionary()  # window -> _WindowCapture reused by save_window
+_window_close_handler_pushed = False
+
+
+class _WindowCapture():
+    """The FrameCapture of save_window for a window, and its on_close handler, holding the window only weakly."""
+
+    def __init__(self, window):
+        window_ref = weakref.ref(window)
+
+        def on_close():
+            window = window_ref()
+            if window is not None:
+                close_window_capture(window)
+        self.on_close = on_close
+        window.push_handlers(on_close=on_close)
+        self.capture = None
+        self._finalizer = None
+
+    def replace(self, window):
+        """Close the current capture, saving its images, and return a new one of the size of window."""
+        self.close()
+        self.capture = FrameCapture(window.width, window.height)
+        # the encoder threads keep the capture alive: stop them if the window is collected without being closed
+        self._finalizer = weakref.finalize(window, self.capture.close, save_pending=False)
+        return self.capture
+
+    def close(self, save_pending=True):
+        """Close the capture, see FrameCapture.close."""
+        if self.capture is not None:
+            self._finalizer.detach()
+            self.capture.close(save_pending)
+            self.capture = None
+
+
+def _on_window_close(window):
+    """Stop the capture of a window closed from code: its OpenGL context is gone, with the frame left in a PBO."""
+    entry = _window_captures.pop(window, None)
+    if entry is not None:
+        entry.close(save_pending=False)
+
+
+def close_window_capture(window):
+    """Save the images left by save_window(window, pipelined=True) and release the capture of window.
+
+    Called when the user closes the window (on_close). Call it before window.close() when closing the window from
+    code: afterwards, the frame still in a pixel buffer object is lost.
+    """
+    entry = _window_captures.pop(window, None)
+    if entry is not None:
+        window.remove_handler('on_close', entry.on_close)
+        window.switch_to()
+        entry.close()
+
+
+def save_window(window, filename="window.png", pipelined=False):
+    """Save window as image.
+
+    The pixel buffers of the window's FrameCapture are reused and the image is encoded in a background thread. By
+    default, return once the file is written. If pipelined is True, return at once: the pixels are transferred into a
+    pixel buffer object while the next frames are drawn, and saved on the next save_window call for the window, or
+    by close_window_capture.
+    """
+    global _window_close_handler_pushed
+    entry = _window_captures.get(window)
+    if entry is None:
+        entry = _window_captures[window] = _WindowCapture(window)
+        if not _window_close_handler_pushed:
+            pyglet.app.event_loop.push_handlers(on_window_close=_on_window_close)
+            _window_close_handler_pushed = True
+    capture = entry.capture
+    if capture is None or (capture.width, capture.height) != (window.width, window.height):
+        capture = entry.replace(window)
+    capture.capture(filename)
+    if not pipelined:
+        capture.wait()
 
 
 if __name__ == "__main__":
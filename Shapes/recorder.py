@@ -0,0 +1,220 @@
+"""
+Recording of frame sequences at full frame rate
+
+FrameRecorder captures every drawn frame through FrameCapture (PBO read back, reused buffers) and a single writer
+thread streams the raw RGBA frames, in order, to a sink:
+    * RawFileSink: a memory-mapped file of frames one after the other, top row first (no encoding cost)
+    * PipeSink: the standard input of an encoder process, e.g. PipeSink.ffmpeg('out.mp4', width, height)
+
+At most queue_size frames wait for the writer. When the writer falls behind, recording blocks the render loop
+(backpressure, no frame lost) or, with drop=True, drops frames; stats() reports both.
+
+    recorder = FrameRecorder(window.width, window.height, RawFileSink('frames.rgba', window.width, window.height))
+    recorder.attach(window)  # records every frame once drawn
+    pyglet.app.run()
+    recorder.close()
+    print(recorder.stats())
+
+On a Linux box without GPU nor display, use a software OpenGL context: pyglet's headless mode with Mesa's EGL
+(pyglet.options['headless'] = True before importing pyglet.window, with LIBGL_ALWAYS_SOFTWARE=1), or a hidden window
+under Xvfb (xvfb-run python script.py). With --headless, this script records the EngineWindow demo that way:
+
+    python recorder.py frames.rgba --frames 300
+    python recorder.py demo.mp4 --frames 300 --headless
+"""
+import argparse
+import mmap
+import os
+import subprocess
+import sys
+import time
+
+import pyglet
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, frames are then flipped row by row
+    np = None
+
+from capture import FrameCapture  # does not load OpenGL, main can still choose the headless mode
+
+
+class RawFileSink():
+
+    def __init__(self, path, width, height):
+        """Initialize a sink writing frames to path, width * height * 4 bytes each, top row first."""
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frame_size = width * height * 4
+        self.frames = 0
+        self._file = open(path, 'w+b')
+        self._capacity = 0  # frames that fit in the file
+        self._map = None
+
+    def _grow(self):
+        # the file doubles, so mapping it again is rare
+        if self._map is not None:
+            self._map.close()
+        self._capacity = max(self._capacity * 2, 16)
+        self._file.truncate(self._capacity * self.frame_size)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity * self.frame_size)
+
+    def write(self, buffer):
+        """Append a frame of bottom-up RGBA rows, as read from OpenGL."""
+        if self.frames == self._capacity:
+            self._grow()
+        offset = self.frames * self.frame_size
+        if np is not None:
+            # one copy of the whole frame, its rows in reverse order
+            frame = np.frombuffer(self._map, np.uint8, self.frame_size, offset).reshape(self.height, -1)
+            frame[:] = np.frombuffer(buffer, np.uint8, self.frame_size).reshape(self.height, -1)[::-1]
+        else:
+            source = memoryview(buffer).cast('B')
+            stride = self.width * 4
+            for row in range(self.height):
+                end = self.frame_size - row * stride
+                self._map[offset + row * stride:offset + (row + 1) * stride] = source[end - stride:end]
+        self.frames += 1
+
+    def close(self):
+        """Flush the frames and cut the file to their size."""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        self._file.truncate(self.frames * self.frame_size)
+        self._file.close()
+
+
+class PipeSink():
+
+    def __init__(self, command):
+        """Initialize a sink writing frames to the standard input of command, a list of arguments.
+
+        Frames are written as read from OpenGL: bottom-up RGBA rows.
+        """
+        self.command = command
+        self.frames = 0
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    @classmethod
+    def ffmpeg(cls, path, width, height, fps=60, executable='ffmpeg', options=('-pix_fmt', 'yuv420p')):
+        """Return a sink encoding the frames to path with ffmpeg."""
+        return cls([executable, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                    '-s', '%dx%d' % (width, height), '-r', str(fps), '-i', '-', '-vf', 'vflip', *options, path])
+
+    def write(self, buffer):
+        self._process.stdin.write(buffer)
+        self.frames += 1
+
+    def close(self):
+        """Close the pipe and wait for the encoder. Raise an error if it failed."""
+        self._process.stdin.close()
+        returncode = self._process.wait()
+        if returncode != 0:
+            raise RuntimeError('%s exited with code %d' % (self.command[0], returncode))
+
+
+class FrameRecorder(FrameCapture):
+
+    def __init__(self, width, height, sink, queue_size=8, drop=False, pbo=True):
+        """Initialize a recorder of the width x height lower left pixels of the framebuffer into sink.
+
+        queue_size is the number of frames waiting for the sink, see the module docstring for drop.
+        """
+        # a single writer keeps the frames in order
+        super().__init__(width, height, pbo=pbo, buffers=queue_size, workers=1, drop=drop)
+        self.sink = sink
+        self.written_frames = 0
+        self.write_time = 0
+        self.max_queued = 0
+        self._start = None
+
+    def attach(self, window):
+        """Record every frame of window once drawn.
+
+        An EngineWindow records before drawing its profiler overlay. Other windows record just before flip, so their
+        frames must be drawn by the event loop (pyglet.app.run) or followed by window.flip().
+        """
+        if hasattr(window, 'recorder'):
+            window.recorder = self
+            return
+        flip = window.flip
+
+        def record_and_flip():
+            self.record()
+            flip()
+        window.flip = record_and_flip
+
+    def record(self):
+        """Record the current framebuffer."""
+        if self._start is None:
+            self._start = time.perf_counter()
+        self.capture()
+        self.max_queued = max(self.max_queued, self._jobs.qsize())
+
+    def _process(self, buffer, target, callback):
+        start = time.perf_counter()
+        self.sink.write(buffer)
+        self.write_time += time.perf_counter() - start
+        self.written_frames += 1
+
+    def close(self):
+        """Write the pending frames and close the sink."""
+        try:
+            super().close()
+        finally:
+            self.sink.close()
+
+    def stats(self):
+        """Return a dict of recording statistics."""
+        elapsed = time.perf_counter() - self._start if self._start is not None else 0
+        return {'captured_frames': self.captured_frames,
+                'written_frames': self.written_frames,
+                'dropped_frames': self.dropped_frames,
+                'max_queued': self.max_queued,
+                'capture_fps': self.captured_frames / elapsed if elapsed else 0,
+                'mean_write_ms': 1000 * self.write_time / self.written_frames if self.written_frames else 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record frames of the EngineWindow demo.')
+    parser.add_argument('output', help='.rgba for raw frames, anything else is encoded with ffmpeg')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--drop', action='store_true', help='drop frames instead of waiting for the writer')
+    parser.add_argument('--headless', action='store_true', help="use pyglet's headless (EGL) mode")
+    args = parser.parse_args(argv)
+    if args.headless:
+        pyglet.options['headless'] = True
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'animations'))
+    from window_engine import EngineWindow, EngineObject, bounce_motion
+    from profiler import run_frames
+
+    batch = pyglet.graphics.Batch()
+    window = EngineWindow(720, 480, batch=batch, visible=False)
+    ball = pyglet.shapes.Circle(360, 240, 30, color=(255, 0, 255), batch=batch)
+    ball_object = EngineObject(shapes=ball, motion=bounce_motion)
+    ball_object.vx, ball_object.vy, ball_object.ax, ball_object.ay = 300, 0, 0, -1000
+    window.add_objects(ball_object)
+
+    if args.output.endswith('.rgba'):
+        sink = RawFileSink(args.output, window.width, window.height)
+    else:
+        sink = PipeSink.ffmpeg(args.output, window.width, window.height, fps=args.fps)
+    recorder = FrameRecorder(window.width, window.height, sink, drop=args.drop)
+    recorder.attach(window)
+    run_frames(window, args.frames, 1 / args.fps)
+    recorder.close()
+    window.close()
+    stats = recorder.stats()
+    print(stats)
+    if stats['written_frames'] == 0:
+        print('no frame was recorded')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
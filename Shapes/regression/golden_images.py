@@ -0,0 +1,307 @@
+"""
+Golden image tests of the advanced shapes
+
+Each case draws one shape (advanced_shapes_v0 Circle and its sector / closed variants, Ellipse, Rectangle, Triangle,
+Star and Line, improved_shapes RectangleWithBorder, Arc and Sector, animations/v1 shapes) at several rotations and
+rotation anchors, and compares the image with a stored PNG in golden/<backend>/. The v1 cases cover the indexed
+layout, LOD switching and lazy updates, and run twice: with NumPy, and with the pure Python pipeline (_pure cases).
+Pixels may differ by tolerance per channel, and at most max_fraction of the pixels may differ more (edges move by a
+pixel when vertices change slightly). When a case fails, the rendered image and a diff image (failing pixels in red
+over the expected image) are written to the output folder.
+
+Backends:
+    * cpu: shapes are added to a StubBatch and their triangles and lines are filled with PIL, no OpenGL needed
+    * gl: shapes are drawn by OpenGL into an offscreen framebuffer of a hidden window (or a headless EGL context
+      with --headless), then read back with FrameCapture. Golden images depend on the driver, record them per machine.
+
+    python golden_images.py                  # compare, cpu backend
+    python golden_images.py --update         # record the golden images
+    python golden_images.py --backend gl --headless -k star
+"""
+import argparse
+import os
+import sys
+
+import pyglet
+from PIL import Image, ImageChops, ImageDraw
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHAPES_DIR = os.path.dirname(HERE)
+ANIMATIONS_DIR = os.path.join(SHAPES_DIR, 'animations')
+GOLDEN_DIR = os.path.join(HERE, 'golden')
+OUTPUT_DIR = os.path.join(HERE, 'output')
+WIDTH = HEIGHT = 128
+BACKGROUND = (0, 0, 0)
+VARIANTS = [(0, (0, 0)), (30, (0, 0)), (135, (0, 0)), (0, (20, 10)), (30, (20, 10)), (135, (-15, 25))]  # rotation, anchor
+
+_GL_TRIANGLES = 4  # OpenGL primitive modes, the values of GL_TRIANGLES and GL_LINES
+_GL_LINES = 1
+
+
+def shape_cases():
+    """Return a dict case name -> function(batch) returning the shape, centered in a WIDTH x HEIGHT image."""
+    sys.path.insert(0, SHAPES_DIR)
+    sys.path.insert(0, ANIMATIONS_DIR)
+    import advanced_shapes_v0 as advanced
+    import improved_shapes as improved
+    import v1
+
+    cx, cy = WIDTH // 2, HEIGHT // 2
+
+    def v1_lod_resized(batch):
+        # the LOD policy gives the small circle few segments, growing it resizes its vertex list
+        circle = v1.Circle(cx, cy, 4, color=(230, 80, 40), lod=v1.LODPolicy(), batch=batch)
+        circle.radius = 40
+        return circle
+
+    def v1_lazy(batch):
+        # changes are deferred until build() flushes the lazy shapes
+        ellipse = v1.Ellipse(cx, cy, 20, 10, segments=32, color=(60, 200, 90), batch=batch)
+        ellipse.lazy = True
+        ellipse.a, ellipse.b = 50, 25
+        return ellipse
+
+    v1_cases = {
+        'v1_circle': lambda batch: v1.Circle(cx, cy, 40, segments=24, color=(230, 80, 40), batch=batch),
+        'v1_circle_indexed': lambda batch: v1.Circle(cx, cy, 40, segments=24, indexed=True, color=(230, 80, 40),
+                                                     batch=batch),
+        'v1_sector': lambda batch: v1.Circle(cx, cy, 40, angle=270, start_angle=30, segments=24, color=(230, 80, 40),
+                                             batch=batch),
+        'v1_sector_indexed': lambda batch: v1.Circle(cx, cy, 40, angle=270, start_angle=30, segments=24, indexed=True,
+                                                     color=(230, 80, 40), batch=batch),
+        'v1_sector_closed_indexed': lambda batch: v1.Circle(cx, cy, 40, angle=270, start_angle=30, segments=24,
+                                                            closed=True, indexed=True, color=(230, 80, 40),
+                                                            batch=batch),
+        'v1_ellipse': lambda batch: v1.Ellipse(cx, cy, 50, 25, segments=32, color=(60, 200, 90), batch=batch),
+        'v1_ellipse_indexed': lambda batch: v1.Ellipse(cx, cy, 50, 25, segments=32, indexed=True, color=(60, 200, 90),
+                                                       batch=batch),
+        'v1_rectangle': lambda batch: v1.Rectangle(cx, cy, 60, 30, color=(70, 110, 240), batch=batch),
+        'v1_triangle': lambda batch: v1.Triangle(cx - 30, cy - 25, cx + 35, cy - 10, cx - 5, cy + 35,
+                                                 color=(240, 220, 60), batch=batch),
+        'v1_circle_lod': v1_lod_resized,
+        'v1_ellipse_lazy': v1_lazy,
+    }
+    cases = {
+        'circle': lambda batch: advanced.Circle(cx, cy, 40, segments=24, color=(230, 80, 40), batch=batch),
+        'sector': lambda batch: advanced.Circle(cx, cy, 40, angle=270, start_angle=30, segments=24,
+                                                color=(230, 80, 40), batch=batch),
+        'sector_closed': lambda batch: advanced.Circle(cx, cy, 40, angle=270, start_angle=30, segments=24,
+                                                       closed=True, color=(230, 80, 40), batch=batch),
+        'ellipse': lambda batch: advanced.Ellipse(cx, cy, 50, 25, segments=32, color=(60, 200, 90), batch=batch),
+        'rectangle': lambda batch: advanced.Rectangle(cx, cy, 60, 30, color=(70, 110, 240), batch=batch),
+        'triangle': lambda batch: advanced.Triangle(cx - 30, cy - 25, cx + 35, cy - 10, cx - 5, cy + 35,
+                                                    color=(240, 220, 60), batch=batch),
+        'star': lambda batch: advanced.Star(cx, cy, 45, 18, 5, color=(250, 250, 250), batch=batch),
+        'line': lambda batch: advanced.Line(cx - 35, cy - 25, cx + 35, cy + 25, width=8, color=(200, 60, 200),
+                                            batch=batch),
+        'rectangle_with_border': lambda batch: improved.RectangleWithBorder(cx, cy, 60, 40, border=5,
+                                                                            color=(70, 110, 240),
+                                                                            border_color=(250, 250, 250), batch=batch),
+        'arc': lambda batch: improved.Arc(cx, cy, 40, segments=24, angle=270, start_angle=30, color=(250, 250, 250),
+                                          batch=batch),
+        'improved_sector': lambda batch: improved.Sector(cx, cy, 40, segments=24, angle=270, start_angle=30,
+                                                         color=(60, 200, 90), batch=batch),
+    }
+    cases.update(v1_cases)
+    cases.update((name + '_pure', _pure_python(factory, v1)) for name, factory in v1_cases.items())
+    return cases
+
+
+def _pure_python(factory, v1):
+    """Wrap the factory of a v1 shape to build it with the pure Python pipeline instead of NumPy."""
+    def create(batch):
+        v1._AdvancedShapeBase._use_numpy = False
+        try:
+            shape = factory(batch)
+        finally:
+            v1._AdvancedShapeBase._use_numpy = v1.np is not None
+        shape._use_numpy = False  # a shape keeps the pipeline it was created with
+        return shape
+    return create
+
+
+def build(factory, rotation, anchor, batch):
+    shape = factory(batch)
+    shape.anchor_position = anchor
+    shape.rotation = rotation
+    v1 = sys.modules.get('v1')
+    if v1 is not None:
+        v1.flush_shapes()  # applies the changes of lazy v1 shapes
+    return shape
+
+
+def rasterize(batch, width=WIDTH, height=HEIGHT):
+    """Fill the triangles and lines of a StubBatch with PIL, each primitive with the color of its first vertex."""
+    image = Image.new('RGB', (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image, 'RGBA')  # blends with the alpha of the colors, like the shapes' blend mode
+    for vertex_list in batch.vertex_lists:
+        if vertex_list.mode == _GL_TRIANGLES:
+            step = 3
+        elif vertex_list.mode == _GL_LINES:
+            step = 2
+        else:
+            raise ValueError('unsupported primitive mode %r' % vertex_list.mode)
+        vertices = vertex_list.vertices
+        colors = vertex_list.colors
+        components = len(colors) // vertex_list.get_size()
+        order = list(vertex_list.indices) if vertex_list.indexed else range(vertex_list.get_size())
+        for k in range(0, len(order) - step + 1, step):
+            primitive = order[k:k + step]
+            points = [(vertices[2 * i], height - vertices[2 * i + 1]) for i in primitive]  # OpenGL y goes up
+            color = tuple(colors[components * primitive[0]:components * primitive[0] + components])
+            if len(color) == 4 and color[3] == 0:
+                continue
+            if step == 3:
+                (x1, y1), (x2, y2), (x3, y3) = points
+                if abs((x2 - x1) * (y3 - y1) - (x3 - x1) * (y2 - y1)) < 1e-6:
+                    continue  # degenerate triangles draw nothing in OpenGL, PIL would draw their outline
+                draw.polygon(points, fill=color)
+            else:
+                draw.line(points, fill=color)
+    return image
+
+
+def render_cpu(factory, rotation, anchor):
+    from stub_batch import StubBatch
+    batch = StubBatch()
+    shape = build(factory, rotation, anchor, batch)
+    image = rasterize(batch)
+    shape.delete()
+    return image
+
+
+class _GLRenderer():
+    """Hidden window with an offscreen framebuffer of WIDTH x HEIGHT pixels."""
+
+    def __init__(self):
+        from pyglet import gl
+        from capture import FrameCapture
+        self.gl = gl
+        self.window = pyglet.window.Window(WIDTH, HEIGHT, visible=False)
+        self.window.switch_to()
+        self.window.on_resize(WIDTH, HEIGHT)  # viewport and projection of the window size
+        self.framebuffer = gl.GLuint()
+        self.renderbuffer = gl.GLuint()
+        gl.glGenFramebuffers(1, self.framebuffer)
+        gl.glGenRenderbuffers(1, self.renderbuffer)
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.renderbuffer)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, WIDTH, HEIGHT)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.framebuffer)
+        gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0, gl.GL_RENDERBUFFER,
+                                     self.renderbuffer)
+        if gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER) != gl.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError('offscreen framebuffer is not supported')
+        self.capture = FrameCapture(WIDTH, HEIGHT, pbo=False, workers=1)
+
+    def render(self, factory, rotation, anchor):
+        gl = self.gl
+        batch = pyglet.graphics.Batch()
+        shape = build(factory, rotation, anchor, batch)
+        gl.glClearColor(*(c / 255 for c in BACKGROUND), 1)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        batch.draw()
+        images = []
+        self.capture.capture(callback=lambda image: images.append(image.convert('RGB')))
+        self.capture.wait()
+        shape.delete()
+        return images[0]
+
+
+_gl_renderer = None
+
+
+def render_gl(factory, rotation, anchor):
+    global _gl_renderer
+    if _gl_renderer is None:
+        sys.path.insert(0, SHAPES_DIR)
+        _gl_renderer = _GLRenderer()
+    return _gl_renderer.render(factory, rotation, anchor)
+
+
+def compare(actual, expected, tolerance=2, max_fraction=0.002):
+    """Compare two images. Return (passed, number of failing pixels, diff image)."""
+    if actual.size != expected.size:
+        return False, actual.size[0] * actual.size[1], actual
+    difference = ImageChops.difference(actual.convert('RGB'), expected.convert('RGB'))
+    # a pixel fails if any channel differs by more than tolerance
+    mask = Image.eval(difference, lambda value: 255 if value > tolerance else 0).convert('L')
+    mask = Image.eval(mask, lambda value: 255 if value else 0)
+    failing = mask.histogram()[255]
+    diff = Image.composite(Image.new('RGB', actual.size, (255, 0, 0)), expected.convert('L').convert('RGB'), mask)
+    return failing <= max_fraction * actual.size[0] * actual.size[1], failing, diff
+
+
+def golden_path(backend, name):
+    return os.path.join(GOLDEN_DIR, backend, name + '.png')
+
+
+def check(backend, name, image, tolerance=2, max_fraction=0.002, output_dir=OUTPUT_DIR):
+    """Compare image with its golden image. On failure, write the image and its diff to output_dir.
+
+    Return None if passed, else a message.
+    """
+    path = golden_path(backend, name)
+    if not os.path.exists(path):
+        return 'no golden image %s, run golden_images.py --update' % path
+    with Image.open(path) as expected:
+        passed, failing, diff = compare(image, expected, tolerance, max_fraction)
+    if passed:
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    image.save(os.path.join(output_dir, name + '.png'))
+    diff.save(os.path.join(output_dir, name + '_diff.png'))
+    return '%s: %d pixels differ, see %s' % (name, failing, os.path.join(output_dir, name + '_diff.png'))
+
+
+def iterate_cases(pattern=None):
+    """Yield (name, factory, rotation, anchor) for every case and variant whose name contains pattern."""
+    cases = shape_cases()
+    for case, factory in cases.items():
+        for rotation, anchor in VARIANTS:
+            name = '%s_r%d_a%d_%d' % (case, rotation, anchor[0], anchor[1])
+            if pattern is None or pattern in name:
+                yield name, factory, rotation, anchor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare rendered shapes with golden images.')
+    parser.add_argument('--backend', choices=('cpu', 'gl'), default='cpu')
+    parser.add_argument('--headless', action='store_true', help="gl backend in pyglet's headless (EGL) mode")
+    parser.add_argument('--update', action='store_true', help='record the golden images')
+    parser.add_argument('--tolerance', type=int, default=2, help='allowed difference per channel')
+    parser.add_argument('--max-fraction', type=float, default=0.002, help='allowed fraction of differing pixels')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='folder of the images and diffs of failed cases')
+    parser.add_argument('-k', dest='pattern', help='only cases whose name contains this')
+    args = parser.parse_args(argv)
+
+    # options must be set before pyglet.gl is imported by the shapes
+    if args.backend == 'cpu':
+        pyglet.options['shadow_window'] = False
+    elif args.headless:
+        pyglet.options['headless'] = True
+    sys.path.insert(0, SHAPES_DIR)
+    render = render_cpu if args.backend == 'cpu' else render_gl
+
+    failures = []
+    count = 0
+    for name, factory, rotation, anchor in iterate_cases(args.pattern):
+        image = render(factory, rotation, anchor)
+        count += 1
+        if args.update:
+            os.makedirs(os.path.join(GOLDEN_DIR, args.backend), exist_ok=True)
+            image.save(golden_path(args.backend, name))
+            continue
+        failure = check(args.backend, name, image, args.tolerance, args.max_fraction, args.output)
+        if failure is not None:
+            failures.append(failure)
+            print('FAILED', failure)
+    if args.update:
+        print('%d golden images written to %s' % (count, os.path.join(GOLDEN_DIR, args.backend)))
+        return 0
+    print('%d cases, %d failed' % (count, len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
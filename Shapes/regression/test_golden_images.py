@@ -0,0 +1,40 @@
+"""
+Compare the advanced shapes drawn by the cpu backend with their golden images, see golden_images.py.
+
+Only the cpu backend is covered: regressions of the OpenGL drawing path (shaders, blending, rasterization) are not
+caught here. Its golden images depend on the driver and are not committed; record and compare them on one machine with
+golden_images.py --backend gl.
+
+Run with pytest or directly with python. Failed cases write their image and diff to output/.
+"""
+import pyglet
+pyglet.options['shadow_window'] = False  # the cpu backend needs no window
+
+import pytest
+
+import golden_images
+
+
+CASES = list(golden_images.iterate_cases())
+
+
+@pytest.mark.parametrize('name, factory, rotation, anchor', CASES, ids=[case[0] for case in CASES])
+def test_golden_image(name, factory, rotation, anchor):
+    image = golden_images.render_cpu(factory, rotation, anchor)
+    failure = golden_images.check('cpu', name, image)
+    assert failure is None, failure
+
+
+def test_compare_reports_moved_shape():
+    # a shape moved by a few pixels must fail, with the pixels that changed in red in the diff
+    name, factory, rotation, anchor = next(case for case in CASES if case[0].startswith('rectangle_r30'))
+    image = golden_images.render_cpu(factory, rotation, (anchor[0] + 5, anchor[1]))
+    with golden_images.Image.open(golden_images.golden_path('cpu', name)) as expected:
+        passed, failing, diff = golden_images.compare(image, expected)
+    assert not passed
+    assert sum(1 for pixel in diff.getdata() if pixel == (255, 0, 0)) == failing
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,129 @@
+"""
+Helpers shared by the advanced shapes (advanced_shapes_v0, improved_shapes and animations/v1)
+
+Shapes of every module use the same unit circle cache, the same _ShapeGroup registry (so shapes of different modules
+with the same blend mode and parent share a group and a draw call) and the same code to lay out and resize the vertex
+lists of round shapes.
+"""
+import functools
+import math
+import weakref
+
+import pyglet
+from pyglet.gl import GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+from pyglet.gl import GL_TRIANGLES
+
+
+UNIT_CIRCLE_CACHE_SIZE = 256  # number of (segments, angle, start_angle) templates kept in memory
+
+_shape_groups = weakref.WeakValueDictionary()  # (blend_src, blend_dest, parent) -> _ShapeGroup shared by shapes
+
+
+@functools.lru_cache(maxsize=UNIT_CIRCLE_CACHE_SIZE)
+def _unit_circle(segments, angle=360, start_angle=0):
+    """Return segments + 1 (cos, sin) points of a unit circle, from start_angle to start_angle + angle (in degrees)."""
+    start_angle = math.radians(start_angle)
+    tau_segs = math.radians(angle) / segments
+    return tuple((math.cos(i * tau_segs + start_angle), math.sin(i * tau_segs + start_angle)) for i in range(segments + 1))
+
+
+def unit_circle_cache_info():
+    """Return the hits, misses, maxsize and currsize of the unit circle template cache."""
+    return _unit_circle.cache_info()
+
+
+@functools.lru_cache(maxsize=UNIT_CIRCLE_CACHE_SIZE)
+def _fan_indices(rim_count, closed):
+    """Return the indices of the triangles of a fan around vertex 0 through the rim vertices 1 to rim_count.
+
+    If closed, a last triangle connects both ends.
+    """
+    indices = []
+    for i in range(1, rim_count):
+        indices.extend((i, 0, i + 1))
+    if closed:
+        indices.extend((rim_count, 0, 1))
+    return tuple(indices)
+
+
+def _fit_capacity(capacity, count):
+    """Return capacity doubled until count fits, or halved while count fits in a quarter of it."""
+    capacity = max(capacity, 1)
+    while capacity < count:
+        capacity *= 2
+    while capacity > 1 and count <= capacity // 4:
+        capacity //= 2
+    return capacity
+
+
+def get_shape_group(blend_src=GL_SRC_ALPHA, blend_dest=GL_ONE_MINUS_SRC_ALPHA, parent=None):
+    """Return the _ShapeGroup shared by every shape with the same blend mode and parent group."""
+    key = (blend_src, blend_dest, parent)
+    group = _shape_groups.get(key)
+    if group is None:
+        group = _shape_groups[key] = pyglet.shapes._ShapeGroup(blend_src, blend_dest, parent)
+    return group
+
+
+class _FanVertexListMixin:
+    """Vertex list layout of round shapes, drawn as a fan around (0, 0), indexed if _indexed is True.
+
+    Expects _vertex_list, _batch, _group, _indexed, _closed and _update_color() from the shape.
+    """
+
+    def _resize_vertex_list(self, count, indices=None):
+        """Resize _vertex_list in place to hold count vertices and, if it is indexed, the given indices.
+
+        The capacity doubles when it is too small and halves when less than a quarter of it is used, so changing
+        the count back and forth does not reallocate. Unused vertices are zeroed, making degenerate triangles,
+        and unused indices point to the first vertex. Vertices must be updated afterwards.
+        """
+        vertex_list = self._vertex_list
+        size = vertex_list.get_size()
+        capacity = _fit_capacity(size, count)
+        if indices is None:
+            if capacity != size:
+                vertex_list.resize(capacity)
+        else:
+            index_capacity = _fit_capacity(vertex_list.index_count, len(indices))
+            if capacity != size or index_capacity != vertex_list.index_count:
+                vertex_list.resize(capacity, index_capacity)
+            start = vertex_list.start
+            vertex_list.indices[:] = [start + i for i in indices] + [start] * (index_capacity - len(indices))
+        vertex_list.vertices[count * 2:] = (0,) * ((capacity - count) * 2)
+        if capacity != size:
+            self._update_color()
+
+    def _rim_count(self):
+        """Return the number of outer points of a round shape, drawn as a fan around (0, 0)."""
+        raise NotImplementedError
+
+    def _fan_vertex_count(self):
+        if self._indexed:
+            return self._rim_count() + 1
+        return (self._rim_count() - 1 + self._closed) * 3
+
+    def _add_fan_vertex_list(self):
+        """Add a vertex list for the fan of a round shape, indexed if self._indexed."""
+        if self._indexed:
+            return self._batch.add_indexed(self._fan_vertex_count(), GL_TRIANGLES, self._group,
+                                           _fan_indices(self._rim_count(), self._closed), 'v2f', 'c4B')
+        return self._batch.add(self._fan_vertex_count(), GL_TRIANGLES, self._group, 'v2f', 'c4B')
+
+    def _resize_fan_vertex_list(self):
+        """Resize the vertex list of a round shape after its number of points or closed changed."""
+        indices = _fan_indices(self._rim_count(), self._closed) if self._indexed else None
+        self._resize_vertex_list(self._fan_vertex_count(), indices)
+
+    def _set_fan_vertices(self, points):
+        """Fill _vertices with a fan around (0, 0) through points, as laid out by _add_fan_vertex_list."""
+        if self._indexed:
+            self._vertices = [0, 0]
+            for point in points:
+                self._vertices.extend(point)
+            return
+        self._vertices = []
+        for i in range(len(points) - 1):
+            self._vertices.extend(points[i] + [0, 0] + points[i + 1])
+        if self._closed:
+            self._vertices.extend(points[-1] + [0, 0] + points[0])
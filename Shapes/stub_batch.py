@@ -0,0 +1,106 @@
+"""
+Batch without OpenGL, for benchmarks and tests running without a display
+
+StubBatch hands out vertex lists backed by ctypes arrays, like the mapped buffers of pyglet vertex lists, so shapes
+compute and write their vertices and colors exactly as with a real batch, but nothing is sent to the GPU.
+"""
+import ctypes
+
+
+_CTYPES = {'f': ctypes.c_float, 'd': ctypes.c_double, 'i': ctypes.c_int, 'I': ctypes.c_uint,
+           'b': ctypes.c_byte, 'B': ctypes.c_ubyte, 's': ctypes.c_short, 'S': ctypes.c_ushort}
+
+_STALE_BYTE = 0x55  # fills the regions added by resize, instead of the zeros pyglet does not write either
+
+
+def _parse_format(fmt):
+    """Return (name, components, ctype) of a pyglet vertex format such as 'v2f', 'c4B' or 'c4B/stream'."""
+    fmt = fmt.split('/')[0]
+    name = {'v': 'vertices', 'c': 'colors', 't': 'tex_coords', 'n': 'normals'}[fmt[0]]
+    return name, int(fmt[1]), _CTYPES[fmt[2]]
+
+
+class StubVertexList():
+
+    def __init__(self, batch, count, mode, group, formats, indices=None):
+        self.batch = batch
+        self.mode = mode
+        self.group = group
+        self.start = 0
+        self.indexed = indices is not None
+        formats = [data if type(data) is tuple else (data, None) for data in formats]  # 'v2f' or ('v2f', initial)
+        self._formats = [_parse_format(fmt) for fmt, _ in formats]
+        self._count = 0
+        self._arrays = {}  # attribute name -> ctypes array
+        self.resize(count, None if indices is None else len(indices))
+        for (name, _, _), (_, initial) in zip(self._formats, formats):
+            if initial is not None:
+                self._arrays[name][:] = initial
+        if indices is not None:
+            self.indices = indices
+
+    def get_size(self):
+        return self._count
+
+    def _attribute(name):
+        # like pyglet, assigning a sequence to an attribute fills its array
+        def fset(self, values):
+            self._arrays[name][:] = values
+        return property(lambda self: self._arrays[name], fset)
+
+    vertices = _attribute('vertices')
+    colors = _attribute('colors')
+    tex_coords = _attribute('tex_coords')
+    normals = _attribute('normals')
+    indices = _attribute('indices')
+    del _attribute
+
+    @property
+    def index_count(self):
+        return len(self._arrays['indices'])
+
+    def resize(self, count, index_count=None):
+        """Resize the attribute arrays, keeping the data that fits, like VertexList.resize.
+
+        The added region is not zeroed, it is filled with _STALE_BYTE.
+        """
+        sizes = [(name, ctype, count * components) for name, components, ctype in self._formats]
+        if index_count is not None:
+            sizes.append(('indices', ctypes.c_uint, index_count))
+        for name, ctype, size in sizes:
+            array = (ctype * size)()
+            old = self._arrays.get(name)
+            if old is not None:
+                kept = min(len(old), size)
+                array[:kept] = old[:kept]
+                # like a real buffer, the new region holds whatever was there before: shapes must overwrite it
+                ctypes.memset(ctypes.addressof(array) + kept * ctypes.sizeof(ctype), _STALE_BYTE,
+                              (size - kept) * ctypes.sizeof(ctype))
+            self._arrays[name] = array
+        self._count = count
+
+    def draw(self, mode):
+        pass
+
+    def delete(self):
+        self.batch.vertex_lists.pop(self, None)
+
+
+class StubBatch():
+    """Stand-in for pyglet.graphics.Batch, see the module docstring."""
+
+    def __init__(self):
+        self.vertex_lists = {}  # used as an ordered set, lists are drawn in the order they were added
+
+    def add(self, count, mode, group, *data):
+        vertex_list = StubVertexList(self, count, mode, group, data)
+        self.vertex_lists[vertex_list] = None
+        return vertex_list
+
+    def add_indexed(self, count, mode, group, indices, *data):
+        vertex_list = StubVertexList(self, count, mode, group, data, indices)
+        self.vertex_lists[vertex_list] = None
+        return vertex_list
+
+    def draw(self):
+        pass
@@ -1,84 +1,9 @@
 import pyglet
 
-
-batch2 = pyglet.graphics.Batch()
+from improved_shapes import RectangleWithBorder
 
 
-class RectangleContour(pyglet.shapes.Rectangle):
-    def __init__(self, x, y, width, height, border=1, color=(255, 255, 255), border_color=(0, 0, 0), batch=None, group=None):
-        self.lines = []  # _update_position uses self.lines and is called in super.__init__, so initialize it to empty
-        super().__init__(x, y, width, height, color=color, batch=batch, group=group)
-        self._border = border
-        self._brgb = border_color
-        self._border_opacity = 255
-        self._border_visible = True
-        self.lines = [
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group),
-            pyglet.shapes.Line(0, 0, 0, 0, width=self._border, color=self._brgb, batch=self._batch, group=self._group)
-        ]
-
-    def _update_position(self):
-        super()._update_position()
-        vertices = self._vertex_list.vertices[:][0:6] + self._vertex_list.vertices[:][10:12] + self._vertex_list.vertices[:][0:2]
-        for i, line in enumerate(self.lines):
-            line._visible = self._border_visible
-            line.x = vertices[2 * i]
-            line.y = vertices[2 * i + 1]
-            line.x2 = vertices[2 * i + 2]
-            line.y2 = vertices[2 * i + 3]
-            # correct for line width
-            leg_x, leg_y = line.x - line.x2, line.y - line.y2
-            hypotenuse = (leg_x ** 2 + leg_y ** 2) ** 0.5
-            line.x += self._border / 2 * leg_x / hypotenuse
-            line.x2 -= self._border / 2 * leg_x / hypotenuse
-            line.y += self._border / 2 * leg_y / hypotenuse
-            line.y2 -= self._border / 2 * leg_y / hypotenuse
-            line._update_position()
-
-    def _update_color(self):
-        for line in self.lines:
-            line._rgb = self._brgb
-            line._opacity = self._border_opacity
-            line._update_color()
-        return super()._update_color()
-
-    @property
-    def border_color(self):
-        return self._brgb
-
-    @border_color.setter
-    def border_color(self, values):
-        self._brgb = list(map(int, values))
-        self._update_color()
-
-    @property
-    def border_color(self):
-        return self._brgb
-
-    @border_color.setter
-    def border_color(self, values):
-        self._brgb = list(map(int, values))
-        self._update_color()
-
-    @property
-    def border_opacity(self):
-        return self._opacity
-
-    @border_opacity.setter
-    def border_opacity(self, value):
-        self._border_opacity = value
-        self._update_color()
-
-    @property
-    def border_visible(self):
-        return self._border_visible
-
-    @border_visible.setter
-    def border_visible(self, value):
-        self._border_visible = value
-        self._update_position()
+batch2 = pyglet.graphics.Batch()
 
 
 batch1 = pyglet.graphics.Batch()
@@ -96,7 +21,7 @@ s1 = pyglet.shapes.Rectangle(center[0], center[1], side, side, color=(55, 55, 25
 s2 = pyglet.shapes.Rectangle(center[0], center[1], side, side, color=(255, 55, 55), batch=batch1)  # red
 s3 = pyglet.shapes.Rectangle(center[0], center[1], side, side, color=(55, 255, 55), batch=batch1)  # green
 # s4 = pyglet.shapes.Rectangle(center[0], center[1], side, side, color=(255, 55, 255), batch=batch2)  # pink
-s4 = RectangleContour(center[0], center[1], side, side, border=3, color=(255, 55, 255), border_color=(255, 255, 255), batch=batch2)  # pink with border
+s4 = RectangleWithBorder(center[0], center[1], side, side, border=3, color=(255, 55, 255), border_color=(255, 255, 255), batch=batch2)  # pink with border
 s1.opacity = 100
 s2.opacity = 100
 s3.opacity = 100
@@ -3,8 +3,12 @@ import random
 
 from pyglet.graphics import Batch
 
+from capture import FrameCapture
+
 
 window = pyglet.window.Window()
+capture = FrameCapture(window.width, window.height)
+screenshot_requested = False
 
 batch = pyglet.graphics.Batch()
 
@@ -20,15 +24,26 @@ label = pyglet.text.Label('Hello, world',
 
 @window.event
 def on_draw():
+    global screenshot_requested
     window.clear()
     label.draw()
+    if screenshot_requested:
+        # read the frame just drawn, the PNG is encoded in a background thread
+        screenshot_requested = False
+        capture.capture('screenshot.png', callback=lambda image: print("Done!"))
+        capture.flush()
 
 
 @window.event
 def on_key_press(symbol, modifiers):
+    global screenshot_requested
     print("Taking Screenshot...")
-    pyglet.image.get_buffer_manager().get_color_buffer().save('screenshot.png')
-    print("Done!")
+    screenshot_requested = True
+
+
+@window.event
+def on_close():
+    capture.close()
 
 
 def update(dt):